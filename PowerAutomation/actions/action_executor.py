@@ -11,14 +11,16 @@ import asyncio
 import json
 import logging
 import time
-import aiohttp
-import subprocess
-from typing import Dict, List, Any, Optional, Callable, Union
+import shlex
+from typing import Dict, List, Any, Optional, Callable, Union, Tuple, AsyncIterator
 from dataclasses import dataclass, asdict
 from enum import Enum
 from concurrent.futures import ThreadPoolExecutor
 import importlib
 
+from ..components.http_client_manager import get_http_client_manager
+from .process_runner import ShellRunner, PythonWorkerPool
+
 logger = logging.getLogger(__name__)
 
 class ExecutionStatus(Enum):
@@ -35,6 +37,7 @@ class ExecutionMode(Enum):
     SEQUENTIAL = "sequential"  # 順序執行
     PARALLEL = "parallel"      # 並行執行
     PIPELINE = "pipeline"      # 管道執行
+    DAG = "dag"                # 按依賴關係執行
 
 @dataclass
 class ExecutionTask:
@@ -47,6 +50,7 @@ class ExecutionTask:
     retry_count: int = 0
     max_retries: int = 2
     dependencies: List[str] = None
+    required: bool = True  # 失敗時是否取消下游任務
     
     def __post_init__(self):
         if self.dependencies is None:
@@ -70,6 +74,41 @@ class ExecutionResult:
         if self.timestamp is None:
             self.timestamp = str(time.time())
 
+class IncrementalResultAggregator:
+    """增量結果聚合器
+    
+    每收到一個ExecutionResult即更新成功/失敗列表和置信度統計，
+    流式執行時可隨時取得當前的聚合結果。
+    """
+    
+    def __init__(self, executor: 'ActionExecutor', request):
+        self.executor = executor
+        self.request = request
+        self.successful_results: List[ExecutionResult] = []
+        self.failed_results: List[ExecutionResult] = []
+        self.finished_count = 0
+        self.total_execution_time = 0.0
+    
+    def add(self, result: ExecutionResult):
+        if result.metadata.get('straggler'):
+            return
+        
+        self.finished_count += 1
+        self.total_execution_time += result.execution_time
+        if result.status == ExecutionStatus.COMPLETED:
+            self.successful_results.append(result)
+        elif result.status == ExecutionStatus.FAILED:
+            self.failed_results.append(result)
+    
+    @property
+    def confidence(self) -> float:
+        return self.executor._confidence_from_stats(
+            len(self.successful_results), self.finished_count, self.total_execution_time
+        )
+    
+    def aggregate(self) -> Any:
+        return self.executor._combine_results(self.request, self.successful_results, self.failed_results)
+
 class ActionExecutor:
     """
     統一執行引擎
@@ -88,6 +127,19 @@ class ActionExecutor:
         self.execution_history: List[ExecutionResult] = []
         self.thread_pool = ThreadPoolExecutor(max_workers=self.config.get('max_workers', 10))
         self.max_concurrent_tasks = self.config.get('max_concurrent_tasks', 20)
+        self.http_client = get_http_client_manager(self.config.get('http_client'))
+        
+        # Shell命令執行器和可選的常駐Python工作進程池
+        self.shell_runner = ShellRunner(
+            max_concurrency=self.config.get('max_shell_processes', self.config.get('max_workers', 10)),
+            max_output_bytes=self.config.get('max_output_bytes', 1024 * 1024)
+        )
+        python_workers = self.config.get('python_workers', 0)
+        self.python_worker_pool = PythonWorkerPool(
+            size=python_workers,
+            max_calls_per_worker=self.config.get('python_worker_max_calls', 1000),
+            max_message_bytes=self.config.get('max_output_bytes', 1024 * 1024)
+        ) if python_workers > 0 else None
         
         logger.info("ActionExecutor initialized")
     
@@ -96,7 +148,11 @@ class ActionExecutor:
         self.tool_registry = tool_registry
         logger.info("Tool registry injected into ActionExecutor")
     
-    async def execute(self, request, tools: List[str], mode: ExecutionMode = ExecutionMode.PARALLEL) -> Dict[str, Any]:
+    async def execute(self, request, tools: List[str], mode: ExecutionMode = ExecutionMode.PARALLEL,
+                      dependencies: Optional[Dict[str, List[str]]] = None,
+                      optional_tools: Optional[List[str]] = None,
+                      deadline: Optional[float] = None,
+                      quorum: Optional[int] = None) -> Dict[str, Any]:
         """
         執行任務的主入口
         
@@ -104,6 +160,10 @@ class ActionExecutor:
             request: Agent請求對象
             tools: 要使用的工具列表
             mode: 執行模式
+            dependencies: DAG模式下的工具依賴，工具ID -> 上游工具ID列表
+            optional_tools: 失敗時不取消下游任務的工具
+            deadline: 並行模式下的截止時間（秒），到期後取消未完成的任務
+            quorum: 並行模式下成功結果達到該數量後取消其餘任務
         
         Returns:
             執行結果字典
@@ -115,15 +175,17 @@ class ActionExecutor:
         
         try:
             # 創建執行任務
-            tasks = await self._create_execution_tasks(execution_id, request, tools)
+            tasks = await self._create_execution_tasks(execution_id, request, tools, dependencies, optional_tools)
             
             # 根據模式執行任務
             if mode == ExecutionMode.SEQUENTIAL:
                 results = await self._execute_sequential(tasks)
             elif mode == ExecutionMode.PARALLEL:
-                results = await self._execute_parallel(tasks)
+                results = await self._execute_parallel(tasks, deadline, quorum)
             elif mode == ExecutionMode.PIPELINE:
                 results = await self._execute_pipeline(tasks)
+            elif mode == ExecutionMode.DAG:
+                results = await self._execute_dag(tasks)
             else:
                 raise ValueError(f"Unsupported execution mode: {mode}")
             
@@ -132,17 +194,24 @@ class ActionExecutor:
             
             execution_time = time.time() - start_time
             
+            details = {
+                'execution_id': execution_id,
+                'mode': mode.value,
+                'task_count': len(tasks)
+            }
+            if mode == ExecutionMode.DAG:
+                critical_path, critical_path_time = self._calculate_critical_path(tasks, results)
+                details['critical_path'] = critical_path
+                details['critical_path_time'] = critical_path_time
+                details['total_task_time'] = sum(r.execution_time for r in results)
+            
             return {
                 'result': aggregated_result,
                 'execution_time': execution_time,
                 'tools_used': tools,
                 'task_results': results,
                 'confidence': self._calculate_confidence(results),
-                'details': {
-                    'execution_id': execution_id,
-                    'mode': mode.value,
-                    'task_count': len(tasks)
-                }
+                'details': details
             }
             
         except Exception as e:
@@ -162,9 +231,69 @@ class ActionExecutor:
                 }
             }
     
-    async def _create_execution_tasks(self, execution_id: str, request, tools: List[str]) -> List[ExecutionTask]:
-        """創建執行任務"""
+    async def execute_stream(self, request, tools: List[str],
+                             deadline: Optional[float] = None,
+                             quorum: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式並行執行：每個任務完成即產出一次部分結果
+        
+        Args:
+            request: Agent請求對象
+            tools: 要使用的工具列表
+            deadline: 截止時間（秒），到期後取消未完成的任務
+            quorum: 成功結果達到該數量後取消其餘任務
+        
+        Returns:
+            異步迭代器。每個任務完成時產出 task_result/result/confidence/completed/total，
+            最後產出一次 final=True 的完整結果，格式與 execute 相同
+        """
+        execution_id = f"exec_{request.id}_{int(time.time())}"
+        logger.info(f"Starting streaming execution {execution_id} with tools: {tools}")
+        
+        start_time = time.time()
+        tasks = await self._create_execution_tasks(execution_id, request, tools)
+        aggregator = IncrementalResultAggregator(self, request)
+        results_by_task: Dict[str, ExecutionResult] = {}
+        
+        async for result in self._iterate_as_completed(tasks, deadline, quorum):
+            results_by_task[result.task_id] = result
+            aggregator.add(result)
+            if result.metadata.get('straggler'):
+                continue
+            
+            yield {
+                'task_result': result,
+                'result': aggregator.aggregate(),
+                'confidence': aggregator.confidence,
+                'completed': aggregator.finished_count,
+                'total': len(tasks),
+                'elapsed_time': time.time() - start_time,
+                'final': False
+            }
+        
+        results = [results_by_task[task.id] for task in tasks]
+        yield {
+            'result': aggregator.aggregate(),
+            'execution_time': time.time() - start_time,
+            'tools_used': tools,
+            'task_results': results,
+            'confidence': aggregator.confidence,
+            'details': {
+                'execution_id': execution_id,
+                'mode': 'stream',
+                'task_count': len(tasks),
+                'cancelled_stragglers': sum(1 for r in results if r.metadata.get('straggler'))
+            },
+            'final': True
+        }
+    
+    async def _create_execution_tasks(self, execution_id: str, request, tools: List[str],
+                                      dependencies: Optional[Dict[str, List[str]]] = None,
+                                      optional_tools: Optional[List[str]] = None) -> List[ExecutionTask]:
+        """創建執行任務，並將工具依賴轉換為任務依賴"""
         tasks = []
+        dependencies = dependencies or {}
+        optional_tools = set(optional_tools or [])
         
         for i, tool_id in enumerate(tools):
             task = ExecutionTask(
@@ -177,10 +306,23 @@ class ActionExecutor:
                     'context': request.context,
                     'metadata': request.metadata
                 },
-                timeout=request.timeout // len(tools) if len(tools) > 1 else request.timeout
+                timeout=request.timeout // len(tools) if len(tools) > 1 else request.timeout,
+                required=tool_id not in optional_tools
             )
             tasks.append(task)
         
+        task_ids_by_tool: Dict[str, List[str]] = {}
+        for task in tasks:
+            task_ids_by_tool.setdefault(task.tool_id, []).append(task.id)
+        
+        for task in tasks:
+            for upstream_tool in dependencies.get(task.tool_id, []):
+                if upstream_tool not in task_ids_by_tool:
+                    raise ValueError(f"Tool {task.tool_id} depends on unknown tool {upstream_tool}")
+                for upstream_id in task_ids_by_tool[upstream_tool]:
+                    if upstream_id not in task.dependencies:
+                        task.dependencies.append(upstream_id)
+        
         return tasks
     
     async def _execute_sequential(self, tasks: List[ExecutionTask]) -> List[ExecutionResult]:
@@ -198,38 +340,80 @@ class ActionExecutor:
         
         return results
     
-    async def _execute_parallel(self, tasks: List[ExecutionTask]) -> List[ExecutionResult]:
+    async def _execute_parallel(self, tasks: List[ExecutionTask],
+                                deadline: Optional[float] = None,
+                                quorum: Optional[int] = None) -> List[ExecutionResult]:
         """並行執行任務"""
         logger.info(f"Executing {len(tasks)} tasks in parallel")
         
-        # 限制並發數量
-        semaphore = asyncio.Semaphore(min(self.max_concurrent_tasks, len(tasks)))
+        results_by_task: Dict[str, ExecutionResult] = {}
+        async for result in self._iterate_as_completed(tasks, deadline, quorum):
+            results_by_task[result.task_id] = result
         
-        async def execute_with_semaphore(task):
-            async with semaphore:
-                return await self._execute_single_task(task)
+        return [results_by_task[task.id] for task in tasks]
+    
+    async def _iterate_as_completed(self, tasks: List[ExecutionTask],
+                                    deadline: Optional[float] = None,
+                                    quorum: Optional[int] = None) -> AsyncIterator[ExecutionResult]:
+        """按完成順序產出任務結果
         
-        # 並行執行所有任務
-        results = await asyncio.gather(
-            *[execute_with_semaphore(task) for task in tasks],
-            return_exceptions=True
-        )
+        到達截止時間或成功結果數達到quorum時取消未完成的任務，
+        並為它們產出 metadata['straggler']=True 的CANCELLED結果。
+        """
+        if not tasks:
+            return
         
-        # 處理異常結果
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                error_result = ExecutionResult(
-                    task_id=tasks[i].id,
-                    tool_id=tasks[i].tool_id,
+        # 限制並發數量
+        semaphore = asyncio.Semaphore(max(1, min(self.max_concurrent_tasks, len(tasks))))
+        
+        async def execute_with_semaphore(task):
+            try:
+                async with semaphore:
+                    return await self._execute_single_task(task)
+            except Exception as e:
+                return ExecutionResult(
+                    task_id=task.id,
+                    tool_id=task.tool_id,
                     status=ExecutionStatus.FAILED,
-                    error=str(result)
+                    error=str(e)
                 )
-                processed_results.append(error_result)
-            else:
-                processed_results.append(result)
         
-        return processed_results
+        futures = [asyncio.ensure_future(execute_with_semaphore(task)) for task in tasks]
+        finished_ids = set()
+        successful_count = 0
+        
+        try:
+            for next_result in asyncio.as_completed(futures, timeout=deadline):
+                try:
+                    result = await next_result
+                except asyncio.TimeoutError:
+                    logger.info(f"Deadline of {deadline}s reached, cancelling {len(tasks) - len(finished_ids)} tasks")
+                    break
+                
+                finished_ids.add(result.task_id)
+                if result.status == ExecutionStatus.COMPLETED:
+                    successful_count += 1
+                yield result
+                
+                if quorum and successful_count >= quorum:
+                    logger.info(f"Quorum of {quorum} reached, cancelling {len(tasks) - len(finished_ids)} tasks")
+                    break
+        finally:
+            stragglers = [future for future in futures if not future.done()]
+            for future in stragglers:
+                future.cancel()
+            if stragglers:
+                await asyncio.gather(*stragglers, return_exceptions=True)
+        
+        for task in tasks:
+            if task.id not in finished_ids:
+                yield ExecutionResult(
+                    task_id=task.id,
+                    tool_id=task.tool_id,
+                    status=ExecutionStatus.CANCELLED,
+                    error="Cancelled after deadline or quorum",
+                    metadata={'straggler': True}
+                )
     
     async def _execute_pipeline(self, tasks: List[ExecutionTask]) -> List[ExecutionResult]:
         """管道執行任務（前一個任務的輸出作為下一個任務的輸入）"""
@@ -254,6 +438,143 @@ class ActionExecutor:
         
         return results
     
+    async def _execute_dag(self, tasks: List[ExecutionTask]) -> List[ExecutionResult]:
+        """按依賴關係執行任務（DAG）
+        
+        任務的所有上游完成後立即啟動，並發數受 max_concurrent_tasks 限制；
+        上游結果通過 parameters['dependency_results'] 傳給下游，
+        必需任務失敗時取消其所有下游任務。
+        """
+        logger.info(f"Executing {len(tasks)} tasks in DAG mode")
+        
+        task_map = {task.id: task for task in tasks}
+        dependents: Dict[str, List[str]] = {task.id: [] for task in tasks}
+        pending_counts: Dict[str, int] = {}
+        
+        for task in tasks:
+            for upstream_id in task.dependencies:
+                if upstream_id not in task_map:
+                    raise ValueError(f"Task {task.id} depends on unknown task {upstream_id}")
+                dependents[upstream_id].append(task.id)
+            pending_counts[task.id] = len(task.dependencies)
+        
+        self._check_acyclic(tasks, dependents)
+        
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_tasks))
+        results: Dict[str, ExecutionResult] = {}
+        running: Dict[asyncio.Task, str] = {}
+        
+        async def execute_with_semaphore(task):
+            async with semaphore:
+                return await self._execute_single_task(task)
+        
+        def start_task(task_id: str):
+            task = task_map[task_id]
+            upstream_results = {
+                task_map[upstream_id].tool_id: results[upstream_id].result
+                for upstream_id in task.dependencies
+                if results[upstream_id].status == ExecutionStatus.COMPLETED
+            }
+            if upstream_results:
+                task.parameters['dependency_results'] = upstream_results
+            running[asyncio.create_task(execute_with_semaphore(task))] = task_id
+        
+        def cancel_downstream(failed_id: str):
+            stack = list(dependents[failed_id])
+            while stack:
+                task_id = stack.pop()
+                if task_id in results:
+                    continue
+                results[task_id] = ExecutionResult(
+                    task_id=task_id,
+                    tool_id=task_map[task_id].tool_id,
+                    status=ExecutionStatus.CANCELLED,
+                    error=f"Upstream task {failed_id} did not complete"
+                )
+                stack.extend(dependents[task_id])
+        
+        for task in tasks:
+            if pending_counts[task.id] == 0:
+                start_task(task.id)
+        
+        try:
+            while running:
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                
+                for future in done:
+                    task_id = running.pop(future)
+                    task = task_map[task_id]
+                    
+                    if future.exception() is not None:
+                        results[task_id] = ExecutionResult(
+                            task_id=task_id,
+                            tool_id=task.tool_id,
+                            status=ExecutionStatus.FAILED,
+                            error=str(future.exception())
+                        )
+                    else:
+                        results[task_id] = future.result()
+                    
+                    if results[task_id].status != ExecutionStatus.COMPLETED and task.required:
+                        logger.warning(f"DAG task {task_id} failed, cancelling downstream tasks")
+                        cancel_downstream(task_id)
+                        continue
+                    
+                    for dependent_id in dependents[task_id]:
+                        if dependent_id in results:
+                            continue
+                        pending_counts[dependent_id] -= 1
+                        if pending_counts[dependent_id] == 0:
+                            start_task(dependent_id)
+        finally:
+            for future in running:
+                future.cancel()
+        
+        return [results[task.id] for task in tasks]
+    
+    def _check_acyclic(self, tasks: List[ExecutionTask], dependents: Dict[str, List[str]]):
+        """檢查任務依賴是否有環（Kahn算法）"""
+        in_degrees = {task.id: len(task.dependencies) for task in tasks}
+        ready = [task_id for task_id, degree in in_degrees.items() if degree == 0]
+        visited = 0
+        
+        while ready:
+            task_id = ready.pop()
+            visited += 1
+            for dependent_id in dependents[task_id]:
+                in_degrees[dependent_id] -= 1
+                if in_degrees[dependent_id] == 0:
+                    ready.append(dependent_id)
+        
+        if visited != len(tasks):
+            raise ValueError("Task dependencies contain a cycle")
+    
+    def _calculate_critical_path(self, tasks: List[ExecutionTask], results: List[ExecutionResult]) -> Tuple[List[str], float]:
+        """計算關鍵路徑（按實際執行時間的最長依賴鏈）"""
+        execution_times = {result.task_id: result.execution_time for result in results}
+        task_map = {task.id: task for task in tasks}
+        finish_times: Dict[str, float] = {}
+        predecessors: Dict[str, Optional[str]] = {}
+        
+        def finish_time(task_id: str) -> float:
+            if task_id not in finish_times:
+                upstream = [(finish_time(upstream_id), upstream_id) for upstream_id in task_map[task_id].dependencies]
+                start, predecessor = max(upstream) if upstream else (0.0, None)
+                finish_times[task_id] = start + execution_times.get(task_id, 0.0)
+                predecessors[task_id] = predecessor
+            return finish_times[task_id]
+        
+        if not tasks:
+            return [], 0.0
+        
+        end_id = max(tasks, key=lambda task: finish_time(task.id)).id
+        path = []
+        while end_id is not None:
+            path.append(end_id)
+            end_id = predecessors[end_id]
+        
+        return list(reversed(path)), finish_times[path[0]]
+    
     async def _execute_single_task(self, task: ExecutionTask) -> ExecutionResult:
         """執行單個任務"""
         logger.info(f"Executing task {task.id} with tool {task.tool_id}")
@@ -304,6 +625,17 @@ class ActionExecutor:
             )
             logger.warning(f"Task {task.id} timed out after {execution_time:.2f}s")
             
+        except asyncio.CancelledError:
+            execution_result = ExecutionResult(
+                task_id=task.id,
+                tool_id=task.tool_id,
+                status=ExecutionStatus.CANCELLED,
+                error="Task cancelled",
+                execution_time=time.time() - start_time
+            )
+            logger.info(f"Task {task.id} cancelled")
+            raise
+            
         except Exception as e:
             execution_time = time.time() - start_time
             execution_result = ExecutionResult(
@@ -320,6 +652,11 @@ class ActionExecutor:
             if task.id in self.active_executions:
                 del self.active_executions[task.id]
             
+            # 執行結果作為工具的被動健康信號
+            record_tool_result = getattr(self.tool_registry, 'record_tool_result', None)
+            if record_tool_result:
+                record_tool_result(task.tool_id, execution_result.status == ExecutionStatus.COMPLETED)
+            
             # 記錄到歷史
             self.execution_history.append(execution_result)
         
@@ -336,14 +673,13 @@ class ActionExecutor:
         }
         
         # 發送HTTP請求到MCP服務
-        async with aiohttp.ClientSession() as session:
-            url = f"{tool_info.endpoint}/process"
-            async with session.post(url, json=mcp_request, timeout=task.timeout) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result
-                else:
-                    raise Exception(f"MCP tool returned status {response.status}")
+        url = f"{tool_info.endpoint}/process"
+        async with self.http_client.post(url, json=mcp_request, timeout=task.timeout) as response:
+            if response.status == 200:
+                result = await response.json()
+                return result
+            else:
+                raise Exception(f"MCP tool returned status {response.status}")
     
     async def _execute_http_tool(self, tool_info, task: ExecutionTask) -> Any:
         """執行HTTP API工具"""
@@ -354,19 +690,25 @@ class ActionExecutor:
             'data': task.parameters
         }
         
-        async with aiohttp.ClientSession() as session:
-            url = f"{tool_info.endpoint}/api/process"
-            async with session.post(url, json=api_request, timeout=task.timeout) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result
-                else:
-                    raise Exception(f"HTTP API returned status {response.status}")
+        url = f"{tool_info.endpoint}/api/process"
+        async with self.http_client.post(url, json=api_request, timeout=task.timeout) as response:
+            if response.status == 200:
+                result = await response.json()
+                return result
+            else:
+                raise Exception(f"HTTP API returned status {response.status}")
     
     async def _execute_python_tool(self, tool_info, task: ExecutionTask) -> Any:
         """執行Python模塊工具"""
         logger.info(f"Executing Python tool: {tool_info.name}")
         
+        # 配置了入口函數的工具在常駐工作進程中執行
+        entry_point = (tool_info.config or {}).get('entry_point')
+        if self.python_worker_pool and tool_info.module_path and entry_point:
+            return await self.python_worker_pool.call(
+                tool_info.module_path, entry_point, task.parameters, timeout=task.timeout
+            )
+        
         # 模擬Python工具執行
         if tool_info.name == "system_monitor":
             return await self._execute_system_monitor(task.parameters)
@@ -379,36 +721,25 @@ class ActionExecutor:
         """執行Shell命令工具"""
         logger.info(f"Executing shell tool: {tool_info.name}")
         
-        # 在線程池中執行shell命令
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            self.thread_pool,
-            self._run_shell_command,
-            tool_info.command,
-            task.parameters
-        )
-        return result
+        # 參數經過shell轉義後再替換到命令中
+        quoted_parameters = {key: shlex.quote(str(value)) for key, value in task.parameters.items()}
+        command = tool_info.command.format(**quoted_parameters)
+        
+        result = await self.shell_runner.run(command, timeout=task.timeout)
+        
+        if result.stdout_truncated or result.stderr_truncated:
+            logger.warning(f"Output of shell tool {tool_info.name} truncated to {self.shell_runner.max_output_bytes} bytes")
+        
+        if result.returncode == 0:
+            return result.stdout
+        else:
+            raise Exception(f"Shell command failed: {result.stderr}")
     
-    def _run_shell_command(self, command: str, parameters: Dict[str, Any]) -> str:
-        """運行shell命令"""
-        try:
-            # 替換命令中的參數
-            formatted_command = command.format(**parameters)
-            result = subprocess.run(
-                formatted_command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                raise Exception(f"Shell command failed: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            raise Exception("Shell command timeout")
+    async def shutdown(self):
+        """停止常駐工作進程並釋放線程池"""
+        if self.python_worker_pool:
+            await self.python_worker_pool.close()
+        self.thread_pool.shutdown(wait=False)
     
     async def _execute_default_tool(self, tool_info, task: ExecutionTask) -> Any:
         """執行默認工具"""
@@ -472,6 +803,11 @@ class ActionExecutor:
         successful_results = [r for r in results if r.status == ExecutionStatus.COMPLETED]
         failed_results = [r for r in results if r.status == ExecutionStatus.FAILED]
         
+        return self._combine_results(request, successful_results, failed_results)
+    
+    def _combine_results(self, request, successful_results: List[ExecutionResult],
+                         failed_results: List[ExecutionResult]) -> Any:
+        """根據成功和失敗的結果生成聚合結果"""
         if not successful_results:
             return {
                 'error': 'All tools failed to execute',
@@ -549,17 +885,23 @@ class ActionExecutor:
         return analysis_summary
     
     def _calculate_confidence(self, results: List[ExecutionResult]) -> float:
-        """計算整體置信度"""
-        if not results:
-            return 0.0
+        """計算整體置信度（不計入因截止時間或quorum取消的任務）"""
+        results = [r for r in results if not r.metadata.get('straggler')]
         
         successful_count = len([r for r in results if r.status == ExecutionStatus.COMPLETED])
-        total_count = len(results)
+        return self._confidence_from_stats(
+            successful_count, len(results), sum(r.execution_time for r in results)
+        )
+    
+    def _confidence_from_stats(self, successful_count: int, total_count: int, total_execution_time: float) -> float:
+        """根據成功數、總數和總執行時間計算置信度"""
+        if total_count == 0:
+            return 0.0
         
         base_confidence = successful_count / total_count
         
         # 根據執行時間調整置信度
-        avg_execution_time = sum(r.execution_time for r in results) / len(results)
+        avg_execution_time = total_execution_time / total_count
         if avg_execution_time < 5.0:  # 快速執行加分
             base_confidence += 0.1
         elif avg_execution_time > 30.0:  # 執行過慢減分
@@ -577,7 +919,10 @@ class ActionExecutor:
             'total_executions': total_executions,
             'successful_executions': successful_executions,
             'success_rate': successful_executions / total_executions if total_executions > 0 else 0.0,
-            'average_execution_time': sum(r.execution_time for r in self.execution_history) / total_executions if total_executions > 0 else 0.0
+            'average_execution_time': sum(r.execution_time for r in self.execution_history) / total_executions if total_executions > 0 else 0.0,
+            'http_client': self.http_client.get_metrics(),
+            'shell_runner': self.shell_runner.get_stats(),
+            'python_workers': self.python_worker_pool.get_stats() if self.python_worker_pool else None
         }
 
 # 工廠函數
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Process Runner - 子進程執行器
+Process Runner - asyncio subprocess runner and warm Python worker pool
+
+- ShellRunner: 基於asyncio子進程執行Shell命令，限制並發數，
+  流式讀取stdout/stderr並按大小截斷，超時後終止整個進程組
+- PythonWorkerPool: 常駐的Python工作進程池，重複調用Python工具時
+  免去每次啟動解釋器和導入模塊的開銷
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 工作進程腳本和其模塊搜索根目錄（PowerAutomation）
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python_worker.py')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@dataclass
+class ProcessResult:
+    """子進程執行結果"""
+    returncode: int
+    stdout: str
+    stderr: str
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    execution_time: float = 0.0
+
+async def _read_capped(stream: asyncio.StreamReader, max_bytes: int, chunk_size: int = 65536) -> Tuple[bytes, bool]:
+    """讀取整個流，只保留前 max_bytes 字節，其餘丟棄以免阻塞子進程"""
+    chunks: List[bytes] = []
+    kept = 0
+    truncated = False
+
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        remaining = max_bytes - kept
+        if len(chunk) > remaining:
+            truncated = True
+            chunk = chunk[:remaining]
+        if chunk:
+            chunks.append(chunk)
+            kept += len(chunk)
+
+    return b''.join(chunks), truncated
+
+def _kill_process_group(process: asyncio.subprocess.Process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+class ShellRunner:
+    """異步Shell命令執行器"""
+
+    def __init__(self, max_concurrency: int = 10, max_output_bytes: int = 1024 * 1024):
+        self.max_output_bytes = max_output_bytes
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.running = 0
+        self.total_runs = 0
+        self.timeouts = 0
+
+    async def run(self, command: str, timeout: Optional[float] = None) -> ProcessResult:
+        """
+        執行Shell命令
+
+        Args:
+            command: Shell命令
+            timeout: 超時秒數，超時後終止整個進程組並拋出 asyncio.TimeoutError
+
+        Returns:
+            ProcessResult
+        """
+        async with self.semaphore:
+            self.running += 1
+            self.total_runs += 1
+            start_time = time.time()
+
+            # 新會話使命令及其子進程同屬一個進程組，超時時可一併終止
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.DEVNULL,
+                start_new_session=True
+            )
+
+            try:
+                (stdout, stdout_truncated), (stderr, stderr_truncated), _ = await asyncio.wait_for(
+                    asyncio.gather(
+                        _read_capped(process.stdout, self.max_output_bytes),
+                        _read_capped(process.stderr, self.max_output_bytes),
+                        process.wait()
+                    ),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                _kill_process_group(process)
+                await process.wait()
+                raise
+            except BaseException:
+                _kill_process_group(process)
+                await process.wait()
+                raise
+            finally:
+                self.running -= 1
+
+            return ProcessResult(
+                returncode=process.returncode,
+                stdout=stdout.decode('utf-8', errors='replace'),
+                stderr=stderr.decode('utf-8', errors='replace'),
+                stdout_truncated=stdout_truncated,
+                stderr_truncated=stderr_truncated,
+                execution_time=time.time() - start_time
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'total_runs': self.total_runs,
+            'timeouts': self.timeouts
+        }
+
+class PythonWorker:
+    """單個常駐Python工作進程，通過stdin/stdout上的JSON行協議通信"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.calls = 0
+        self.next_id = 0
+
+    @classmethod
+    async def start(cls, max_message_bytes: int) -> 'PythonWorker':
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get('PYTHONPATH')]))
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-u', WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=PROJECT_ROOT,
+            env=env,
+            limit=max_message_bytes,
+            start_new_session=True
+        )
+        return cls(process)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def call(self, module: str, function: str, parameters: Dict[str, Any]) -> Any:
+        self.next_id += 1
+        request = {'id': self.next_id, 'module': module, 'function': function, 'parameters': parameters}
+        self.process.stdin.write(json.dumps(request, default=str).encode('utf-8') + b'\n')
+        await self.process.stdin.drain()
+
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("Python worker exited unexpectedly")
+
+        response = json.loads(line)
+        self.calls += 1
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', 'Python worker call failed'))
+        return response.get('result')
+
+    async def stop(self):
+        if self.alive:
+            _kill_process_group(self.process)
+        await self.process.wait()
+
+class PythonWorkerPool:
+    """常駐Python工作進程池
+
+    工作進程按需啟動，最多 size 個；調用超時或出錯的進程會被終止並在下次需要時重新啟動，
+    處理 max_calls_per_worker 次調用後輪換，避免工具代碼的狀態或內存洩漏無限累積。
+    """
+
+    def __init__(self, size: int = 2, max_calls_per_worker: int = 1000, max_message_bytes: int = 1024 * 1024):
+        self.size = size
+        self.max_calls_per_worker = max_calls_per_worker
+        self.max_message_bytes = max_message_bytes
+        self.idle_workers: List[PythonWorker] = []
+        self.semaphore = asyncio.Semaphore(size)
+        self.workers_started = 0
+        self.total_calls = 0
+        self.failed_calls = 0
+
+    async def call(self, module: str, function: str, parameters: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        在工作進程中調用 module.function(**parameters)
+
+        Args:
+            module: 模塊路徑（相對於PowerAutomation根目錄）
+            function: 函數名，可以是協程函數
+            parameters: 關鍵字參數，需可JSON序列化
+            timeout: 超時秒數
+
+        Returns:
+            函數返回值（經JSON往返）
+        """
+        async with self.semaphore:
+            worker = self.idle_workers.pop() if self.idle_workers else None
+            if worker is None or not worker.alive:
+                worker = await PythonWorker.start(self.max_message_bytes)
+                self.workers_started += 1
+
+            self.total_calls += 1
+            healthy = False
+            try:
+                result = await asyncio.wait_for(worker.call(module, function, parameters), timeout)
+                healthy = True
+                return result
+            except RuntimeError:
+                # 工具自身拋出的異常不影響工作進程
+                healthy = worker.alive
+                self.failed_calls += 1
+                raise
+            except BaseException:
+                self.failed_calls += 1
+                raise
+            finally:
+                if healthy and worker.calls < self.max_calls_per_worker:
+                    self.idle_workers.append(worker)
+                else:
+                    await worker.stop()
+
+    async def close(self):
+        """停止所有空閒工作進程"""
+        workers, self.idle_workers = self.idle_workers, []
+        for worker in workers:
+            await worker.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'idle_workers': len(self.idle_workers),
+            'workers_started': self.workers_started,
+            'total_calls': self.total_calls,
+            'failed_calls': self.failed_calls
+        }
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Python工具工作進程
+Python tool worker process
+
+由 PythonWorkerPool 啟動的常駐進程。從stdin逐行讀取JSON請求
+{"id", "module", "function", "parameters"}，調用 module.function(**parameters)，
+並向stdout寫回一行 {"id", "ok", "result" | "error"}。
+工具代碼的print輸出被重定向到stderr，不會破壞協議。
+"""
+
+import asyncio
+import importlib
+import inspect
+import json
+import sys
+import traceback
+
+def main():
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    modules = {}
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        request = json.loads(line)
+        try:
+            module_name = request['module']
+            if module_name not in modules:
+                modules[module_name] = importlib.import_module(module_name)
+
+            function = getattr(modules[module_name], request['function'])
+            result = function(**request.get('parameters', {}))
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+
+            response = {'id': request.get('id'), 'ok': True, 'result': result}
+        except Exception as e:
+            traceback.print_exc()
+            response = {'id': request.get('id'), 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+        protocol_out.write(json.dumps(response, default=str) + '\n')
+        protocol_out.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+ASGI服務入口 - 持久事件循環版本
+為完全動態MCP服務器和Domain MCP服務器提供ASGI應用
+
+Flask版本每個請求都新建並關閉一個事件循環，綁定在循環上的連接池和緩存
+隨之丟棄，並發度也受限於WSGI工作線程數。ASGI版本中所有請求共用一個
+持久事件循環，並通過准入控制限制並發和排隊長度，過載時快速返回503。
+
+用法:
+    uvicorn asgi_server:create_fully_dynamic_app --factory --port 5002
+    uvicorn asgi_server:create_domain_app --factory --port 5000
+    python asgi_server.py --service fully_dynamic --port 5002
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+import uvicorn
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'core'))
+
+from components.http_client_manager import get_http_client_manager, close_http_client_manager
+
+logger = logging.getLogger(__name__)
+
+class AdmissionController:
+    """並發限制與背壓控制
+
+    最多 max_concurrency 個請求同時執行，最多 max_queue 個請求排隊等待；
+    隊列已滿或排隊超過 queue_timeout 時直接拒絕，避免請求在事件循環上無限堆積。
+    """
+
+    def __init__(self, max_concurrency: int = 64, max_queue: int = 256,
+                 queue_timeout: float = 5.0, request_timeout: float = 300.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.request_timeouts = 0
+
+    def _reject(self, reason: str):
+        raise HTTPException(status_code=503, detail=reason, headers={"Retry-After": "1"})
+
+    async def run(self, coro):
+        """
+        在並發限制下執行協程
+
+        Args:
+            coro: 要執行的協程
+
+        Returns:
+            協程結果
+        """
+        if self.semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            coro.close()
+            self._reject("服務繁忙，請稍後重試")
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            coro.close()
+            self._reject("排隊超時，請稍後重試")
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(coro, self.request_timeout)
+        except asyncio.TimeoutError:
+            self.request_timeouts += 1
+            raise HTTPException(status_code=504, detail="請求處理超時")
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+            "request_timeouts": self.request_timeouts
+        }
+
+def create_admission_controller() -> AdmissionController:
+    """從環境變量創建准入控制器"""
+    return AdmissionController(
+        max_concurrency=int(os.getenv("ASGI_MAX_CONCURRENCY", "64")),
+        max_queue=int(os.getenv("ASGI_MAX_QUEUE", "256")),
+        queue_timeout=float(os.getenv("ASGI_QUEUE_TIMEOUT", "5")),
+        request_timeout=float(os.getenv("ASGI_REQUEST_TIMEOUT", "300"))
+    )
+
+def _create_app(title: str, lifespan) -> FastAPI:
+    app = FastAPI(title=title, version="1.0.0", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+def _require_request_text(data: Dict[str, Any]) -> str:
+    request_text = data.get('request', '')
+    if not request_text:
+        raise HTTPException(status_code=400, detail="請求內容不能為空")
+    return request_text
+
+def create_fully_dynamic_app() -> FastAPI:
+    """創建完全動態MCP的ASGI應用"""
+    from fully_dynamic_mcp_server import dynamic_mcp, llm_config
+
+    admission = create_admission_controller()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        logger.info(f"🚀 完全動態MCP ASGI服務啟動: {llm_config['provider']} - {llm_config['model']}")
+        yield
+        await close_http_client_manager()
+
+    app = _create_app("Fully Dynamic MCP", lifespan)
+
+    @app.get("/health")
+    async def health_check():
+        """健康檢查"""
+        return {
+            "status": "healthy",
+            "mcp_type": "fully_dynamic",
+            "llm_provider": llm_config["provider"],
+            "total_requests": dynamic_mcp.request_count,
+            "timestamp": time.time()
+        }
+
+    @app.post("/api/process")
+    async def process_request(data: Dict[str, Any]):
+        """處理請求 - 主要API"""
+        user_input = _require_request_text(data)
+        return await admission.run(dynamic_mcp.process(user_input))
+
+    @app.post("/api/search")
+    async def cloud_search(data: Dict[str, Any]):
+        """Cloud Search MCP"""
+        user_input = _require_request_text(data)
+        return await admission.run(dynamic_mcp.cloud_search_mcp(user_input))
+
+    @app.post("/api/identify")
+    async def identify_domains(data: Dict[str, Any]):
+        """識別專業領域"""
+        user_input = _require_request_text(data)
+        domains = await admission.run(
+            dynamic_mcp.identify_domains(user_input, data.get('context', ''))
+        )
+        return {
+            "request": user_input,
+            "identified_domains": domains,
+            "domain_count": len(domains)
+        }
+
+    @app.get("/api/status")
+    async def get_status():
+        """獲取系統狀態"""
+        return {
+            "mcp_type": "fully_dynamic",
+            "serving": "asgi",
+            "llm_config": {
+                "provider": llm_config["provider"],
+                "model": llm_config["model"],
+                "base_url": llm_config["base_url"]
+            },
+            "performance_metrics": dynamic_mcp.performance_metrics,
+            "total_requests": dynamic_mcp.request_count,
+            "admission": admission.get_stats(),
+            "http_client": get_http_client_manager().get_metrics()
+        }
+
+    return app
+
+def create_domain_app() -> FastAPI:
+    """創建Domain MCP的ASGI應用"""
+    import domain_mcp_server
+    from domain_mcp_server import (
+        initialize_domain_mcp_system, format_classification_result, format_processing_results
+    )
+    from intelligent_domain_classifier import DomainClassificationRequest
+
+    admission = create_admission_controller()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await initialize_domain_mcp_system()
+        yield
+        await close_http_client_manager()
+
+    app = _create_app("Domain MCP", lifespan)
+
+    @app.get("/health")
+    async def health_check():
+        """健康檢查"""
+        return {
+            "status": "healthy",
+            "timestamp": time.time(),
+            "version": "1.0.0"
+        }
+
+    @app.post("/api/classify")
+    async def classify_request(data: Dict[str, Any]):
+        """智能領域分類"""
+        request_text = _require_request_text(data)
+        classification_request = DomainClassificationRequest(
+            request_text=request_text,
+            context=data.get('context', {}),
+            user_preferences=data.get('preferences', {}),
+            previous_domains=data.get('previous_domains', [])
+        )
+        result = await admission.run(
+            domain_mcp_server.domain_classifier.classify_request(classification_request)
+        )
+        return format_classification_result(result)
+
+    @app.post("/api/process")
+    async def process_request(data: Dict[str, Any]):
+        """處理領域請求"""
+        request_text = _require_request_text(data)
+        results = await admission.run(
+            domain_mcp_server.domain_registry.process_request_with_domains(
+                request_text,
+                context=data.get('context', {})
+            )
+        )
+        return format_processing_results(results)
+
+    @app.get("/api/status")
+    async def get_system_status():
+        """獲取系統狀態"""
+        return {
+            "system_status": "running",
+            "serving": "asgi",
+            "registry": await domain_mcp_server.domain_registry.get_registry_status(),
+            "classifier": await domain_mcp_server.domain_classifier.get_classification_statistics(),
+            "evolution": await domain_mcp_server.evolution_system.get_evolution_status(),
+            "admission": admission.get_stats(),
+            "timestamp": time.time()
+        }
+
+    return app
+
+APP_FACTORIES = {
+    "fully_dynamic": (create_fully_dynamic_app, 5002),
+    "domain": (create_domain_app, 5000)
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="PowerAutomation ASGI服務")
+    parser.add_argument("--service", choices=sorted(APP_FACTORIES), default="fully_dynamic", help="要啟動的服務")
+    parser.add_argument("--host", default="0.0.0.0", help="監聽地址")
+    parser.add_argument("--port", type=int, help="監聽端口，默認與Flask版本相同")
+    args = parser.parse_args()
+
+    factory, default_port = APP_FACTORIES[args.service]
+    uvicorn.run(factory(), host=args.host, port=args.port or default_port, log_level="info")
+
+if __name__ == "__main__":
+    main()
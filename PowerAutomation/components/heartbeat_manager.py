@@ -6,9 +6,11 @@ Heartbeat Manager Implementation
 """
 
 import asyncio
+import gzip
 import json
 import logging
 import aiohttp
+import platform
 import psutil
 import socket
 import time
@@ -19,8 +21,20 @@ from enum import Enum
 import ssl
 import certifi
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
 class ConnectionStatus(Enum):
     """連接狀態枚舉"""
     DISCONNECTED = "disconnected"
@@ -72,6 +86,9 @@ class HeartbeatData:
     configuration_version: str
     capabilities: List[str]
     metadata: Dict[str, Any] = field(default_factory=dict)
+    heartbeat_type: str = "full"  # full: 完整工具快照, delta: 只含變化的工具
+    base_sequence: int = 0  # 增量心跳所基於的、雲端已確認的序列號
+    removed_tools: List[str] = field(default_factory=list)
 
 @dataclass
 class HeartbeatResponse:
@@ -82,6 +99,7 @@ class HeartbeatResponse:
     commands: List[Dict[str, Any]] = field(default_factory=list)
     configuration_updates: Dict[str, Any] = field(default_factory=dict)
     message: str = ""
+    resync_required: bool = False  # 雲端要求下次發送完整快照
 
 @dataclass
 class ConnectionConfig:
@@ -96,6 +114,11 @@ class ConnectionConfig:
     use_ssl: bool = True
     verify_ssl: bool = True
     compression: bool = True
+    compression_threshold: int = 1024  # 請求體超過該字節數才壓縮
+    compression_algorithm: str = "gzip"  # gzip 或 zstd（需安裝 zstandard）
+    delta_enabled: bool = True
+    full_snapshot_interval: int = 20  # 每隔多少次心跳發送一次完整快照
+    metric_change_threshold: float = 0.05  # 負載指標相對變化超過該比例才上報
 
 class HeartbeatManager:
     """心跳管理器"""
@@ -111,6 +134,14 @@ class HeartbeatManager:
         self.sequence_number = 0
         self.start_time = time.time()
         
+        # 增量心跳狀態：只有雲端確認後才推進
+        self.acked_sequence = 0
+        self.acked_change_version = 0
+        self.acked_tool_state: Dict[str, Dict[str, Any]] = {}
+        self.heartbeats_since_snapshot = 0
+        self.force_full_snapshot = True
+        self.pending_heartbeat: Optional[Dict[str, Any]] = None
+        
         # 統計信息
         self.stats = {
             'total_heartbeats': 0,
@@ -119,7 +150,12 @@ class HeartbeatManager:
             'connection_errors': 0,
             'reconnection_count': 0,
             'average_response_time': 0.0,
-            'last_error': None
+            'last_error': None,
+            'full_heartbeats': 0,
+            'delta_heartbeats': 0,
+            'last_payload_bytes': 0,
+            'total_payload_bytes': 0,
+            'total_uncompressed_bytes': 0
         }
         
         # 回調函數
@@ -304,19 +340,12 @@ class HeartbeatManager:
             warning_count=0
         )
         
-        # 獲取工具狀態
-        tool_status = {}
-        if self.tool_registry_manager:
-            for tool_id, tool in self.tool_registry_manager.registered_tools.items():
-                tool_status[tool_id] = {
-                    'status': tool.status.value,
-                    'load_metrics': asdict(tool.load_metrics),
-                    'last_updated': tool.last_updated.isoformat()
-                }
-        
         # 增加序列號
         self.sequence_number += 1
         
+        # 獲取工具狀態（完整快照或增量）
+        heartbeat_type, tool_status, removed_tools = self._collect_tool_status()
+        
         return HeartbeatData(
             adapter_id=self.adapter_id,
             timestamp=datetime.now(),
@@ -333,11 +362,129 @@ class HeartbeatManager:
             ],
             metadata={
                 'hostname': socket.gethostname(),
-                'python_version': f"{psutil.PYTHON_VERSION}",
+                'python_version': platform.python_version(),
                 'adapter_version': "1.0.0"
-            }
+            },
+            heartbeat_type=heartbeat_type,
+            base_sequence=self.acked_sequence,
+            removed_tools=removed_tools
         )
     
+    @staticmethod
+    def _tool_state(tool) -> Dict[str, Any]:
+        return {
+            'status': tool.status.value,
+            'load_metrics': asdict(tool.load_metrics),
+            'last_updated': tool.last_updated.isoformat()
+        }
+    
+    def _state_changed(self, old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> bool:
+        """狀態變化，或任一數值指標相對變化超過閾值"""
+        if old is None or old['status'] != new['status']:
+            return True
+        
+        threshold = self.config.metric_change_threshold
+        old_metrics = old['load_metrics']
+        for key, value in new['load_metrics'].items():
+            old_value = old_metrics.get(key)
+            if isinstance(value, (int, float)) and isinstance(old_value, (int, float)):
+                if abs(value - old_value) > threshold * max(abs(old_value), 1.0):
+                    return True
+        return False
+    
+    def _collect_tool_status(self):
+        """
+        收集工具狀態
+        
+        Returns:
+            (heartbeat_type, tool_status, removed_tools)
+        """
+        manager = self.tool_registry_manager
+        if not manager:
+            self.pending_heartbeat = None
+            return "full", {}, []
+        
+        tools = manager.registered_tools
+        change_version = getattr(manager, 'change_version', None)
+        send_full = (
+            not self.config.delta_enabled or
+            change_version is None or
+            self.force_full_snapshot or
+            self.heartbeats_since_snapshot + 1 >= self.config.full_snapshot_interval
+        )
+        
+        if send_full:
+            tool_status = {tool_id: self._tool_state(tool) for tool_id, tool in tools.items()}
+            removed_tools = []
+            heartbeat_type = "full"
+        else:
+            # 只檢查自上次確認以來變更過的工具
+            tool_status = {}
+            removed_tools = []
+            for tool_id in manager.get_changed_tools(self.acked_change_version):
+                tool = tools.get(tool_id)
+                if tool is None:
+                    if tool_id in self.acked_tool_state:
+                        removed_tools.append(tool_id)
+                    continue
+                state = self._tool_state(tool)
+                if self._state_changed(self.acked_tool_state.get(tool_id), state):
+                    tool_status[tool_id] = state
+            heartbeat_type = "delta"
+        
+        self.pending_heartbeat = {
+            'type': heartbeat_type,
+            'sequence': self.sequence_number,
+            'change_version': change_version or 0,
+            'tool_status': tool_status,
+            'removed_tools': removed_tools
+        }
+        return heartbeat_type, tool_status, removed_tools
+    
+    def _commit_heartbeat(self):
+        """雲端確認後推進增量基線"""
+        pending, self.pending_heartbeat = self.pending_heartbeat, None
+        if not pending:
+            return
+        
+        if pending['type'] == "full":
+            self.acked_tool_state = dict(pending['tool_status'])
+            self.heartbeats_since_snapshot = 0
+            self.force_full_snapshot = False
+            self.stats['full_heartbeats'] += 1
+        else:
+            self.acked_tool_state.update(pending['tool_status'])
+            for tool_id in pending['removed_tools']:
+                self.acked_tool_state.pop(tool_id, None)
+            self.heartbeats_since_snapshot += 1
+            self.stats['delta_heartbeats'] += 1
+        
+        self.acked_sequence = pending['sequence']
+        self.acked_change_version = pending['change_version']
+    
+    def _encode_body(self, data: Dict[str, Any]):
+        """
+        序列化並按需壓縮請求體
+        
+        Returns:
+            (body, content_encoding)，未壓縮時 content_encoding 為 None
+        """
+        body = json.dumps(data, default=_json_default, separators=(',', ':')).encode('utf-8')
+        self.stats['total_uncompressed_bytes'] += len(body)
+        
+        encoding = None
+        if self.config.compression and len(body) >= self.config.compression_threshold:
+            if self.config.compression_algorithm == "zstd" and zstandard is not None:
+                body = zstandard.ZstdCompressor(level=3).compress(body)
+                encoding = "zstd"
+            else:
+                body = gzip.compress(body, compresslevel=6)
+                encoding = "gzip"
+        
+        self.stats['last_payload_bytes'] = len(body)
+        self.stats['total_payload_bytes'] += len(body)
+        return body, encoding
+    
     async def _collect_system_metrics(self) -> SystemMetrics:
         """收集系統指標"""
         try:
@@ -393,19 +540,28 @@ class HeartbeatManager:
             if not self.session:
                 await self._create_session()
             
-            # 準備請求數據
+            # 準備請求數據（工具狀態已是可序列化的字典，不再深拷貝）
+            tool_status = heartbeat_data.tool_status
+            heartbeat_data.tool_status = {}
             data = asdict(heartbeat_data)
+            heartbeat_data.tool_status = tool_status
+            data['tool_status'] = tool_status
             
             # 轉換datetime為ISO格式
             data['timestamp'] = heartbeat_data.timestamp.isoformat()
             data['status']['last_heartbeat'] = heartbeat_data.status.last_heartbeat.isoformat()
             data['system_metrics']['timestamp'] = heartbeat_data.system_metrics.timestamp.isoformat()
             
+            body, content_encoding = self._encode_body(data)
+            headers = {'Content-Type': 'application/json'}
+            if content_encoding:
+                headers['Content-Encoding'] = content_encoding
+            
             # 發送請求
             async with self.session.post(
                 f"{self.config.cloud_endpoint}/api/heartbeat",
-                json=data,
-                headers={'Content-Type': 'application/json'}
+                data=body,
+                headers=headers
             ) as response:
                 
                 if response.status == 200:
@@ -416,7 +572,8 @@ class HeartbeatManager:
                         next_heartbeat_interval=result.get('next_heartbeat_interval', self.config.heartbeat_interval),
                         commands=result.get('commands', []),
                         configuration_updates=result.get('configuration_updates', {}),
-                        message=result.get('message', '')
+                        message=result.get('message', ''),
+                        resync_required=result.get('resync_required', False)
                     )
                 else:
                     error_text = await response.text()
@@ -443,6 +600,12 @@ class HeartbeatManager:
         current_avg = self.stats['average_response_time']
         self.stats['average_response_time'] = (current_avg * (total_successful - 1) + response_time) / total_successful
         
+        # 推進增量基線；雲端狀態與本地不一致時下次發送完整快照
+        self._commit_heartbeat()
+        if response.resync_required:
+            logger.info("雲端要求重新同步，下次發送完整快照")
+            self.force_full_snapshot = True
+        
         # 更新時間戳
         self.last_heartbeat_time = datetime.now()
         self.last_successful_heartbeat = self.last_heartbeat_time
@@ -473,6 +636,10 @@ class HeartbeatManager:
         self.stats['connection_errors'] += 1
         self.stats['last_error'] = error_msg or (response.message if response else "Unknown error")
         
+        # 雲端未確認，之後以完整快照重新同步
+        self.pending_heartbeat = None
+        self.force_full_snapshot = True
+        
         # 更新時間戳
         self.last_heartbeat_time = datetime.now()
         
@@ -580,6 +747,8 @@ class HeartbeatManager:
             logger.info("收到重啟心跳命令")
             # 重置統計
             self.sequence_number = 0
+            self.acked_sequence = 0
+            self.force_full_snapshot = True
             # 可以在這裡添加其他重啟邏輯
         except Exception as e:
             logger.error(f"處理重啟心跳命令失敗: {e}")
@@ -638,7 +807,12 @@ class HeartbeatManager:
             'last_heartbeat_time': self.last_heartbeat_time.isoformat() if self.last_heartbeat_time else None,
             'last_successful_heartbeat': self.last_successful_heartbeat.isoformat() if self.last_successful_heartbeat else None,
             'current_retry_delay': self.retry_delay,
-            'sequence_number': self.sequence_number
+            'sequence_number': self.sequence_number,
+            'acked_sequence': self.acked_sequence,
+            'compression_ratio': (
+                self.stats['total_payload_bytes'] / self.stats['total_uncompressed_bytes']
+                if self.stats['total_uncompressed_bytes'] else 1.0
+            )
         }
 
 # 創建心跳管理器的工廠函數
@@ -654,7 +828,12 @@ def create_heartbeat_manager(config: Dict[str, Any], adapter_id: str) -> Heartbe
         max_retry_delay=config.get('max_retry_delay', 300),
         use_ssl=config.get('use_ssl', True),
         verify_ssl=config.get('verify_ssl', True),
-        compression=config.get('compression', True)
+        compression=config.get('compression', True),
+        compression_threshold=config.get('compression_threshold', 1024),
+        compression_algorithm=config.get('compression_algorithm', 'gzip'),
+        delta_enabled=config.get('delta_enabled', True),
+        full_snapshot_interval=config.get('full_snapshot_interval', 20),
+        metric_change_threshold=config.get('metric_change_threshold', 0.05)
     )
     
     return HeartbeatManager(connection_config, adapter_id)
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP Client Manager - 共享HTTP客戶端層
+HTTP Client Manager - Shared pooled HTTP client layer
+
+進程級共享的aiohttp客戶端，所有工具/LLM/MCP出站調用共用：
+- 按主機劃分的連接池（keep-alive、DNS緩存、可配置的連接上限）
+- 統一的連接/總超時配置
+- 帶抖動的指數退避重試
+- 連接池利用率、連接複用率和延遲分位數指標
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple, Union, AsyncIterator
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .smart_routing_engine import SlidingQuantiles
+
+logger = logging.getLogger(__name__)
+
+# 不改變服務端狀態、可安全重發的方法
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+class HostPoolMetrics:
+    """單個主機連接池的指標"""
+
+    def __init__(self, host: str, limit: int, window_size: int):
+        self.host = host
+        self.limit = limit
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.retries = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.latency = SlidingQuantiles(window_size)
+
+    def acquire(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, latency: Optional[float] = None):
+        self.in_flight -= 1
+        if latency is not None:
+            self.latency_sum += latency
+            self.latency_count += 1
+            self.latency.add(latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        connections = self.connections_created + self.connections_reused
+        return {
+            'host': self.host,
+            'limit': self.limit,
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'utilization': self.in_flight / self.limit if self.limit else 0.0,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'reuse_rate': self.connections_reused / connections if connections else 0.0,
+            'retries': self.retries,
+            'errors': self.errors,
+            'latency_avg': self.latency_sum / self.latency_count if self.latency_count else 0.0,
+            'latency_p50': self.latency.value(0.5) if self.latency_count else 0.0,
+            'latency_p95': self.latency.value(0.95) if self.latency_count else 0.0,
+            'latency_p99': self.latency.value(0.99) if self.latency_count else 0.0
+        }
+
+class HTTPClientManager:
+    """共享HTTP客戶端管理器
+
+    每個 (事件循環, 主機) 對應一個 ClientSession 及其專屬 TCPConnector，
+    主機之間的連接池互不搶佔；aiohttp 會話綁定創建它的事件循環，
+    因此不同線程/事件循環各自持有一組連接池。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+
+        # 連接池配置
+        self.limit_per_host = self.config.get('limit_per_host', 20)
+        self.host_limits: Dict[str, int] = self.config.get('host_limits', {})
+        self.keepalive_timeout = self.config.get('keepalive_timeout', 30.0)
+        self.dns_cache_ttl = self.config.get('dns_cache_ttl', 300)
+
+        # 超時配置（秒）
+        self.connect_timeout = self.config.get('connect_timeout', 5.0)
+        self.total_timeout = self.config.get('total_timeout', 30.0)
+
+        # 重試配置
+        self.max_retries = self.config.get('max_retries', 2)
+        self.backoff_base = self.config.get('backoff_base', 0.1)
+        self.backoff_max = self.config.get('backoff_max', 2.0)
+        self.retry_statuses = frozenset(self.config.get('retry_statuses', [502, 503, 504]))
+
+        self.metrics_window = self.config.get('metrics_window', 200)
+
+        self.sessions: Dict[Tuple[asyncio.AbstractEventLoop, str], aiohttp.ClientSession] = {}
+        self.host_metrics: Dict[str, HostPoolMetrics] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def _get_host_limit(self, host: str) -> int:
+        netloc = host.split('://', 1)[-1]
+        return self.host_limits.get(host, self.host_limits.get(netloc, self.limit_per_host))
+
+    def _get_metrics(self, host: str) -> HostPoolMetrics:
+        metrics = self.host_metrics.get(host)
+        if metrics is None:
+            with self._lock:
+                metrics = self.host_metrics.setdefault(
+                    host, HostPoolMetrics(host, self._get_host_limit(host), self.metrics_window)
+                )
+        return metrics
+
+    def _create_trace_config(self, metrics: HostPoolMetrics) -> aiohttp.TraceConfig:
+        """通過TraceConfig統計新建連接與複用連接"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            metrics.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            metrics.connections_reused += 1
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _get_session(self, host: str) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self.sessions.get((loop, host))
+        if session is not None and not session.closed:
+            return session
+
+        with self._lock:
+            self._discard_stale_sessions()
+
+            session = self.sessions.get((loop, host))
+            if session is None or session.closed:
+                metrics = self._get_metrics(host)
+                connector = aiohttp.TCPConnector(
+                    limit=metrics.limit,
+                    limit_per_host=metrics.limit,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    enable_cleanup_closed=True
+                )
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout),
+                    trace_configs=[self._create_trace_config(metrics)]
+                )
+                self.sessions[(loop, host)] = session
+                logger.debug(f"Created HTTP connection pool for {host} (limit={metrics.limit})")
+
+        return session
+
+    def _discard_stale_sessions(self):
+        """丟棄已關閉事件循環上的會話
+
+        事件循環關閉後其上的連接已無法正常關閉，
+        短生命週期的事件循環應在關閉前調用 close()。
+        """
+        for key in [key for key in self.sessions if key[0].is_closed()]:
+            logger.warning(f"Discarding HTTP connection pool for {key[1]} left on a closed event loop")
+            self.sessions.pop(key).detach()
+
+    def _build_timeout(self, timeout: Union[None, float, aiohttp.ClientTimeout]) -> Optional[aiohttp.ClientTimeout]:
+        if timeout is None or isinstance(timeout, aiohttp.ClientTimeout):
+            return timeout
+        return aiohttp.ClientTimeout(total=timeout, connect=min(self.connect_timeout, timeout))
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full jitter指數退避"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, *,
+                      timeout: Union[None, float, aiohttp.ClientTimeout] = None,
+                      max_retries: Optional[int] = None,
+                      idempotent: Optional[bool] = None,
+                      **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        發送HTTP請求，用法與 aiohttp 的 session.request 相同
+
+        連接失敗總會重試；超時、斷連和 retry_statuses 中的狀態碼
+        僅在請求冪等時重試，避免重複觸發工具的副作用。
+
+        Args:
+            method: HTTP方法
+            url: 請求URL
+            timeout: 總超時秒數或 ClientTimeout，默認使用全局配置
+            max_retries: 最大重試次數，默認使用全局配置
+            idempotent: 是否可安全重發，默認按HTTP方法判斷
+            **kwargs: 傳給 aiohttp 的其他參數（json、headers等）
+
+        Returns:
+            aiohttp.ClientResponse（在上下文退出時釋放連接）
+        """
+        method = method.upper()
+        host = self._host_key(url)
+        session = self._get_session(host)
+        metrics = self._get_metrics(host)
+
+        retries = self.max_retries if max_retries is None else max_retries
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        request_timeout = self._build_timeout(timeout)
+        if request_timeout is not None:
+            kwargs['timeout'] = request_timeout
+
+        attempt = 0
+        while True:
+            metrics.acquire()
+            start_time = time.perf_counter()
+            try:
+                response = await session.request(method, url, **kwargs)
+            except aiohttp.ClientConnectorError:
+                metrics.release()
+                metrics.errors += 1
+                if attempt >= retries:
+                    raise
+            except (aiohttp.ServerDisconnectedError, asyncio.TimeoutError):
+                metrics.release()
+                metrics.errors += 1
+                if not idempotent or attempt >= retries:
+                    raise
+            except BaseException:
+                metrics.release()
+                metrics.errors += 1
+                raise
+            else:
+                if response.status in self.retry_statuses and idempotent and attempt < retries:
+                    response.release()
+                    metrics.release(time.perf_counter() - start_time)
+                else:
+                    break
+
+            metrics.retries += 1
+            await asyncio.sleep(self._backoff_delay(attempt))
+            attempt += 1
+
+        try:
+            yield response
+        finally:
+            response.release()
+            metrics.release(time.perf_counter() - start_time)
+
+    def get(self, url: str, **kwargs):
+        """發送GET請求"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """發送POST請求"""
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        """發送PUT請求"""
+        return self.request('PUT', url, **kwargs)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """獲取連接池和延遲指標"""
+        hosts = {host: metrics.to_dict() for host, metrics in self.host_metrics.items()}
+        return {
+            'hosts': hosts,
+            'active_sessions': sum(1 for session in self.sessions.values() if not session.closed),
+            'total_requests': sum(host['requests'] for host in hosts.values()),
+            'total_in_flight': sum(host['in_flight'] for host in hosts.values()),
+            'total_retries': sum(host['retries'] for host in hosts.values()),
+            'total_errors': sum(host['errors'] for host in hosts.values())
+        }
+
+    async def close(self):
+        """關閉當前事件循環上的所有連接池"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions = [self.sessions.pop(key) for key in list(self.sessions) if key[0] is loop]
+            self._discard_stale_sessions()
+
+        for session in sessions:
+            await session.close()
+
+_http_client_manager: Optional[HTTPClientManager] = None
+_http_client_lock = threading.Lock()
+
+def get_http_client_manager(config: Optional[Dict[str, Any]] = None) -> HTTPClientManager:
+    """
+    獲取進程級共享的HTTP客戶端管理器
+
+    Args:
+        config: 配置，僅在首次創建時生效
+
+    Returns:
+        HTTPClientManager實例
+    """
+    global _http_client_manager
+    if _http_client_manager is None:
+        with _http_client_lock:
+            if _http_client_manager is None:
+                _http_client_manager = HTTPClientManager(config)
+    return _http_client_manager
+
+async def close_http_client_manager():
+    """關閉共享HTTP客戶端在當前事件循環上的連接池"""
+    if _http_client_manager is not None:
+        await _http_client_manager.close()
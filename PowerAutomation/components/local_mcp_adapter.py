@@ -10,7 +10,7 @@ import json
 import logging
 import socket
 import time
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Awaitable
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
@@ -34,6 +34,8 @@ from .smart_routing_engine import (
     ToolEndpoint,
     RoutingRequest,
     RoutingDecision,
+    RoutingResult,
+    RequestPriority,
     LoadMetrics,
     ToolHealth,
     create_smart_routing_engine
@@ -147,7 +149,11 @@ class LocalMCPAdapter:
                 'discovery_paths': ['./tools', '/usr/local/tools'],
                 'auto_discovery': True,
                 'scan_interval': 300,
-                'api_endpoints': []
+                'api_endpoints': [],
+                'probe_timeout': 2.0,
+                'probe_concurrency': 16,
+                'analysis_workers': 4,
+                'cache_path': './cache/tool_discovery_cache.json'
             },
             'heartbeat': {
                 'heartbeat_interval': 30,
@@ -156,7 +162,10 @@ class LocalMCPAdapter:
                 'retry_delay': 5,
                 'max_retry_delay': 300,
                 'use_ssl': True,
-                'verify_ssl': True
+                'verify_ssl': True,
+                'compression_threshold': 1024,
+                'delta_enabled': True,
+                'full_snapshot_interval': 20
             },
             'routing': {
                 'default_strategy': 'intelligent',
@@ -165,7 +174,13 @@ class LocalMCPAdapter:
                 'error_rate_threshold': 0.1,
                 'failover_enabled': True,
                 'circuit_breaker_threshold': 5,
-                'circuit_breaker_timeout': 60
+                'circuit_breaker_timeout': 60,
+                'circuit_breaker_error_rate': 0.5,
+                'circuit_breaker_minimum_requests': 10,
+                'circuit_breaker_window': 60,
+                'initial_concurrency_limit': 10,
+                'hedging_enabled': True,
+                'hedge_budget': 0.1
             },
             'security': {
                 'tls_enabled': True,
@@ -476,29 +491,66 @@ class LocalMCPAdapter:
         """添加請求回調"""
         self.request_callbacks.append(callback)
     
-    async def route_request(self, capability: str, priority: str = 'normal', 
-                          timeout: float = 30.0, metadata: Dict[str, Any] = None) -> RoutingDecision:
-        """路由請求"""
-        if not self.smart_routing_engine:
-            raise Exception("智慧路由引擎未初始化")
-        
-        # 創建路由請求
-        request = RoutingRequest(
+    def _create_routing_request(self, capability: str, priority: str, timeout: float,
+                                metadata: Optional[Dict[str, Any]]) -> RoutingRequest:
+        return RoutingRequest(
             request_id=f"req_{int(time.time() * 1000)}_{id(self)}",
             capability_required=capability,
             priority=getattr(RequestPriority, priority.upper(), RequestPriority.NORMAL),
             timeout=timeout,
             metadata=metadata or {}
         )
+    
+    async def route_request(self, capability: str, priority: str = 'normal', 
+                          timeout: float = 30.0, metadata: Dict[str, Any] = None) -> RoutingDecision:
+        """路由請求（只返回決策；需要執行時使用 execute_request，以便路由引擎獲得執行結果）"""
+        if not self.smart_routing_engine:
+            raise Exception("智慧路由引擎未初始化")
         
         # 執行路由
-        decision = await self.smart_routing_engine.route_request(request)
+        decision = await self.smart_routing_engine.route_request(
+            self._create_routing_request(capability, priority, timeout, metadata)
+        )
         
         # 更新統計
         self.stats['successful_requests'] += 1
         
         return decision
     
+    async def execute_request(self, capability: str, call: Callable[[str, str], Awaitable[Any]],
+                              priority: str = 'normal', timeout: float = 30.0,
+                              metadata: Dict[str, Any] = None) -> RoutingResult:
+        """
+        路由並執行請求
+        
+        通過路由引擎執行，由其佔用和釋放端點併發名額、更新熔斷器和實測延遲，
+        主請求過慢時向回退工具發送對沖請求。
+        
+        Args:
+            capability: 所需能力
+            call: 實際調用，參數為 (tool_id, endpoint_url)
+            priority: 優先級
+            timeout: 超時秒數
+            metadata: 請求元數據
+        
+        Returns:
+            RoutingResult
+        """
+        if not self.smart_routing_engine:
+            raise Exception("智慧路由引擎未初始化")
+        
+        request = self._create_routing_request(capability, priority, timeout, metadata)
+        decision = await self.smart_routing_engine.route_request(request)
+        result = await self.smart_routing_engine.execute_request(request, decision, call)
+        
+        # 更新統計
+        if result.success:
+            self.stats['successful_requests'] += 1
+        else:
+            self.stats['failed_requests'] += 1
+        
+        return result
+    
     async def get_registered_tools(self) -> List[LocalToolInfo]:
         """獲取已註冊工具"""
         if not self.tool_registry_manager:
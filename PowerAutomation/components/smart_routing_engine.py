@@ -6,16 +6,17 @@ Smart Routing Engine Implementation
 """
 
 import asyncio
+import dataclasses
 import json
 import logging
 import time
-import statistics
-from typing import Dict, List, Optional, Any, Tuple, Callable
+from typing import Dict, List, Optional, Any, Tuple, Callable, Awaitable
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 import hashlib
 import random
+from array import array
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,7 @@ class ToolEndpoint:
     load_metrics: LoadMetrics = field(default_factory=LoadMetrics)
     capabilities: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    observed_p95: float = 0.0  # 路由引擎實測的p95響應時間（毫秒）
 
 @dataclass
 class RoutingRequest:
@@ -105,59 +107,241 @@ class RoutingResult:
     response_data: Any = None
     timestamp: datetime = field(default_factory=datetime.now)
 
+class P2Quantile:
+    """P²流式分位數估計（Jain & Chlamtac）
+    
+    只維護5個標記點，每次更新和查詢都是O(1)，不需要保存或排序樣本。
+    """
+    
+    def __init__(self, quantile: float):
+        self.quantile = quantile
+        self.count = 0
+        self.heights: List[float] = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0.0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4.0]
+        self.increments = [0.0, quantile / 2, quantile, (1 + quantile) / 2, 1.0]
+    
+    def add(self, value: float):
+        """加入一個觀測值"""
+        self.count += 1
+        
+        if self.count <= 5:
+            self.heights.append(value)
+            if self.count == 5:
+                self.heights.sort()
+            return
+        
+        heights = self.heights
+        positions = self.positions
+        
+        # 找到觀測值所在的區間並更新極值
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        
+        # 調整中間三個標記點
+        for i in range(1, 4):
+            delta = self.desired[i] - positions[i]
+            if (delta >= 1 and positions[i + 1] - positions[i] > 1) or \
+               (delta <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if delta > 0 else -1
+                candidate = self._parabolic(i, step)
+                if heights[i - 1] < candidate < heights[i + 1]:
+                    heights[i] = candidate
+                else:
+                    heights[i] = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                positions[i] += step
+    
+    def _parabolic(self, i: int, step: int) -> float:
+        heights = self.heights
+        positions = self.positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i]) +
+            (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+        )
+    
+    def value(self) -> float:
+        """當前分位數估計"""
+        if self.count == 0:
+            return 0.0
+        if self.count < 5:
+            ordered = sorted(self.heights)
+            return ordered[min(int(len(ordered) * self.quantile), len(ordered) - 1)]
+        return self.heights[2]
+
+class SlidingQuantiles:
+    """近似滑動窗口的流式分位數
+    
+    兩組P²估計器錯開半個窗口輪流重置，查詢時使用樣本較多的一組，
+    因此估計值只反映最近約 window_size 個樣本。
+    """
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, window_size: int):
+        self.window_size = max(window_size, 2)
+        self.generations = [self._new_generation(), self._new_generation()]
+        self.counts = [0, 0]
+        self.total = 0
+    
+    def _new_generation(self) -> Dict[float, P2Quantile]:
+        return {quantile: P2Quantile(quantile) for quantile in self.QUANTILES}
+    
+    def add(self, value: float):
+        half_window = self.window_size // 2
+        for index in (0, 1):
+            # 第二組估計器晚半個窗口開始
+            if index == 1 and self.total < half_window:
+                continue
+            if self.counts[index] >= self.window_size:
+                self.generations[index] = self._new_generation()
+                self.counts[index] = 0
+            for estimator in self.generations[index].values():
+                estimator.add(value)
+            self.counts[index] += 1
+        self.total += 1
+    
+    def value(self, quantile: float) -> float:
+        index = 0 if self.counts[0] >= self.counts[1] else 1
+        estimator = self.generations[index].get(quantile)
+        if estimator is None:
+            raise ValueError(f"不支持的分位數: {quantile}")
+        return estimator.value()
+
+class ToolMetricsWindow:
+    """單個工具的滑動窗口指標
+    
+    - 響應時間：定長數組環形緩衝區 + 滑動求和，平均值O(1)
+    - 分位數：SlidingQuantiles，p50/p95/p99 O(1)
+    - 錯誤率：按半衰期指數衰減的錯誤數/請求數
+    """
+    
+    def __init__(self, window_size: int, error_half_life: float):
+        self.window_size = window_size
+        self.buffer = array('d', bytes(8 * window_size))
+        self.next_index = 0
+        self.size = 0
+        self.window_sum = 0.0
+        self.quantiles = SlidingQuantiles(window_size)
+        
+        self.error_half_life = error_half_life
+        self.decayed_requests = 0.0
+        self.decayed_errors = 0.0
+        self.last_decay = time.monotonic()
+    
+    def add_response_time(self, response_time: float):
+        if self.size == self.window_size:
+            self.window_sum -= self.buffer[self.next_index]
+        else:
+            self.size += 1
+        
+        self.buffer[self.next_index] = response_time
+        self.window_sum += response_time
+        self.next_index = (self.next_index + 1) % self.window_size
+        self.quantiles.add(response_time)
+    
+    def average(self) -> float:
+        return self.window_sum / self.size if self.size else 0.0
+    
+    def add_request(self):
+        self._decay()
+        self.decayed_requests += 1.0
+    
+    def add_error(self):
+        self._decay()
+        self.decayed_errors += 1.0
+    
+    def error_rate(self) -> float:
+        self._decay()
+        if self.decayed_requests <= 0:
+            return 0.0
+        return min(self.decayed_errors / self.decayed_requests, 1.0)
+    
+    def _decay(self):
+        now = time.monotonic()
+        elapsed = now - self.last_decay
+        if elapsed > 0 and self.error_half_life > 0:
+            factor = 0.5 ** (elapsed / self.error_half_life)
+            self.decayed_requests *= factor
+            self.decayed_errors *= factor
+        self.last_decay = now
+
 class PerformanceTracker:
-    """性能追蹤器"""
+    """性能追蹤器
+    
+    每個工具使用 ToolMetricsWindow，記錄和查詢均為O(1)，
+    不隨窗口大小或工具數量變慢。錯誤率按 error_half_life 秒的半衰期衰減。
+    """
     
-    def __init__(self, window_size: int = 100):
+    def __init__(self, window_size: int = 100, error_half_life: float = 300.0):
         self.window_size = window_size
-        self.response_times: Dict[str, List[float]] = {}
+        self.error_half_life = error_half_life
+        self.windows: Dict[str, ToolMetricsWindow] = {}
         self.error_counts: Dict[str, int] = {}
         self.request_counts: Dict[str, int] = {}
         self.last_reset = datetime.now()
     
+    def _get_window(self, tool_id: str) -> ToolMetricsWindow:
+        window = self.windows.get(tool_id)
+        if window is None:
+            window = ToolMetricsWindow(self.window_size, self.error_half_life)
+            self.windows[tool_id] = window
+        return window
+    
     def record_response_time(self, tool_id: str, response_time: float):
         """記錄響應時間"""
-        if tool_id not in self.response_times:
-            self.response_times[tool_id] = []
-        
-        self.response_times[tool_id].append(response_time)
-        
-        # 保持窗口大小
-        if len(self.response_times[tool_id]) > self.window_size:
-            self.response_times[tool_id].pop(0)
+        self._get_window(tool_id).add_response_time(response_time)
     
     def record_error(self, tool_id: str):
         """記錄錯誤"""
         self.error_counts[tool_id] = self.error_counts.get(tool_id, 0) + 1
+        self._get_window(tool_id).add_error()
     
     def record_request(self, tool_id: str):
         """記錄請求"""
         self.request_counts[tool_id] = self.request_counts.get(tool_id, 0) + 1
+        self._get_window(tool_id).add_request()
     
     def get_average_response_time(self, tool_id: str) -> float:
         """獲取平均響應時間"""
-        if tool_id not in self.response_times or not self.response_times[tool_id]:
+        window = self.windows.get(tool_id)
+        return window.average() if window else 0.0
+    
+    def get_percentile_response_time(self, tool_id: str, quantile: float) -> float:
+        """獲取響應時間分位數（支持0.5、0.95、0.99）"""
+        window = self.windows.get(tool_id)
+        if not window or window.size == 0:
             return 0.0
-        return statistics.mean(self.response_times[tool_id])
+        return window.quantiles.value(quantile)
+    
+    def get_p50_response_time(self, tool_id: str) -> float:
+        """獲取50百分位響應時間"""
+        return self.get_percentile_response_time(tool_id, 0.5)
     
     def get_p95_response_time(self, tool_id: str) -> float:
         """獲取95百分位響應時間"""
-        if tool_id not in self.response_times or not self.response_times[tool_id]:
-            return 0.0
-        
-        times = sorted(self.response_times[tool_id])
-        index = int(len(times) * 0.95)
-        return times[min(index, len(times) - 1)]
+        return self.get_percentile_response_time(tool_id, 0.95)
+    
+    def get_p99_response_time(self, tool_id: str) -> float:
+        """獲取99百分位響應時間"""
+        return self.get_percentile_response_time(tool_id, 0.99)
     
     def get_error_rate(self, tool_id: str) -> float:
-        """獲取錯誤率"""
-        errors = self.error_counts.get(tool_id, 0)
-        requests = self.request_counts.get(tool_id, 0)
-        
-        if requests == 0:
-            return 0.0
-        
-        return errors / requests
+        """獲取錯誤率（時間衰減）"""
+        window = self.windows.get(tool_id)
+        return window.error_rate() if window else 0.0
     
     def get_throughput(self, tool_id: str) -> float:
         """獲取吞吐量（請求/秒）"""
@@ -173,8 +357,15 @@ class PerformanceTracker:
         """重置統計"""
         self.error_counts.clear()
         self.request_counts.clear()
+        for window in self.windows.values():
+            window.decayed_requests = 0.0
+            window.decayed_errors = 0.0
         self.last_reset = datetime.now()
 
+def _effective_latency(endpoint: ToolEndpoint) -> float:
+    """端點的有效延遲（毫秒）：上報的平均響應時間和實測p95中較大者"""
+    return max(endpoint.load_metrics.response_time_avg, endpoint.observed_p95)
+
 class LoadBalancer:
     """負載均衡器"""
     
@@ -271,10 +462,10 @@ class LoadBalancer:
             load_score = 1.0 - (ep.load_metrics.cpu_usage / 100.0)
             scores.append(load_score)
             
-            # 響應時間分數（反向）
-            max_response_time = max((e.load_metrics.response_time_avg for e in endpoints), default=1.0)
+            # 響應時間分數（反向），取上報均值和實測p95中較大者，避免長尾端點被持續選中
+            max_response_time = max((_effective_latency(e) for e in endpoints), default=1.0)
             if max_response_time > 0:
-                response_score = 1.0 - (ep.load_metrics.response_time_avg / max_response_time)
+                response_score = 1.0 - (_effective_latency(ep) / max_response_time)
             else:
                 response_score = 1.0
             scores.append(response_score)
@@ -307,42 +498,194 @@ class LoadBalancer:
         return max(endpoints, key=intelligent_score)
 
 class CircuitBreaker:
-    """熔斷器"""
+    """熔斷器（滾動窗口錯誤率）
+    
+    最近 window_seconds 秒的調用按時間分桶統計，請求數達到 minimum_requests
+    且錯誤率達到 error_rate_threshold 時熔斷，連續失敗 failure_threshold 次也會熔斷；
+    recovery_timeout 秒後進入半開狀態，
+    最多放行 half_open_max_calls 個探測請求，探測成功則關閉，失敗則重新熔斷。
+    """
     
-    def __init__(self, failure_threshold: int = 5, recovery_timeout: int = 60):
+    def __init__(self, error_rate_threshold: float = 0.5, minimum_requests: int = 5,
+                 window_seconds: float = 60.0, bucket_count: int = 10,
+                 recovery_timeout: float = 60.0, half_open_max_calls: int = 1,
+                 failure_threshold: int = 5):
+        self.error_rate_threshold = error_rate_threshold
+        self.minimum_requests = minimum_requests
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        
+        self.bucket_count = max(bucket_count, 1)
+        self.bucket_width = window_seconds / self.bucket_count
+        self.bucket_requests = [0] * self.bucket_count
+        self.bucket_failures = [0] * self.bucket_count
+        self.bucket_epochs = [0] * self.bucket_count
+        
         self.failure_count = 0
+        self.consecutive_failures = 0
         self.last_failure_time = None
+        self.opened_at = 0.0
+        self.half_open_calls = 0
         self.state = "CLOSED"  # CLOSED, OPEN, HALF_OPEN
     
+    def _bucket(self) -> int:
+        """當前時間所在的桶，過期的桶先清零"""
+        epoch = int(time.monotonic() / self.bucket_width)
+        index = epoch % self.bucket_count
+        if self.bucket_epochs[index] != epoch:
+            self.bucket_epochs[index] = epoch
+            self.bucket_requests[index] = 0
+            self.bucket_failures[index] = 0
+        return index
+    
+    def _window_totals(self) -> Tuple[int, int]:
+        self._bucket()
+        oldest_epoch = int(time.monotonic() / self.bucket_width) - self.bucket_count + 1
+        requests = failures = 0
+        for index in range(self.bucket_count):
+            if self.bucket_epochs[index] >= oldest_epoch:
+                requests += self.bucket_requests[index]
+                failures += self.bucket_failures[index]
+        return requests, failures
+    
+    def _reset_window(self):
+        self.bucket_requests = [0] * self.bucket_count
+        self.bucket_failures = [0] * self.bucket_count
+    
+    def error_rate(self) -> float:
+        """窗口內錯誤率"""
+        requests, failures = self._window_totals()
+        return failures / requests if requests else 0.0
+    
     def call_allowed(self) -> bool:
         """檢查是否允許調用"""
         if self.state == "CLOSED":
             return True
         elif self.state == "OPEN":
-            if self.last_failure_time and \
-               (datetime.now() - self.last_failure_time).total_seconds() > self.recovery_timeout:
+            if time.monotonic() - self.opened_at > self.recovery_timeout:
                 self.state = "HALF_OPEN"
+                self.half_open_calls = 0
                 return True
             return False
         elif self.state == "HALF_OPEN":
-            return True
+            return self.half_open_calls < self.half_open_max_calls
         
         return False
     
+    def on_call_start(self):
+        """記錄一次放行的調用（半開狀態下佔用探測名額）"""
+        if self.state == "HALF_OPEN":
+            self.half_open_calls += 1
+    
+    def on_call_cancelled(self):
+        """被取消的調用沒有結果，歸還其佔用的探測名額"""
+        if self.state == "HALF_OPEN":
+            self.half_open_calls = max(0, self.half_open_calls - 1)
+    
     def record_success(self):
         """記錄成功"""
-        self.failure_count = 0
-        self.state = "CLOSED"
+        if self.state == "HALF_OPEN":
+            self.state = "CLOSED"
+            self._reset_window()
+        
+        self.consecutive_failures = 0
+        self.bucket_requests[self._bucket()] += 1
+        self.failure_count = self._window_totals()[1]
     
     def record_failure(self):
         """記錄失敗"""
-        self.failure_count += 1
+        index = self._bucket()
+        self.bucket_requests[index] += 1
+        self.bucket_failures[index] += 1
         self.last_failure_time = datetime.now()
+        self.consecutive_failures += 1
         
-        if self.failure_count >= self.failure_threshold:
+        requests, failures = self._window_totals()
+        self.failure_count = failures
+        
+        if self.state == "HALF_OPEN" or self.consecutive_failures >= self.failure_threshold or (
+            requests >= self.minimum_requests and failures / requests >= self.error_rate_threshold
+        ):
             self.state = "OPEN"
+            self.opened_at = time.monotonic()
+            self.half_open_calls = 0
+
+class AdaptiveConcurrencyLimit:
+    """端點自適應併發上限（AIMD）
+    
+    以窗口內最小響應時間作為無排隊延遲的基線：響應時間不超過基線的 tolerance 倍
+    且上限正被使用時，每個成功請求把上限加 1/limit（約每輪加1）；
+    響應變慢或請求失敗時上限乘以 backoff_ratio。
+    """
+    
+    def __init__(self, initial_limit: int = 10, min_limit: int = 1, max_limit: int = 100,
+                 backoff_ratio: float = 0.9, tolerance: float = 2.0, rtt_window: int = 100):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.tolerance = tolerance
+        
+        # 基線延遲每 rtt_window 個樣本重新取最小值，以適應端點性能變化
+        self.rtt_window = rtt_window
+        self.min_rtt = 0.0
+        self.window_min_rtt = float('inf')
+        self.window_samples = 0
+        
+        self.in_flight = 0
+        self.rejected = 0
+    
+    def try_acquire(self) -> bool:
+        """嘗試佔用一個併發名額"""
+        if self.in_flight >= int(self.limit):
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+    
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+    
+    def release(self, response_time: float, success: bool, dropped: bool = False):
+        """
+        釋放併發名額並根據結果調整上限
+        
+        Args:
+            response_time: 響應時間（秒）
+            success: 是否成功
+            dropped: 請求被主動取消（如對沖請求落敗），不作為調整依據
+        """
+        was_saturated = self.in_flight >= self.limit / 2
+        self.in_flight = max(0, self.in_flight - 1)
+        
+        if dropped:
+            return
+        
+        if not success:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            return
+        
+        self.window_min_rtt = min(self.window_min_rtt, response_time)
+        self.window_samples += 1
+        if self.min_rtt <= 0 or self.window_samples >= self.rtt_window:
+            self.min_rtt = self.window_min_rtt
+        if self.window_samples >= self.rtt_window:
+            self.window_min_rtt = float('inf')
+            self.window_samples = 0
+        
+        if response_time > self.min_rtt * self.tolerance:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif was_saturated:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'min_rtt': self.min_rtt,
+            'rejected': self.rejected
+        }
 
 class SmartRoutingEngine:
     """智慧路由引擎"""
@@ -353,11 +696,27 @@ class SmartRoutingEngine:
         
         # 核心組件
         self.load_balancer = LoadBalancer(self.default_strategy)
-        self.performance_tracker = PerformanceTracker(config.get('performance_window', 100))
+        self.performance_tracker = PerformanceTracker(
+            config.get('performance_window', 100),
+            config.get('error_half_life', 300.0)
+        )
         
         # 工具端點管理
         self.tool_endpoints: Dict[str, List[ToolEndpoint]] = {}
         self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.concurrency_limits: Dict[str, AdaptiveConcurrencyLimit] = {}
+        
+        # 按端點URL統計的響應時間，用於長尾感知選擇和對沖延遲
+        self.endpoint_tracker = PerformanceTracker(
+            config.get('performance_window', 100),
+            config.get('error_half_life', 300.0)
+        )
+        
+        # 能力倒排索引: capability -> {tool_id: [endpoint]}，由註冊/取消註冊維護
+        self.capability_index: Dict[str, Dict[str, List[ToolEndpoint]]] = {}
+        
+        # 工具評分緩存，僅在評分輸入（端點、指標、執行結果）變化時失效
+        self.tool_score_cache: Dict[str, float] = {}
         
         # 路由統計
         self.routing_stats = {
@@ -365,7 +724,10 @@ class SmartRoutingEngine:
             'successful_routes': 0,
             'failed_routes': 0,
             'average_decision_time': 0.0,
-            'strategy_usage': {strategy.value: 0 for strategy in RoutingStrategy}
+            'strategy_usage': {strategy.value: 0 for strategy in RoutingStrategy},
+            'executed_requests': 0,
+            'hedged_requests': 0,
+            'hedge_wins': 0
         }
         
         # 配置參數
@@ -374,6 +736,13 @@ class SmartRoutingEngine:
         self.error_rate_threshold = config.get('error_rate_threshold', 0.1)
         self.failover_enabled = config.get('failover_enabled', True)
         
+        # 對沖請求：主請求超過其端點p95仍未返回時，向首個回退工具發送副本
+        self.hedging_enabled = config.get('hedging_enabled', True)
+        self.hedge_delay_default = config.get('hedge_delay', 1.0)  # 秒，樣本不足時使用
+        self.hedge_min_delay = config.get('hedge_min_delay', 0.01)  # 秒
+        self.hedge_min_samples = config.get('hedge_min_samples', 20)
+        self.hedge_budget = config.get('hedge_budget', 0.1)  # 對沖請求佔執行請求的比例上限
+        
         # 回調函數
         self.route_callbacks: List[Callable] = []
         
@@ -390,18 +759,37 @@ class SmartRoutingEngine:
         
         self.tool_endpoints[tool_id].append(endpoint)
         
+        # 更新能力索引
+        for capability in endpoint.capabilities:
+            self.capability_index.setdefault(capability, {}).setdefault(tool_id, []).append(endpoint)
+        self._invalidate_tool_score(tool_id)
+        
         # 創建熔斷器
         if endpoint.endpoint_url not in self.circuit_breakers:
             self.circuit_breakers[endpoint.endpoint_url] = CircuitBreaker(
+                error_rate_threshold=self.config.get('circuit_breaker_error_rate', 0.5),
+                minimum_requests=self.config.get('circuit_breaker_minimum_requests', 10),
                 failure_threshold=self.config.get('circuit_breaker_threshold', 5),
+                window_seconds=self.config.get('circuit_breaker_window', 60),
                 recovery_timeout=self.config.get('circuit_breaker_timeout', 60)
             )
         
+        # 創建自適應併發上限
+        if endpoint.endpoint_url not in self.concurrency_limits:
+            self.concurrency_limits[endpoint.endpoint_url] = AdaptiveConcurrencyLimit(
+                initial_limit=min(self.config.get('initial_concurrency_limit', 10), endpoint.max_connections),
+                min_limit=self.config.get('min_concurrency_limit', 1),
+                max_limit=endpoint.max_connections,
+                backoff_ratio=self.config.get('concurrency_backoff_ratio', 0.9),
+                tolerance=self.config.get('concurrency_latency_tolerance', 2.0)
+            )
+        
         logger.info(f"註冊工具端點: {tool_id} -> {endpoint.endpoint_url}")
     
     def unregister_tool_endpoint(self, tool_id: str, endpoint_url: str):
         """取消註冊工具端點"""
         if tool_id in self.tool_endpoints:
+            removed = [ep for ep in self.tool_endpoints[tool_id] if ep.endpoint_url == endpoint_url]
             self.tool_endpoints[tool_id] = [
                 ep for ep in self.tool_endpoints[tool_id] 
                 if ep.endpoint_url != endpoint_url
@@ -409,6 +797,19 @@ class SmartRoutingEngine:
             
             if not self.tool_endpoints[tool_id]:
                 del self.tool_endpoints[tool_id]
+            
+            # 更新能力索引
+            for endpoint in removed:
+                for capability in endpoint.capabilities:
+                    tools = self.capability_index.get(capability)
+                    if not tools or tool_id not in tools:
+                        continue
+                    tools[tool_id] = [ep for ep in tools[tool_id] if ep.endpoint_url != endpoint_url]
+                    if not tools[tool_id]:
+                        del tools[tool_id]
+                    if not tools:
+                        del self.capability_index[capability]
+            self._invalidate_tool_score(tool_id)
         
         logger.info(f"取消註冊工具端點: {tool_id} -> {endpoint_url}")
     
@@ -457,21 +858,30 @@ class SmartRoutingEngine:
             raise
     
     async def _find_available_tools(self, capability: str) -> List[str]:
-        """查找支持指定能力的可用工具"""
+        """查找支持指定能力的可用工具（只檢查能力索引中的端點）"""
         available_tools = []
         
-        for tool_id, endpoints in self.tool_endpoints.items():
+        for tool_id, endpoints in self.capability_index.get(capability, {}).items():
             # 檢查是否有端點支持該能力
             for endpoint in endpoints:
-                if capability in endpoint.capabilities and endpoint.health != ToolHealth.UNAVAILABLE:
-                    # 檢查熔斷器狀態
-                    circuit_breaker = self.circuit_breakers.get(endpoint.endpoint_url)
-                    if not circuit_breaker or circuit_breaker.call_allowed():
-                        available_tools.append(tool_id)
-                        break
+                if self._endpoint_routable(endpoint):
+                    available_tools.append(tool_id)
+                    break
         
         return available_tools
     
+    def _endpoint_routable(self, endpoint: ToolEndpoint) -> bool:
+        """端點是否可接收新請求：未下線、熔斷器放行且併發上限未滿"""
+        if endpoint.health == ToolHealth.UNAVAILABLE:
+            return False
+        
+        circuit_breaker = self.circuit_breakers.get(endpoint.endpoint_url)
+        if circuit_breaker and not circuit_breaker.call_allowed():
+            return False
+        
+        concurrency_limit = self.concurrency_limits.get(endpoint.endpoint_url)
+        return not concurrency_limit or concurrency_limit.has_capacity()
+    
     def _filter_tools(self, tools: List[str], request: RoutingRequest) -> List[str]:
         """過濾工具"""
         filtered = tools.copy()
@@ -505,8 +915,20 @@ class SmartRoutingEngine:
         
         return evaluated
     
+    def _invalidate_tool_score(self, tool_id: str):
+        """使工具評分緩存失效"""
+        self.tool_score_cache.pop(tool_id, None)
+    
     async def _calculate_tool_score(self, tool_id: str) -> float:
-        """計算工具評分"""
+        """計算工具評分（使用緩存）"""
+        score = self.tool_score_cache.get(tool_id)
+        if score is None:
+            score = self._compute_tool_score(tool_id)
+            self.tool_score_cache[tool_id] = score
+        return score
+    
+    def _compute_tool_score(self, tool_id: str) -> float:
+        """根據端點狀態計算工具評分"""
         if tool_id not in self.tool_endpoints:
             return 0.0
         
@@ -535,7 +957,7 @@ class SmartRoutingEngine:
             load_score = max(0.0, 1.0 - endpoint.load_metrics.cpu_usage / 100.0)
             
             # 響應時間分數
-            response_time_score = max(0.0, 1.0 - endpoint.load_metrics.response_time_avg / self.latency_threshold)
+            response_time_score = max(0.0, 1.0 - _effective_latency(endpoint) / self.latency_threshold)
             
             # 錯誤率分數
             error_rate_score = max(0.0, 1.0 - endpoint.load_metrics.error_rate / self.error_rate_threshold)
@@ -569,7 +991,7 @@ class SmartRoutingEngine:
         best_tool_id, best_score = evaluated_tools[0]
         
         # 獲取最佳端點
-        endpoints = self.tool_endpoints[best_tool_id]
+        endpoints = [ep for ep in self.tool_endpoints[best_tool_id] if self._endpoint_routable(ep)]
         best_endpoint = self.load_balancer.select_endpoint(endpoints, request)
         
         if not best_endpoint:
@@ -633,6 +1055,7 @@ class SmartRoutingEngine:
                     
                     # 更新健康狀態
                     endpoint.health = self._calculate_health_status(metrics)
+                    self._invalidate_tool_score(tool_id)
                     break
     
     def _calculate_health_status(self, metrics: LoadMetrics) -> ToolHealth:
@@ -662,36 +1085,211 @@ class SmartRoutingEngine:
         else:
             return ToolHealth.UNAVAILABLE
     
-    async def record_execution_result(self, tool_id: str, endpoint_url: str, 
-                                    execution_time: float, success: bool):
-        """記錄執行結果"""
-        # 更新性能追蹤
-        self.performance_tracker.record_request(tool_id)
-        self.performance_tracker.record_response_time(tool_id, execution_time)
+    def acquire_endpoint(self, tool_id: str, endpoint_url: str) -> bool:
+        """
+        為一次調用佔用端點的併發名額
         
-        if not success:
-            self.performance_tracker.record_error(tool_id)
+        Args:
+            tool_id: 工具ID
+            endpoint_url: 端點URL
         
-        # 更新熔斷器
+        Returns:
+            是否佔用成功；成功後必須調用 record_execution_result 釋放
+        """
         circuit_breaker = self.circuit_breakers.get(endpoint_url)
+        if circuit_breaker and not circuit_breaker.call_allowed():
+            return False
+        
+        concurrency_limit = self.concurrency_limits.get(endpoint_url)
+        if concurrency_limit and not concurrency_limit.try_acquire():
+            return False
+        
         if circuit_breaker:
-            if success:
-                circuit_breaker.record_success()
-            else:
-                circuit_breaker.record_failure()
+            circuit_breaker.on_call_start()
+        
+        for endpoint in self.tool_endpoints.get(tool_id, []):
+            if endpoint.endpoint_url == endpoint_url:
+                endpoint.current_connections += 1
+                self._invalidate_tool_score(tool_id)
+                break
+        
+        return True
+    
+    async def record_execution_result(self, tool_id: str, endpoint_url: str, 
+                                    execution_time: float, success: bool, cancelled: bool = False):
+        """
+        記錄執行結果
         
-        # 更新端點連接數
+        Args:
+            tool_id: 工具ID
+            endpoint_url: 端點URL
+            execution_time: 執行時間（秒）
+            success: 是否成功
+            cancelled: 調用被主動取消（如對沖落敗），只釋放併發名額和熔斷器探測名額
+        """
+        concurrency_limit = self.concurrency_limits.get(endpoint_url)
+        if concurrency_limit:
+            concurrency_limit.release(execution_time, success, dropped=cancelled)
+        
+        if cancelled:
+            circuit_breaker = self.circuit_breakers.get(endpoint_url)
+            if circuit_breaker:
+                circuit_breaker.on_call_cancelled()
+        else:
+            # 更新性能追蹤
+            self.performance_tracker.record_request(tool_id)
+            self.performance_tracker.record_response_time(tool_id, execution_time)
+            self.endpoint_tracker.record_request(endpoint_url)
+            self.endpoint_tracker.record_response_time(endpoint_url, execution_time)
+            
+            if not success:
+                self.performance_tracker.record_error(tool_id)
+                self.endpoint_tracker.record_error(endpoint_url)
+            
+            # 更新熔斷器
+            circuit_breaker = self.circuit_breakers.get(endpoint_url)
+            if circuit_breaker:
+                if success:
+                    circuit_breaker.record_success()
+                else:
+                    circuit_breaker.record_failure()
+        
+        # 更新端點連接數和實測延遲
         if tool_id in self.tool_endpoints:
             for endpoint in self.tool_endpoints[tool_id]:
                 if endpoint.endpoint_url == endpoint_url:
                     endpoint.current_connections = max(0, endpoint.current_connections - 1)
+                    endpoint.observed_p95 = self.endpoint_tracker.get_p95_response_time(endpoint_url) * 1000
+                    self._invalidate_tool_score(tool_id)
+                    break
+    
+    def _hedge_delay(self, endpoint_url: str) -> float:
+        """對沖延遲（秒）：端點實測p95，樣本不足時使用默認值"""
+        window = self.endpoint_tracker.windows.get(endpoint_url)
+        if not window or window.size < self.hedge_min_samples:
+            return self.hedge_delay_default
+        return max(self.hedge_min_delay, self.endpoint_tracker.get_p95_response_time(endpoint_url))
+    
+    def _acquire_fallback(self, tool_ids: List[str], request: RoutingRequest) -> Optional[Tuple[str, str]]:
+        """在回退工具中選擇並佔用一個端點"""
+        for tool_id in tool_ids:
+            endpoints = [ep for ep in self.tool_endpoints.get(tool_id, []) if self._endpoint_routable(ep)]
+            endpoint = self.load_balancer.select_endpoint(endpoints, request)
+            if endpoint and self.acquire_endpoint(tool_id, endpoint.endpoint_url):
+                return tool_id, endpoint.endpoint_url
+        return None
+    
+    async def execute_request(self, request: RoutingRequest, decision: RoutingDecision,
+                              call: Callable[[str, str], Awaitable[Any]]) -> RoutingResult:
+        """
+        按路由決策執行請求，主請求超過其p95仍未返回時向首個回退工具發送對沖請求
+        
+        Args:
+            request: 路由請求
+            decision: route_request 返回的路由決策
+            call: 實際調用，參數為 (tool_id, endpoint_url)
+        
+        Returns:
+            RoutingResult，decision 指向實際返回結果的工具
+        """
+        start_time = time.time()
+        self.routing_stats['executed_requests'] += 1
+        
+        primary = (decision.target_tool, decision.target_endpoint)
+        if not self.acquire_endpoint(*primary):
+            # 決策後端點已滿或熔斷，直接使用回退工具
+            primary = self._acquire_fallback(decision.fallback_options, request)
+            if primary is None:
+                return RoutingResult(
+                    request_id=request.request_id,
+                    decision=decision,
+                    execution_time=time.time() - start_time,
+                    success=False,
+                    error_message="目標端點及回退工具均無可用併發名額"
+                )
+        
+        attempt_starts: Dict[asyncio.Task, float] = {}
+        
+        async def attempt(target: Tuple[str, str]) -> Any:
+            attempt_start = time.time()
+            try:
+                result = await call(*target)
+            except Exception:
+                await self.record_execution_result(*target, time.time() - attempt_start, False)
+                raise
+            await self.record_execution_result(*target, time.time() - attempt_start, True)
+            return result
+        
+        tasks = {asyncio.create_task(attempt(primary)): primary}
+        attempt_starts.update((task, time.time()) for task in tasks)
+        
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary[1]))
+            
+            hedge_allowed = (
+                self.hedging_enabled and not done and
+                self.routing_stats['hedged_requests'] < self.hedge_budget * self.routing_stats['executed_requests']
+            )
+            if hedge_allowed:
+                fallback_tools = [tool_id for tool_id in decision.fallback_options[:1] if tool_id != primary[0]]
+                hedge = self._acquire_fallback(fallback_tools, request)
+                if hedge:
+                    self.routing_stats['hedged_requests'] += 1
+                    hedge_task = asyncio.create_task(attempt(hedge))
+                    tasks[hedge_task] = hedge
+                    attempt_starts[hedge_task] = time.time()
+                    logger.debug(f"對沖請求: {request.request_id} -> {hedge[0]}")
+            
+            # 取第一個成功的結果；全部失敗時返回最後一個錯誤
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=request.timeout - (time.time() - start_time),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    error = asyncio.TimeoutError(f"請求超時 ({request.timeout}s)")
                     break
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        if winner != primary:
+                            self.routing_stats['hedge_wins'] += 1
+                        return RoutingResult(
+                            request_id=request.request_id,
+                            decision=decision if winner == (decision.target_tool, decision.target_endpoint)
+                            else dataclasses.replace(decision, target_tool=winner[0], target_endpoint=winner[1]),
+                            execution_time=time.time() - start_time,
+                            success=True,
+                            response_data=task.result()
+                        )
+                    error = task.exception()
+            
+            return RoutingResult(
+                request_id=request.request_id,
+                decision=decision,
+                execution_time=time.time() - start_time,
+                success=False,
+                error_message=str(error)
+            )
+        finally:
+            # 取消落敗或超時的請求，只釋放其併發名額
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for task, target in tasks.items():
+                if task.cancelled():
+                    await self.record_execution_result(*target, time.time() - attempt_starts[task], False, cancelled=True)
     
     def get_tool_statistics(self, tool_id: str) -> Dict[str, Any]:
         """獲取工具統計"""
         return {
             'average_response_time': self.performance_tracker.get_average_response_time(tool_id),
+            'p50_response_time': self.performance_tracker.get_p50_response_time(tool_id),
             'p95_response_time': self.performance_tracker.get_p95_response_time(tool_id),
+            'p99_response_time': self.performance_tracker.get_p99_response_time(tool_id),
             'error_rate': self.performance_tracker.get_error_rate(tool_id),
             'throughput': self.performance_tracker.get_throughput(tool_id),
             'request_count': self.performance_tracker.request_counts.get(tool_id, 0),
@@ -747,9 +1345,16 @@ class SmartRoutingEngine:
                 if circuit_breaker:
                     endpoint_status['circuit_breaker'] = {
                         'state': circuit_breaker.state,
-                        'failure_count': circuit_breaker.failure_count
+                        'failure_count': circuit_breaker.failure_count,
+                        'error_rate': circuit_breaker.error_rate()
                     }
                 
+                # 添加併發上限狀態
+                concurrency_limit = self.concurrency_limits.get(endpoint.endpoint_url)
+                if concurrency_limit:
+                    endpoint_status['concurrency_limit'] = concurrency_limit.get_stats()
+                endpoint_status['observed_p95'] = endpoint.observed_p95
+                
                 tool_status['endpoints'].append(endpoint_status)
             
             status[tool_id] = tool_status
@@ -766,7 +1371,11 @@ __all__ = [
     'SmartRoutingEngine',
     'LoadBalancer',
     'PerformanceTracker',
+    'ToolMetricsWindow',
+    'SlidingQuantiles',
+    'P2Quantile',
     'CircuitBreaker',
+    'AdaptiveConcurrencyLimit',
     'ToolEndpoint',
     'RoutingRequest',
     'RoutingDecision',
@@ -7,13 +7,14 @@ import asyncio
 import json
 import logging
 import os
-import aiohttp
 import aiofiles
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from .http_client_manager import get_http_client_manager
+
 # MCP基礎類 - 直接實現
 class MCPComponent:
     """MCP組件基礎類"""
@@ -511,6 +512,7 @@ class LocalModelConnector:
             "max_retries": config.get('model_max_retries', 3),
             "health_check_interval": config.get('health_check_interval', 60)
         }
+        self.http_client = get_http_client_manager(config.get('http_client'))
     
     async def connect_to_local_model(self, model_name: str, endpoint: str, model_type: str = "general", config: Dict = None) -> Dict:
         """連接到端側本地模型"""
@@ -625,24 +627,23 @@ class LocalModelConnector:
     async def _test_model_connection(self, model_config: LocalModelConfig) -> Dict:
         """測試模型連接"""
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=model_config.timeout)) as session:
-                # 發送健康檢查請求
-                health_url = f"{model_config.endpoint}/health"
-                async with session.get(health_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            "healthy": True,
-                            "response_time": response.headers.get('X-Response-Time', 'unknown'),
-                            "model_info": data
-                        }
-                    else:
-                        return {
-                            "healthy": False,
-                            "error": f"HTTP {response.status}",
-                            "response": await response.text()
-                        }
-                        
+            # 發送健康檢查請求
+            health_url = f"{model_config.endpoint}/health"
+            async with self.http_client.get(health_url, timeout=model_config.timeout, max_retries=0) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return {
+                        "healthy": True,
+                        "response_time": response.headers.get('X-Response-Time', 'unknown'),
+                        "model_info": data
+                    }
+                else:
+                    return {
+                        "healthy": False,
+                        "error": f"HTTP {response.status}",
+                        "response": await response.text()
+                    }
+                    
         except asyncio.TimeoutError:
             return {
                 "healthy": False,
@@ -657,14 +658,15 @@ class LocalModelConnector:
     async def _send_model_query(self, model_config: LocalModelConfig, query_data: Dict) -> Dict:
         """發送模型查詢"""
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=model_config.timeout)) as session:
-                query_url = f"{model_config.endpoint}/query"
-                async with session.post(query_url, json=query_data) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        raise Exception(f"查詢失敗: HTTP {response.status} - {await response.text()}")
-                        
+            # 模型查詢不改變服務端狀態，可按配置重試
+            query_url = f"{model_config.endpoint}/query"
+            async with self.http_client.post(query_url, json=query_data, timeout=model_config.timeout,
+                                             max_retries=model_config.max_retries, idempotent=True) as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    raise Exception(f"查詢失敗: HTTP {response.status} - {await response.text()}")
+                    
         except Exception as e:
             raise Exception(f"發送查詢失敗: {e}")
 
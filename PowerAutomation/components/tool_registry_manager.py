@@ -8,11 +8,12 @@ Tool Registration Manager Implementation
 import asyncio
 import json
 import logging
-import aiohttp
-import aiofiles
 import hashlib
+import os
+import time
 import psutil
 import platform
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Set
 from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta
@@ -21,6 +22,9 @@ from pathlib import Path
 import importlib.util
 import subprocess
 import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from .http_client_manager import get_http_client_manager
 
 logger = logging.getLogger(__name__)
 
@@ -98,42 +102,211 @@ class RegistrationResponse:
     configuration: Dict[str, Any] = field(default_factory=dict)
     next_sync_time: Optional[datetime] = None
 
+def _cache_json_default(value: Any) -> Any:
+    """發現緩存的JSON序列化：datetime轉ISO字符串，其它未知類型轉字符串"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
 class ToolDiscovery:
-    """工具發現器"""
+    """工具發現器
+
+    四類工具的發現並發進行：服務端口和API端點在信號量限制下並發探測並使用較短超時，
+    Python/二進制文件的讀取、導入和版本探測在線程池中執行。文件分析結果按
+    路徑 + mtime + 大小緩存，可持久化到 cache_path，重新掃描時未變化的文件直接復用。
+    """
+    
+    CACHE_VERSION = 1
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.discovery_paths = config.get('discovery_paths', [])
         self.auto_discovery = config.get('auto_discovery', True)
         self.scan_interval = config.get('scan_interval', 300)  # 5分鐘
+        self.http_client = get_http_client_manager(config.get('http_client'))
+        
+        # 並發探測和文件分析
+        self.probe_timeout = config.get('probe_timeout', 2.0)  # 秒
+        self.probe_concurrency = config.get('probe_concurrency', 16)
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.get('analysis_workers', 4),
+            thread_name_prefix='tool_discovery'
+        )
+        
+        # 文件分析緩存: "類型:路徑" -> {'mtime', 'size', 'tool'}
+        self.cache_path = config.get('cache_path')
+        self.file_cache: Dict[str, Dict[str, Any]] = self._load_cache()
+        self._cache_dirty = False
+        self._seen_files: Set[str] = set()
+        
+        self.scan_stats = {
+            'files_scanned': 0,
+            'cache_hits': 0,
+            'files_analyzed': 0,
+            'last_scan_duration': 0.0
+        }
         
     async def discover_tools(self) -> List[LocalToolInfo]:
         """發現本地工具"""
         discovered_tools = []
+        start_time = time.time()
+        self._seen_files = set()
+        self.scan_stats.update(files_scanned=0, cache_hits=0, files_analyzed=0)
+        
+        categories = ['Python', '二進制', '服務', 'API']
+        results = await asyncio.gather(
+            self._discover_python_tools(),
+            self._discover_binary_tools(),
+            self._discover_service_tools(),
+            self._discover_api_tools(),
+            return_exceptions=True
+        )
+        
+        for category, result in zip(categories, results):
+            if isinstance(result, Exception):
+                logger.error(f"{category}工具發現失敗: {result}")
+                continue
+            discovered_tools.extend(result)
         
+        # 刪除已不存在的文件的緩存項
+        stale_keys = [key for key in self.file_cache if key not in self._seen_files]
+        for key in stale_keys:
+            del self.file_cache[key]
+        if stale_keys:
+            self._cache_dirty = True
+        await self._save_cache()
+        
+        self.scan_stats['last_scan_duration'] = time.time() - start_time
+        logger.info(
+            f"發現 {len(discovered_tools)} 個本地工具，掃描 {self.scan_stats['files_scanned']} 個文件，"
+            f"緩存命中 {self.scan_stats['cache_hits']}，耗時 {self.scan_stats['last_scan_duration']:.2f}s"
+        )
+        return discovered_tools
+    
+    def close(self):
+        """關閉文件分析線程池"""
+        self.executor.shutdown(wait=False)
+    
+    async def _run_in_executor(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    
+    async def _analyze_files(self, kind: str, files: List[Path], analyze) -> List[LocalToolInfo]:
+        """並發分析一批文件，未變化的文件直接使用緩存"""
+        results = await asyncio.gather(
+            *(self._analyze_file_cached(kind, file_path, analyze) for file_path in files),
+            return_exceptions=True
+        )
+        
+        tools = []
+        for file_path, result in zip(files, results):
+            if isinstance(result, Exception):
+                logger.warning(f"分析{kind}工具失敗 {file_path}: {result}")
+            elif result:
+                tools.append(result)
+        return tools
+    
+    async def _analyze_file_cached(self, kind: str, file_path: Path, analyze) -> Optional[LocalToolInfo]:
         try:
-            # 發現Python工具
-            python_tools = await self._discover_python_tools()
-            discovered_tools.extend(python_tools)
-            
-            # 發現二進制工具
-            binary_tools = await self._discover_binary_tools()
-            discovered_tools.extend(binary_tools)
-            
-            # 發現服務工具
-            service_tools = await self._discover_service_tools()
-            discovered_tools.extend(service_tools)
-            
-            # 發現API工具
-            api_tools = await self._discover_api_tools()
-            discovered_tools.extend(api_tools)
-            
-            logger.info(f"發現 {len(discovered_tools)} 個本地工具")
-            return discovered_tools
-            
+            stat = file_path.stat()
+        except OSError:
+            return None
+        
+        key = f"{kind}:{file_path}"
+        self._seen_files.add(key)
+        self.scan_stats['files_scanned'] += 1
+        
+        entry = self.file_cache.get(key)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            self.scan_stats['cache_hits'] += 1
+            return self._tool_from_cache(entry['tool']) if entry['tool'] else None
+        
+        self.scan_stats['files_analyzed'] += 1
+        tool_info = await self._run_in_executor(analyze, file_path)
+        self.file_cache[key] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'tool': self._tool_to_cache(tool_info) if tool_info else None
+        }
+        self._cache_dirty = True
+        
+        # 返回由緩存重建的對象，保證首次掃描和緩存命中時結果一致
+        return self._tool_from_cache(self.file_cache[key]['tool']) if tool_info else None
+    
+    @staticmethod
+    def _tool_to_cache(tool: LocalToolInfo) -> Dict[str, Any]:
+        data = {
+            'tool_id': tool.tool_id,
+            'name': tool.name,
+            'version': tool.version,
+            'description': tool.description,
+            'tool_type': tool.tool_type,
+            'capabilities': [asdict(cap) for cap in tool.capabilities],
+            'executable_path': tool.executable_path,
+            'dependencies': tool.dependencies,
+            'last_updated': tool.last_updated,
+            'metadata': tool.metadata
+        }
+        # 經JSON往返，使內存中的緩存項與持久化的內容完全一致
+        return json.loads(json.dumps(data, default=_cache_json_default))
+    
+    @staticmethod
+    def _tool_from_cache(data: Dict[str, Any]) -> LocalToolInfo:
+        metadata = dict(data.get('metadata', {}))
+        if isinstance(metadata.get('last_modified'), str):
+            metadata['last_modified'] = datetime.fromisoformat(metadata['last_modified'])
+        
+        return LocalToolInfo(
+            tool_id=data['tool_id'],
+            name=data['name'],
+            version=data['version'],
+            description=data['description'],
+            tool_type=data['tool_type'],
+            capabilities=[ToolCapability(**cap) for cap in data.get('capabilities', [])],
+            executable_path=data.get('executable_path'),
+            dependencies=list(data.get('dependencies', [])),
+            # 保留首次分析的時間，文件未變化時註冊管理器不會重複註冊
+            last_updated=datetime.fromisoformat(data['last_updated']),
+            metadata=metadata
+        )
+    
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        """從 cache_path 加載發現緩存"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.CACHE_VERSION:
+                return {}
+            return data.get('files', {})
         except Exception as e:
-            logger.error(f"工具發現失敗: {e}")
-            return []
+            logger.warning(f"加載工具發現緩存失敗 {self.cache_path}: {e}")
+            return {}
+    
+    async def _save_cache(self):
+        """將發現緩存寫入 cache_path（先寫臨時文件再替換）"""
+        if not self.cache_path or not self._cache_dirty:
+            return
+        
+        payload = json.dumps({'version': self.CACHE_VERSION, 'files': self.file_cache}, ensure_ascii=False)
+        
+        def write():
+            cache_dir = os.path.dirname(os.path.abspath(self.cache_path))
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.cache_path)
+        
+        try:
+            await self._run_in_executor(write)
+            self._cache_dirty = False
+        except Exception as e:
+            logger.warning(f"保存工具發現緩存失敗 {self.cache_path}: {e}")
     
     async def _discover_python_tools(self) -> List[LocalToolInfo]:
         """發現Python工具"""
@@ -144,23 +317,18 @@ class ToolDiscovery:
             if not path_obj.exists():
                 continue
                 
-            # 查找Python模塊
-            for py_file in path_obj.rglob("*.py"):
-                try:
-                    tool_info = await self._analyze_python_tool(py_file)
-                    if tool_info:
-                        tools.append(tool_info)
-                except Exception as e:
-                    logger.warning(f"分析Python工具失敗 {py_file}: {e}")
+            # 查找Python模塊（目錄遍歷同樣放在線程池中，避免阻塞事件循環）
+            py_files = await self._run_in_executor(lambda: list(path_obj.rglob("*.py")))
+            tools.extend(await self._analyze_files('python', py_files, self._analyze_python_tool))
         
         return tools
     
-    async def _analyze_python_tool(self, py_file: Path) -> Optional[LocalToolInfo]:
-        """分析Python工具"""
+    def _analyze_python_tool(self, py_file: Path) -> Optional[LocalToolInfo]:
+        """分析Python工具（在線程池中執行）"""
         try:
             # 讀取文件內容
-            async with aiofiles.open(py_file, 'r', encoding='utf-8') as f:
-                content = await f.read()
+            with open(py_file, 'r', encoding='utf-8') as f:
+                content = f.read()
             
             # 檢查是否包含工具標識
             if not any(marker in content for marker in ['@tool', 'class Tool', 'def process']):
@@ -222,28 +390,28 @@ class ToolDiscovery:
         binary_paths = ['/usr/bin', '/usr/local/bin', '/opt/bin']
         binary_paths.extend(self.discovery_paths)
         
+        def list_executables(path_obj: Path) -> List[Path]:
+            return [
+                binary_file for binary_file in path_obj.iterdir()
+                if binary_file.is_file() and binary_file.stat().st_mode & 0o111
+            ]
+        
         for path in binary_paths:
             path_obj = Path(path)
             if not path_obj.exists():
                 continue
                 
             # 查找可執行文件
-            for binary_file in path_obj.iterdir():
-                if binary_file.is_file() and binary_file.stat().st_mode & 0o111:
-                    try:
-                        tool_info = await self._analyze_binary_tool(binary_file)
-                        if tool_info:
-                            tools.append(tool_info)
-                    except Exception as e:
-                        logger.warning(f"分析二進制工具失敗 {binary_file}: {e}")
+            binary_files = await self._run_in_executor(list_executables, path_obj)
+            tools.extend(await self._analyze_files('binary', binary_files, self._analyze_binary_tool))
         
         return tools
     
-    async def _analyze_binary_tool(self, binary_file: Path) -> Optional[LocalToolInfo]:
-        """分析二進制工具"""
+    def _analyze_binary_tool(self, binary_file: Path) -> Optional[LocalToolInfo]:
+        """分析二進制工具（在線程池中執行）"""
         try:
             # 獲取工具版本信息
-            version_info = await self._get_binary_version(binary_file)
+            version_info = self._get_binary_version(binary_file)
             
             tool_id = f"binary_{binary_file.stem}_{hashlib.md5(str(binary_file).encode()).hexdigest()[:8]}"
             
@@ -277,7 +445,7 @@ class ToolDiscovery:
             logger.warning(f"分析二進制工具失敗 {binary_file}: {e}")
             return None
     
-    async def _get_binary_version(self, binary_file: Path) -> Dict[str, Any]:
+    def _get_binary_version(self, binary_file: Path) -> Dict[str, Any]:
         """獲取二進制工具版本信息"""
         version_info = {}
         
@@ -313,8 +481,6 @@ class ToolDiscovery:
     
     async def _discover_service_tools(self) -> List[LocalToolInfo]:
         """發現服務工具"""
-        tools = []
-        
         # 檢查常見服務端口
         service_ports = [
             (8000, "HTTP服務"),
@@ -325,22 +491,23 @@ class ToolDiscovery:
             (11434, "Ollama服務")
         ]
         
-        for port, description in service_ports:
-            if await self._check_port_open('localhost', port):
-                tool_info = await self._analyze_service_tool(port, description)
-                if tool_info:
-                    tools.append(tool_info)
+        semaphore = asyncio.Semaphore(self.probe_concurrency)
         
-        return tools
+        async def probe(port: int, description: str) -> Optional[LocalToolInfo]:
+            async with semaphore:
+                if not await self._check_port_open('localhost', port):
+                    return None
+                return await self._analyze_service_tool(port, description)
+        
+        results = await asyncio.gather(*(probe(port, description) for port, description in service_ports))
+        return [tool_info for tool_info in results if tool_info]
     
     async def _check_port_open(self, host: str, port: int) -> bool:
         """檢查端口是否開放"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            return result == 0
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.probe_timeout)
+            writer.close()
+            return True
         except Exception:
             return False
     
@@ -386,25 +553,24 @@ class ToolDiscovery:
         service_info = {}
         
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
-                # 嘗試常見的信息端點
-                info_endpoints = ['/', '/health', '/status', '/info', '/version']
-                
-                for info_path in info_endpoints:
-                    try:
-                        async with session.get(f"{endpoint}{info_path}") as response:
-                            if response.status == 200:
-                                content_type = response.headers.get('content-type', '')
-                                if 'application/json' in content_type:
-                                    data = await response.json()
-                                    service_info.update(data)
-                                else:
-                                    text = await response.text()
-                                    service_info['response'] = text[:500]  # 限制長度
-                                break
-                    except Exception:
-                        continue
-                        
+            # 嘗試常見的信息端點
+            info_endpoints = ['/', '/health', '/status', '/info', '/version']
+            
+            for info_path in info_endpoints:
+                try:
+                    async with self.http_client.get(f"{endpoint}{info_path}", timeout=self.probe_timeout, max_retries=0) as response:
+                        if response.status == 200:
+                            content_type = response.headers.get('content-type', '')
+                            if 'application/json' in content_type:
+                                data = await response.json()
+                                service_info.update(data)
+                            else:
+                                text = await response.text()
+                                service_info['response'] = text[:500]  # 限制長度
+                            break
+                except Exception:
+                    continue
+                    
         except Exception as e:
             logger.warning(f"獲取服務信息失敗 {endpoint}: {e}")
         
@@ -412,20 +578,20 @@ class ToolDiscovery:
     
     async def _discover_api_tools(self) -> List[LocalToolInfo]:
         """發現API工具"""
-        tools = []
-        
         # 檢查配置中的API端點
         api_configs = self.config.get('api_endpoints', [])
+        semaphore = asyncio.Semaphore(self.probe_concurrency)
         
-        for api_config in api_configs:
-            try:
-                tool_info = await self._analyze_api_tool(api_config)
-                if tool_info:
-                    tools.append(tool_info)
-            except Exception as e:
-                logger.warning(f"分析API工具失敗 {api_config}: {e}")
+        async def probe(api_config: Dict) -> Optional[LocalToolInfo]:
+            async with semaphore:
+                try:
+                    return await self._analyze_api_tool(api_config)
+                except Exception as e:
+                    logger.warning(f"分析API工具失敗 {api_config}: {e}")
+                    return None
         
-        return tools
+        results = await asyncio.gather(*(probe(api_config) for api_config in api_configs))
+        return [tool_info for tool_info in results if tool_info]
     
     async def _analyze_api_tool(self, api_config: Dict) -> Optional[LocalToolInfo]:
         """分析API工具"""
@@ -470,11 +636,10 @@ class ToolDiscovery:
         api_info = {'available': False}
         
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                async with session.get(endpoint, headers=headers) as response:
-                    api_info['available'] = response.status < 500
-                    api_info['status_code'] = response.status
-                    api_info['response_time'] = response.headers.get('X-Response-Time')
+            async with self.http_client.get(endpoint, headers=headers, timeout=self.probe_timeout, max_retries=0) as response:
+                api_info['available'] = response.status < 500
+                api_info['status_code'] = response.status
+                api_info['response_time'] = response.headers.get('X-Response-Time')
                     
         except Exception as e:
             logger.warning(f"測試API端點失敗 {endpoint}: {e}")
@@ -494,9 +659,15 @@ class ToolRegistryManager:
         # 內部狀態
         self.registered_tools: Dict[str, LocalToolInfo] = {}
         self.discovery = ToolDiscovery(config.get('tool_discovery', {}))
+        self.http_client = get_http_client_manager(config.get('http_client'))
         self.running = False
         self.last_discovery = None
         
+        # 工具變更日誌：按變更順序排列的 工具ID -> 變更版本號，
+        # 增量心跳據此只讀取自上次確認以來變化的工具
+        self.change_version = 0
+        self.tool_changes: "OrderedDict[str, int]" = OrderedDict()
+        
         # 統計信息
         self.stats = {
             'total_discovered': 0,
@@ -522,6 +693,7 @@ class ToolRegistryManager:
         """停止工具註冊管理器"""
         logger.info("停止工具註冊管理器...")
         self.running = False
+        self.discovery.close()
     
     async def discover_and_register_tools(self):
         """發現並註冊工具"""
@@ -563,6 +735,7 @@ class ToolRegistryManager:
                 tool.registration_status = RegistrationStatus.REGISTERED
                 tool.registration_time = datetime.now()
                 self.registered_tools[tool.tool_id] = tool
+                self._mark_tool_changed(tool.tool_id)
                 self.stats['total_registered'] += 1
                 
                 logger.info(f"工具註冊成功: {tool.name} ({tool.tool_id})")
@@ -595,32 +768,32 @@ class ToolRegistryManager:
                 'timestamp': request.timestamp.isoformat()
             }
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-                async with session.post(
-                    f"{self.cloud_endpoint}/api/register/tool",
-                    headers=headers,
-                    json=data
-                ) as response:
+            async with self.http_client.post(
+                f"{self.cloud_endpoint}/api/register/tool",
+                headers=headers,
+                json=data,
+                timeout=30
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    return RegistrationResponse(
+                        success=result.get('success', False),
+                        tool_id=result.get('tool_id', ''),
+                        message=result.get('message', ''),
+                        assigned_endpoints=result.get('assigned_endpoints', []),
+                        configuration=result.get('configuration', {}),
+                        next_sync_time=datetime.fromisoformat(result['next_sync_time']) if result.get('next_sync_time') else None
+                    )
+                else:
+                    error_text = await response.text()
+                    logger.error(f"註冊請求失敗 {response.status}: {error_text}")
+                    return RegistrationResponse(
+                        success=False,
+                        tool_id=request.tool_info.tool_id,
+                        message=f"HTTP {response.status}: {error_text}"
+                    )
                     
-                    if response.status == 200:
-                        result = await response.json()
-                        return RegistrationResponse(
-                            success=result.get('success', False),
-                            tool_id=result.get('tool_id', ''),
-                            message=result.get('message', ''),
-                            assigned_endpoints=result.get('assigned_endpoints', []),
-                            configuration=result.get('configuration', {}),
-                            next_sync_time=datetime.fromisoformat(result['next_sync_time']) if result.get('next_sync_time') else None
-                        )
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"註冊請求失敗 {response.status}: {error_text}")
-                        return RegistrationResponse(
-                            success=False,
-                            tool_id=request.tool_info.tool_id,
-                            message=f"HTTP {response.status}: {error_text}"
-                        )
-                        
         except Exception as e:
             logger.error(f"發送註冊請求失敗: {e}")
             return RegistrationResponse(
@@ -664,6 +837,7 @@ class ToolRegistryManager:
             
             if load_metrics:
                 tool.load_metrics = load_metrics
+            self._mark_tool_changed(tool_id)
             
             # 如果狀態變化顯著，立即同步到雲端
             if status in [ToolStatus.ERROR, ToolStatus.UNAVAILABLE]:
@@ -685,18 +859,18 @@ class ToolRegistryManager:
                 'timestamp': datetime.now().isoformat()
             }
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                async with session.put(
-                    f"{self.cloud_endpoint}/api/tools/{tool.tool_id}/status",
-                    headers=headers,
-                    json=data
-                ) as response:
+            async with self.http_client.put(
+                f"{self.cloud_endpoint}/api/tools/{tool.tool_id}/status",
+                headers=headers,
+                json=data,
+                timeout=10
+            ) as response:
+                
+                if response.status == 200:
+                    logger.debug(f"工具狀態同步成功: {tool.tool_id}")
+                else:
+                    logger.warning(f"工具狀態同步失敗 {tool.tool_id}: {response.status}")
                     
-                    if response.status == 200:
-                        logger.debug(f"工具狀態同步成功: {tool.tool_id}")
-                    else:
-                        logger.warning(f"工具狀態同步失敗 {tool.tool_id}: {response.status}")
-                        
         except Exception as e:
             logger.error(f"同步工具狀態失敗 {tool.tool_id}: {e}")
     
@@ -731,19 +905,19 @@ class ToolRegistryManager:
                 'X-Adapter-ID': self.adapter_id
             }
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
-                async with session.get(
-                    f"{self.cloud_endpoint}/api/sync/tools",
-                    headers=headers
-                ) as response:
+            async with self.http_client.get(
+                f"{self.cloud_endpoint}/api/sync/tools",
+                headers=headers,
+                timeout=15
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    return result.get('tools', [])
+                else:
+                    logger.warning(f"獲取雲端工具列表失敗: {response.status}")
+                    return []
                     
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get('tools', [])
-                    else:
-                        logger.warning(f"獲取雲端工具列表失敗: {response.status}")
-                        return []
-                        
         except Exception as e:
             logger.error(f"獲取雲端工具列表失敗: {e}")
             return []
@@ -764,6 +938,29 @@ class ToolRegistryManager:
             except Exception as e:
                 logger.error(f"定期同步任務失敗: {e}")
     
+    def _mark_tool_changed(self, tool_id: str):
+        """記錄工具變更"""
+        self.change_version += 1
+        self.tool_changes[tool_id] = self.change_version
+        self.tool_changes.move_to_end(tool_id)
+    
+    def get_changed_tools(self, since_version: int) -> List[str]:
+        """
+        獲取指定版本之後變更過的工具ID（耗時與變更數量成正比）
+        
+        Args:
+            since_version: 上次讀取時的 change_version
+        
+        Returns:
+            工具ID列表，已被移除的工具也會包含在內
+        """
+        changed = []
+        for tool_id, version in reversed(self.tool_changes.items()):
+            if version <= since_version:
+                break
+            changed.append(tool_id)
+        return changed
+    
     def get_registered_tools(self) -> List[LocalToolInfo]:
         """獲取已註冊工具列表"""
         return list(self.registered_tools.values())
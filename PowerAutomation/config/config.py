@@ -28,6 +28,10 @@ class PowerAutomationConfig:
         'auto_discovery': True,
         'discovery_interval': 300,  # 秒
         'health_check_interval': 60,  # 秒
+        'health_check_timeout': 5,  # 單個工具探測超時（秒）
+        'health_check_concurrency': 20,  # 同時進行的探測數上限
+        'health_check_jitter': 0.5,  # 健康檢查在間隔內錯開的比例
+        'passive_health_window': 60,  # 窗口內執行成功的工具跳過主動探測（秒）
         'discovery_paths': [
             '/opt/aiengine/mcp',
             '/opt/aiengine/tools',
@@ -48,10 +52,28 @@ class PowerAutomationConfig:
         'max_concurrent_tasks': 20,
         'default_timeout': 30,  # 秒
         'retry_attempts': 2,
-        'execution_modes': ['sequential', 'parallel', 'pipeline'],
-        'default_mode': 'parallel'
+        'execution_modes': ['sequential', 'parallel', 'pipeline', 'dag'],
+        'default_mode': 'parallel',
+        'max_shell_processes': 10,  # 同時運行的Shell子進程上限
+        'max_output_bytes': 1024 * 1024,  # 單個流保留的最大輸出字節數
+        'python_workers': 0,  # 常駐Python工作進程數，0表示不啟用
+        'python_worker_max_calls': 1000  # 工作進程處理多少次調用後輪換
     }
-    
+
+    # 共享HTTP客戶端配置
+    HTTP_CLIENT = {
+        'limit_per_host': 20,  # 每個主機的連接池上限
+        'host_limits': {},  # 按主機覆蓋連接上限，如 {'localhost:11434': 4}
+        'keepalive_timeout': 30,  # 秒
+        'dns_cache_ttl': 300,  # 秒
+        'connect_timeout': 5,  # 秒
+        'total_timeout': 30,  # 秒
+        'max_retries': 2,
+        'backoff_base': 0.1,  # 秒
+        'backoff_max': 2.0,  # 秒
+        'retry_statuses': [502, 503, 504]
+    }
+
     # MCP服務配置
     MCP_SERVICES = [
         {
@@ -12,7 +12,7 @@ import json
 import logging
 import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, AsyncIterator
 from dataclasses import dataclass, asdict
 from enum import Enum
 
@@ -289,12 +289,93 @@ class AgentCore:
         # 使用Action Executor執行
         execution_result = await self.action_executor.execute(
             request=request,
-            tools=tools
+            tools=tools,
+            **self._get_execution_limits(request)
         )
         
         logger.info(f"Execution completed for {request.id}")
         return execution_result
     
+    def _get_execution_limits(self, request: AgentRequest) -> Dict[str, Any]:
+        """
+        獲取取消慢工具的截止時間和quorum
+        
+        請求metadata中的 execution_deadline / execution_quorum 優先於核心配置
+        """
+        return {
+            'deadline': request.metadata.get('execution_deadline', self.config.get('execution_deadline')),
+            'quorum': request.metadata.get('execution_quorum', self.config.get('execution_quorum'))
+        }
+    
+    async def process_request_stream(self, request: AgentRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式處理用戶請求
+        
+        每個工具完成即產出一次部分結果（含增量聚合結果和置信度），
+        最後產出 final=True 且帶有AgentResponse的結果
+        """
+        start_time = time.time()
+        self.active_tasks[request.id] = request
+        self.performance_metrics['total_requests'] += 1
+        response = None
+        
+        try:
+            analysis_result = await self._analyze_requirement(request)
+            selected_tools = await self._select_tools(request, analysis_result)
+            
+            if not self.action_executor:
+                execution_result = await self._execute_with_tools(request, selected_tools)
+            else:
+                execution_result = None
+                async for update in self.action_executor.execute_stream(
+                    request, selected_tools, **self._get_execution_limits(request)
+                ):
+                    if update['final']:
+                        execution_result = update
+                    else:
+                        yield update
+            
+            final_result = await self._evaluate_result(request, execution_result)
+            execution_time = time.time() - start_time
+            
+            response = AgentResponse(
+                request_id=request.id,
+                status=TaskStatus.COMPLETED,
+                result=final_result,
+                execution_time=execution_time,
+                tools_used=selected_tools,
+                confidence=execution_result.get('confidence', 0.8),
+                metadata={
+                    'analysis': analysis_result,
+                    'execution_details': execution_result.get('details', {})
+                }
+            )
+            
+            self.performance_metrics['successful_requests'] += 1
+            self._update_performance_metrics(execution_time, selected_tools)
+            
+        except Exception as e:
+            response = AgentResponse(
+                request_id=request.id,
+                status=TaskStatus.FAILED,
+                error=str(e),
+                execution_time=time.time() - start_time
+            )
+            
+            self.performance_metrics['failed_requests'] += 1
+            logger.error(f"Streaming request {request.id} failed: {e}")
+        
+        finally:
+            if request.id in self.active_tasks:
+                del self.active_tasks[request.id]
+            
+            if response is not None:
+                self.task_history.append(response)
+                if len(self.task_history) > 1000:
+                    self.task_history = self.task_history[-500:]
+        
+        yield {'final': True, 'response': response}
+    
     async def _evaluate_result(self, request: AgentRequest, execution_result: Dict[str, Any]) -> Any:
         """
         結果評估和質量控制
@@ -421,6 +502,12 @@ class AgentCore:
         """獲取任務歷史"""
         recent_history = self.task_history[-limit:] if limit else self.task_history
         return [asdict(response) for response in recent_history]
+    
+    async def shutdown(self):
+        """關閉Agent，停止Action Executor的常駐工作進程和線程池"""
+        if self.action_executor and hasattr(self.action_executor, 'shutdown'):
+            await self.action_executor.shutdown()
+        logger.info("AgentCore shut down")
 
 # 工廠函數
 def create_agent_core(config: Dict[str, Any] = None) -> AgentCore:
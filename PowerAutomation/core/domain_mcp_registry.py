@@ -4,14 +4,17 @@ Domain MCP Registry - 領域MCP註冊表核心實現
 
 import asyncio
 import hashlib
+import pickle
+import sqlite3
+import sys
 import time
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 from abc import ABC, abstractmethod
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 logger = logging.getLogger(__name__)
@@ -99,14 +102,82 @@ class BaseDomainMCP(ABC):
             (current_avg_conf * (total - 1) + confidence) / total
         )
 
+class KeywordAutomaton:
+    """多模式關鍵詞匹配自動機（Aho-Corasick）
+    
+    一次掃描請求文本即可找出所有出現的關鍵詞，耗時只與文本長度和命中數有關，
+    與關鍵詞總數無關；保持子串匹配語義，多詞關鍵詞和中文關鍵詞同樣適用。
+    """
+    
+    def __init__(self):
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.failure: List[int] = [0]
+        self.outputs: List[List[str]] = [[]]
+    
+    def add_keyword(self, keyword: str):
+        """添加關鍵詞（需在build之前調用）"""
+        if not keyword:
+            return
+        
+        node = 0
+        for char in keyword:
+            next_node = self.transitions[node].get(char)
+            if next_node is None:
+                next_node = len(self.transitions)
+                self.transitions[node][char] = next_node
+                self.transitions.append({})
+                self.failure.append(0)
+                self.outputs.append([])
+            node = next_node
+        
+        if keyword not in self.outputs[node]:
+            self.outputs[node].append(keyword)
+    
+    def build(self):
+        """構建失敗指針"""
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.transitions[node].items():
+                queue.append(child)
+                
+                fallback = self.failure[node]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.failure[fallback]
+                target = self.transitions[fallback].get(char, 0)
+                self.failure[child] = target if target != child else 0
+                self.outputs[child] = self.outputs[child] + self.outputs[self.failure[child]]
+    
+    def find_keywords(self, text: str) -> Set[str]:
+        """返回文本中出現的所有關鍵詞"""
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in self.transitions[node]:
+                node = self.failure[node]
+            node = self.transitions[node].get(char, 0)
+            if self.outputs[node]:
+                found.update(self.outputs[node])
+        return found
+
 class DomainRoutingEngine:
-    """領域路由引擎"""
+    """領域路由引擎
+    
+    路由模型在 train_routing_model 中一次性構建：
+    - 關鍵詞：所有領域的關鍵詞編譯進一個Aho-Corasick自動機，關鍵詞反查 (領域, 權重)
+    - TF-IDF：所有領域向量存為一個L2歸一化的稀疏矩陣，一次稀疏矩陣-向量乘積得到全部餘弦相似度
+    因此單次路由的成本不隨註冊領域數線性增長。
+    """
     
     def __init__(self):
         self.domain_embeddings = {}
         self.keyword_mappings = {}
         self.tfidf_vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.domain_vectors = {}
+        self.keyword_automaton = KeywordAutomaton()
+        self.keyword_index: Dict[str, List[Tuple[str, float]]] = {}
+        self.keyword_totals: Dict[str, float] = {}
+        self.domain_ids: List[str] = []
+        self.domain_matrix = None
         self.is_trained = False
     
     async def train_routing_model(self, domain_infos: Dict[str, DomainInfo]):
@@ -116,6 +187,7 @@ class DomainRoutingEngine:
         # 準備訓練數據
         domain_texts = []
         domain_ids = []
+        self.keyword_mappings = {}
         
         for domain_id, info in domain_infos.items():
             # 組合領域描述文本
@@ -132,19 +204,34 @@ class DomainRoutingEngine:
                 for word in capability.lower().split():
                     self.keyword_mappings[domain_id][word] = 0.8
         
-        # 訓練TF-IDF向量化器
+        # 構建關鍵詞自動機和反向索引
+        automaton = KeywordAutomaton()
+        keyword_index: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+        for domain_id, keywords in self.keyword_mappings.items():
+            for keyword, weight in keywords.items():
+                automaton.add_keyword(keyword)
+                keyword_index[keyword].append((domain_id, weight))
+        automaton.build()
+        
+        self.keyword_automaton = automaton
+        self.keyword_index = dict(keyword_index)
+        self.keyword_totals = {
+            domain_id: sum(keywords.values())
+            for domain_id, keywords in self.keyword_mappings.items()
+        }
+        
+        # 訓練TF-IDF向量化器，領域向量以L2歸一化的稀疏矩陣存儲
+        self.domain_ids = domain_ids
+        self.domain_matrix = None
         if domain_texts:
             tfidf_matrix = self.tfidf_vectorizer.fit_transform(domain_texts)
-            
-            # 存儲每個領域的向量
-            for i, domain_id in enumerate(domain_ids):
-                self.domain_vectors[domain_id] = tfidf_matrix[i].toarray()[0]
+            self.domain_matrix = normalize(tfidf_matrix, norm='l2', copy=False).tocsr()
         
         self.is_trained = True
         logger.info(f"Domain路由模型訓練完成，支持 {len(domain_ids)} 個領域")
     
     async def analyze_domain_relevance(self, request: str) -> Dict[str, float]:
-        """分析請求的領域相關性"""
+        """分析請求的領域相關性（只返回相關性非零的領域）"""
         if not self.is_trained:
             logger.warning("路由模型未訓練，返回空結果")
             return {}
@@ -169,42 +256,36 @@ class DomainRoutingEngine:
         return final_scores
     
     async def _analyze_keywords(self, request: str) -> Dict[str, float]:
-        """關鍵詞分析"""
-        scores = {}
-        request_lower = request.lower()
+        """關鍵詞分析（只返回命中關鍵詞的領域）"""
+        raw_scores: Dict[str, float] = defaultdict(float)
         
-        for domain_id, keywords in self.keyword_mappings.items():
-            score = 0
-            matched_keywords = []
-            
-            for keyword, weight in keywords.items():
-                if keyword in request_lower:
-                    score += weight
-                    matched_keywords.append(keyword)
-            
-            # 歸一化分數
-            if keywords:
-                max_possible_score = sum(keywords.values())
+        for keyword in self.keyword_automaton.find_keywords(request.lower()):
+            for domain_id, weight in self.keyword_index.get(keyword, ()):
+                raw_scores[domain_id] += weight
+        
+        # 歸一化分數
+        scores = {}
+        for domain_id, score in raw_scores.items():
+            max_possible_score = self.keyword_totals.get(domain_id, 0)
+            if max_possible_score > 0:
                 scores[domain_id] = min(score / max_possible_score, 1.0)
-            else:
-                scores[domain_id] = 0
         
         return scores
     
     async def _analyze_tfidf_similarity(self, request: str) -> Dict[str, float]:
-        """TF-IDF語義相似度分析"""
-        if not self.domain_vectors:
+        """TF-IDF語義相似度分析（只返回相似度為正的領域）"""
+        if self.domain_matrix is None:
             return {}
         
         try:
-            # 將請求轉換為TF-IDF向量
-            request_vector = self.tfidf_vectorizer.transform([request]).toarray()[0]
+            # 請求向量保持稀疏並歸一化，與領域矩陣的乘積即為餘弦相似度
+            request_vector = normalize(self.tfidf_vectorizer.transform([request]), norm='l2')
+            similarities = (self.domain_matrix @ request_vector.T).tocoo()
             
             scores = {}
-            for domain_id, domain_vector in self.domain_vectors.items():
-                # 計算餘弦相似度
-                similarity = cosine_similarity([request_vector], [domain_vector])[0][0]
-                scores[domain_id] = max(0, similarity)  # 確保非負
+            for row, similarity in zip(similarities.row, similarities.data):
+                if similarity > 0:
+                    scores[self.domain_ids[row]] = float(similarity)
             
             return scores
         
@@ -215,13 +296,20 @@ class DomainRoutingEngine:
 class DomainMCPRegistry:
     """領域MCP註冊表"""
     
-    def __init__(self):
+    def __init__(self, cache_config: Optional[Dict] = None):
         self.domain_mcps = {}
         self.domain_infos = {}
         self.routing_engine = DomainRoutingEngine()
         self.performance_monitor = DomainPerformanceMonitor()
-        self.result_cache = DomainResultCache()
+        self.result_cache = DomainResultCache(**(cache_config or {}))
         self.parallel_processor = ParallelDomainProcessor()
+        
+        # 進行中的領域計算: (domain_id, request_hash) -> Future，相同請求的並發未命中共享同一次計算
+        self.inflight_requests: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.coalescing_stats = {
+            'leader_requests': 0,
+            'coalesced_requests': 0
+        }
     
     async def register_domain_mcp(self, domain_info: DomainInfo, mcp_instance: BaseDomainMCP):
         """註冊領域MCP"""
@@ -286,16 +374,12 @@ class DomainMCPRegistry:
             else:
                 uncached_matches.append(match)
         
-        # 3. 並行處理未緩存的請求
+        # 3. 並行處理未緩存的請求（single-flight：已有相同計算在進行時直接等待其結果）
         new_results = []
         if uncached_matches:
-            new_results = await self.parallel_processor.process_domains_parallel(
-                request, uncached_matches, context or {}
+            new_results = await self._process_uncached_matches(
+                request, request_hash, uncached_matches, context or {}
             )
-            
-            # 緩存新結果
-            for result in new_results:
-                await self.result_cache.cache_result(request_hash, result.domain_id, result)
         
         # 4. 合併結果
         all_results = cached_results + new_results
@@ -311,16 +395,69 @@ class DomainMCPRegistry:
         
         return all_results
     
+    async def _process_uncached_matches(self, request: str, request_hash: str,
+                                        matches: List[DomainMatch], context: Dict) -> List[DomainResult]:
+        """
+        處理未命中緩存的領域，合併相同 (領域, 請求哈希) 的並發計算
+        
+        首個到達的請求負責調用Domain MCP並寫入緩存，其後到達的請求等待同一個Future。
+        """
+        loop = asyncio.get_running_loop()
+        owned: Dict[str, asyncio.Future] = {}
+        waiting: List[asyncio.Future] = []
+        owned_matches = []
+        
+        for match in matches:
+            flight_key = (match.domain_id, request_hash)
+            future = self.inflight_requests.get(flight_key)
+            if future is not None:
+                waiting.append(future)
+                self.coalescing_stats['coalesced_requests'] += 1
+            else:
+                future = loop.create_future()
+                self.inflight_requests[flight_key] = future
+                owned[match.domain_id] = future
+                owned_matches.append(match)
+                self.coalescing_stats['leader_requests'] += 1
+        
+        new_results = []
+        if owned_matches:
+            try:
+                new_results = await self.parallel_processor.process_domains_parallel(
+                    request, owned_matches, context
+                )
+                
+                # 緩存新結果（先寫緩存再喚醒等待者，之後到達的請求直接命中緩存）
+                for result in new_results:
+                    await self.result_cache.cache_result(request_hash, result.domain_id, result)
+                    if result.domain_id in owned and not owned[result.domain_id].done():
+                        owned[result.domain_id].set_result(result)
+            finally:
+                # 失敗或被取消的領域以None通知等待者
+                for domain_id, future in owned.items():
+                    if not future.done():
+                        future.set_result(None)
+                    self.inflight_requests.pop((domain_id, request_hash), None)
+        
+        if waiting:
+            shared_results = await asyncio.gather(*(asyncio.shield(future) for future in waiting))
+            new_results.extend(result for result in shared_results if result is not None)
+        
+        return new_results
+    
     def _generate_request_hash(self, request: str) -> str:
-        """生成請求哈希"""
-        return hashlib.md5(request.encode('utf-8')).hexdigest()
+        """生成請求哈希（忽略首尾及重複空白，使僅空白不同的請求共享緩存和計算）"""
+        normalized = " ".join(request.split())
+        return hashlib.md5(normalized.encode('utf-8')).hexdigest()
     
     async def get_registry_status(self) -> Dict:
         """獲取註冊表狀態"""
         status = {
             'total_domains': len(self.domain_mcps),
             'domains': {},
-            'routing_engine_trained': self.routing_engine.is_trained
+            'routing_engine_trained': self.routing_engine.is_trained,
+            'inflight_requests': len(self.inflight_requests),
+            'coalescing_stats': dict(self.coalescing_stats)
         }
         
         for domain_id, domain_data in self.domain_mcps.items():
@@ -397,33 +534,117 @@ class ParallelDomainProcessor:
                 match.mcp_instance.update_metrics(processing_time, match.confidence, False)
                 raise e
 
+class ExpiryTimerWheel:
+    """哈希時間輪，用於主動過期緩存項
+    
+    每個槽位保存在該時刻到期的鍵；推進時只處理經過的槽位，
+    過期成本與實際到期的條目數成正比，不需要掃描整個緩存。
+    """
+    
+    def __init__(self, resolution: float = 1.0, num_slots: int = 512):
+        self.resolution = resolution
+        self.num_slots = num_slots
+        self.slots: List[Dict[str, int]] = [{} for _ in range(num_slots)]
+        self.current_tick = self._tick_of(time.time())
+    
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp / self.resolution)
+    
+    def schedule(self, key: str, expires_at: float):
+        """安排鍵在expires_at過期"""
+        tick = max(self._tick_of(expires_at), self.current_tick + 1)
+        self.slots[tick % self.num_slots][key] = tick
+    
+    def cancel(self, key: str, expires_at: float):
+        """取消已安排的過期"""
+        tick = max(self._tick_of(expires_at), self.current_tick + 1)
+        self.slots[tick % self.num_slots].pop(key, None)
+    
+    def advance(self, now: float) -> List[str]:
+        """推進時間輪到now，返回已到期的鍵"""
+        target_tick = self._tick_of(now)
+        expired = []
+        
+        # 落後超過一圈時每個槽位只需處理一次
+        ticks = range(self.current_tick + 1, target_tick + 1)
+        if len(ticks) > self.num_slots:
+            ticks = range(target_tick - self.num_slots + 1, target_tick + 1)
+        
+        for tick in ticks:
+            slot = self.slots[tick % self.num_slots]
+            due = [key for key, key_tick in slot.items() if key_tick <= target_tick]
+            for key in due:
+                del slot[key]
+            expired.extend(due)
+        
+        self.current_tick = max(self.current_tick, target_tick)
+        return expired
+
 class DomainResultCache:
-    """領域結果緩存"""
+    """領域結果緩存
+    
+    內存層為有界LRU：同時受條目數和近似字節數約束，超限時淘汰最久未使用的條目；
+    TTL到期由時間輪主動清理。可選的SQLite磁盤層作為第二級緩存，進程重啟後仍然有效。
+    """
     
-    def __init__(self, cache_ttl: int = 3600):  # 1小時緩存
-        self.cache = {}
+    def __init__(self, cache_ttl: int = 3600, max_entries: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024, disk_path: Optional[str] = None):  # 1小時緩存
+        self.cache: "OrderedDict[str, Dict]" = OrderedDict()
         self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.timer_wheel = ExpiryTimerWheel()
         self.cache_stats = {
             'hits': 0,
             'misses': 0,
-            'evictions': 0
+            'evictions': 0,
+            'expirations': 0,
+            'disk_hits': 0
         }
+        self.domain_stats = defaultdict(lambda: {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        })
+        
+        # 磁盤二級緩存
+        self.disk_path = disk_path
+        self.disk_connection = None
+        self._last_disk_purge = time.time()
+        if disk_path:
+            self._initialize_disk_tier(disk_path)
     
     async def get_cached_result(self, request_hash: str, domain_id: str) -> Optional[DomainResult]:
         """獲取緩存結果"""
+        now = time.time()
+        self._expire_due(now)
         cache_key = f"{domain_id}:{request_hash}"
         
-        if cache_key in self.cache:
-            cached_item = self.cache[cache_key]
-            if time.time() - cached_item['timestamp'] < self.cache_ttl:
-                self.cache_stats['hits'] += 1
+        cached_item = self.cache.get(cache_key)
+        if cached_item:
+            if now < cached_item['expires_at']:
+                self.cache.move_to_end(cache_key)
+                self._record_hit(domain_id)
                 return cached_item['result']
             else:
                 # 緩存過期，刪除
-                del self.cache[cache_key]
-                self.cache_stats['evictions'] += 1
+                self._remove(cache_key)
+                self.cache_stats['expirations'] += 1
+                self.domain_stats[domain_id]['expirations'] += 1
+        
+        # 內存未命中時查詢磁盤層，命中後提升回內存
+        disk_item = self._load_from_disk(cache_key, now)
+        if disk_item:
+            result, timestamp, expires_at, size = disk_item
+            self._store(cache_key, domain_id, result, timestamp, expires_at, size)
+            self.cache_stats['disk_hits'] += 1
+            self._record_hit(domain_id)
+            return result
         
         self.cache_stats['misses'] += 1
+        self.domain_stats[domain_id]['misses'] += 1
         return None
     
     async def cache_result(self, request_hash: str, domain_id: str, result: DomainResult):
@@ -432,22 +653,168 @@ class DomainResultCache:
         if hasattr(result, 'cache_enabled') and not result.cache_enabled:
             return
         
+        now = time.time()
+        self._expire_due(now)
+        
         cache_key = f"{domain_id}:{request_hash}"
-        self.cache[cache_key] = {
-            'result': result,
-            'timestamp': time.time()
-        }
+        payload = self._serialize(result)
+        size = len(payload) if payload is not None else sys.getsizeof(result)
+        
+        if size > self.max_bytes:
+            logger.debug(f"緩存結果過大，跳過緩存: {cache_key} ({size} bytes)")
+            return
+        
+        expires_at = now + self.cache_ttl
+        self._store(cache_key, domain_id, result, now, expires_at, size)
+        
+        if payload is not None:
+            self._save_to_disk(cache_key, domain_id, payload, now, expires_at)
     
     def get_cache_stats(self) -> Dict:
         """獲取緩存統計"""
         total_requests = self.cache_stats['hits'] + self.cache_stats['misses']
         hit_rate = self.cache_stats['hits'] / total_requests if total_requests > 0 else 0
         
+        domains = {}
+        for domain_id, stats in self.domain_stats.items():
+            domain_requests = stats['hits'] + stats['misses']
+            domains[domain_id] = dict(
+                stats,
+                hit_rate=stats['hits'] / domain_requests if domain_requests > 0 else 0
+            )
+        
         return {
             'hit_rate': hit_rate,
             'total_entries': len(self.cache),
-            'stats': self.cache_stats
+            'total_bytes': self.total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'disk_entries': self._count_disk_entries(),
+            'stats': self.cache_stats,
+            'domains': domains
         }
+    
+    def close(self):
+        """關閉磁盤層連接"""
+        if self.disk_connection:
+            self.disk_connection.close()
+            self.disk_connection = None
+    
+    def _record_hit(self, domain_id: str):
+        self.cache_stats['hits'] += 1
+        self.domain_stats[domain_id]['hits'] += 1
+    
+    def _store(self, cache_key: str, domain_id: str, result: DomainResult,
+               timestamp: float, expires_at: float, size: int):
+        """寫入內存層並按容量淘汰"""
+        if cache_key in self.cache:
+            self._remove(cache_key)
+        
+        self.cache[cache_key] = {
+            'result': result,
+            'domain_id': domain_id,
+            'timestamp': timestamp,
+            'expires_at': expires_at,
+            'size': size
+        }
+        self.total_bytes += size
+        self.timer_wheel.schedule(cache_key, expires_at)
+        
+        # LRU淘汰：OrderedDict頭部為最久未使用
+        while self.cache and (len(self.cache) > self.max_entries or self.total_bytes > self.max_bytes):
+            evicted_key, evicted_item = next(iter(self.cache.items()))
+            self._remove(evicted_key)
+            self.cache_stats['evictions'] += 1
+            self.domain_stats[evicted_item['domain_id']]['evictions'] += 1
+    
+    def _remove(self, cache_key: str) -> Optional[Dict]:
+        cached_item = self.cache.pop(cache_key, None)
+        if cached_item:
+            self.total_bytes -= cached_item['size']
+            self.timer_wheel.cancel(cache_key, cached_item['expires_at'])
+        return cached_item
+    
+    def _expire_due(self, now: float):
+        """推進時間輪，主動清理到期條目"""
+        for cache_key in self.timer_wheel.advance(now):
+            cached_item = self.cache.get(cache_key)
+            if cached_item and cached_item['expires_at'] <= now:
+                self._remove(cache_key)
+                self.cache_stats['expirations'] += 1
+                self.domain_stats[cached_item['domain_id']]['expirations'] += 1
+        
+        # 磁盤層按TTL週期性清理
+        if self.disk_connection and now - self._last_disk_purge > self.timer_wheel.resolution * 60:
+            self._last_disk_purge = now
+            try:
+                with self.disk_connection:
+                    self.disk_connection.execute("DELETE FROM domain_result_cache WHERE expires_at <= ?", (now,))
+            except sqlite3.Error as e:
+                logger.warning(f"清理磁盤緩存失敗: {e}")
+    
+    def _serialize(self, result: DomainResult) -> Optional[bytes]:
+        """序列化結果，用於大小估算和磁盤層"""
+        try:
+            return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+    
+    def _initialize_disk_tier(self, disk_path: str):
+        try:
+            self.disk_connection = sqlite3.connect(disk_path)
+            self.disk_connection.execute("PRAGMA journal_mode=WAL")
+            self.disk_connection.execute("PRAGMA synchronous=NORMAL")
+            self.disk_connection.execute("""
+                CREATE TABLE IF NOT EXISTS domain_result_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    domain_id TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self.disk_connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_domain_result_cache_expires ON domain_result_cache(expires_at)"
+            )
+            self.disk_connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"磁盤緩存初始化失敗，僅使用內存緩存: {e}")
+            self.disk_connection = None
+    
+    def _save_to_disk(self, cache_key: str, domain_id: str, payload: bytes, timestamp: float, expires_at: float):
+        if not self.disk_connection:
+            return
+        try:
+            with self.disk_connection:
+                self.disk_connection.execute(
+                    "INSERT OR REPLACE INTO domain_result_cache VALUES (?, ?, ?, ?, ?)",
+                    (cache_key, domain_id, payload, timestamp, expires_at)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"寫入磁盤緩存失敗: {e}")
+    
+    def _load_from_disk(self, cache_key: str, now: float) -> Optional[Tuple[DomainResult, float, float, int]]:
+        if not self.disk_connection:
+            return None
+        try:
+            row = self.disk_connection.execute(
+                "SELECT payload, created_at, expires_at FROM domain_result_cache WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, now)
+            ).fetchone()
+            if not row:
+                return None
+            return pickle.loads(row[0]), row[1], row[2], len(row[0])
+        except Exception as e:
+            logger.warning(f"讀取磁盤緩存失敗: {e}")
+            return None
+    
+    def _count_disk_entries(self) -> int:
+        if not self.disk_connection:
+            return 0
+        try:
+            return self.disk_connection.execute("SELECT COUNT(*) FROM domain_result_cache").fetchone()[0]
+        except sqlite3.Error:
+            return 0
 
 class DomainPerformanceMonitor:
     """Domain MCP性能監控"""
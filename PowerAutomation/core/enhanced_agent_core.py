@@ -17,7 +17,7 @@ from .agent_core import AgentCore, AgentRequest, AgentResponse, Priority, TaskSt
 from ..tools.enhanced_tool_registry import EnhancedToolRegistry
 
 # 導入Action Executor
-from ..actions.action_executor import ActionExecutor
+from ..actions.action_executor import ActionExecutor, ExecutionMode
 
 logger = logging.getLogger(__name__)
 
@@ -340,7 +340,8 @@ class EnhancedAgentCore(AgentCore):
             execution_result = await self.action_executor.execute(
                 request=request,
                 tools=selected_tools,
-                mode=self._determine_execution_mode(tool_selection)
+                mode=self._determine_execution_mode(tool_selection),
+                **self._get_execution_limits(request)
             )
             
             return {
@@ -359,16 +360,15 @@ class EnhancedAgentCore(AgentCore):
                 'execution_method': 'failed'
             }
     
-    def _determine_execution_mode(self, tool_selection: Dict[str, Any]) -> str:
+    def _determine_execution_mode(self, tool_selection: Dict[str, Any]) -> ExecutionMode:
         """確定執行模式"""
         tools_count = len(tool_selection['selected_tools'])
         
-        if tools_count == 1:
-            return 'single'
-        elif tools_count <= 3:
-            return 'parallel'
+        # 單個工具時並行與順序等價，統一走並行以支持截止時間
+        if tools_count <= 3:
+            return ExecutionMode.PARALLEL
         else:
-            return 'sequential'
+            return ExecutionMode.SEQUENTIAL
     
     async def _evaluate_and_optimize_result(self, execution_result: Dict[str, Any]) -> Dict[str, Any]:
         """評估和優化結果"""
@@ -117,6 +117,40 @@ async def register_domain_mcps():
     
     logger.info(f"✅ 已註冊 {len(domain_registry.domain_mcps)} 個Domain MCP")
 
+def format_classification_result(result) -> Dict[str, Any]:
+    """格式化分類結果"""
+    return {
+        "primary_domain": result.primary_domain,
+        "confidence": result.confidence,
+        "secondary_domains": result.secondary_domains,
+        "reasoning": result.reasoning,
+        "expert_insights": result.expert_insights
+    }
+
+def format_processing_results(results: List[DomainResult]) -> Dict[str, Any]:
+    """格式化領域處理結果"""
+    formatted_results = []
+    for result in results:
+        formatted_results.append({
+            "domain_id": result.domain_id,
+            "result_type": result.result_type,
+            "content": result.content,
+            "confidence": result.confidence,
+            "processing_time": result.processing_time,
+            "recommendations": result.recommendations,
+            "metadata": result.metadata
+        })
+    
+    return {
+        "results": formatted_results,
+        "total_domains": len(formatted_results),
+        "processing_summary": {
+            "avg_confidence": sum(r.confidence for r in results) / len(results) if results else 0,
+            "total_processing_time": sum(r.processing_time for r in results),
+            "domains_involved": [r.domain_id for r in results]
+        }
+    }
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """健康檢查"""
@@ -152,13 +186,7 @@ def classify_request():
         )
         loop.close()
         
-        return jsonify({
-            "primary_domain": result.primary_domain,
-            "confidence": result.confidence,
-            "secondary_domains": result.secondary_domains,
-            "reasoning": result.reasoning,
-            "expert_insights": result.expert_insights
-        })
+        return jsonify(format_classification_result(result))
         
     except Exception as e:
         logger.error(f"分類請求失敗: {e}")
@@ -186,28 +214,7 @@ def process_request():
         )
         loop.close()
         
-        # 格式化結果
-        formatted_results = []
-        for result in results:
-            formatted_results.append({
-                "domain_id": result.domain_id,
-                "result_type": result.result_type,
-                "content": result.content,
-                "confidence": result.confidence,
-                "processing_time": result.processing_time,
-                "recommendations": result.recommendations,
-                "metadata": result.metadata
-            })
-        
-        return jsonify({
-            "results": formatted_results,
-            "total_domains": len(formatted_results),
-            "processing_summary": {
-                "avg_confidence": sum(r.confidence for r in results) / len(results) if results else 0,
-                "total_processing_time": sum(r.processing_time for r in results),
-                "domains_involved": [r.domain_id for r in results]
-            }
-        })
+        return jsonify(format_processing_results(results))
         
     except Exception as e:
         logger.error(f"處理請求失敗: {e}")
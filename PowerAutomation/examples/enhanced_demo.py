@@ -366,7 +366,11 @@ async def quick_monitor(target: str = "system", environment: str = 'development'
 async def main():
     """主演示程序"""
     demo = EnhancedAgentDemo()
-    await demo.run_complete_demo()
+    try:
+        await demo.run_complete_demo()
+    finally:
+        if demo.agent_core:
+            await demo.agent_core.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
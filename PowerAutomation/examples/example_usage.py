@@ -86,6 +86,10 @@ class SimplifiedAgent:
             'executor_stats': self.action_executor.get_executor_stats()
         }
     
+    async def shutdown(self):
+        """關閉Agent並釋放執行資源"""
+        await self.agent_core.shutdown()
+    
     async def health_check(self) -> Dict[str, Any]:
         """執行健康檢查"""
         await self.tool_registry.health_check_all()
@@ -168,6 +172,8 @@ async def example_basic_usage():
     
     monitor_result = await agent.monitor("檢查服務健康狀態")
     print(f"監控結果: {monitor_result['result']}")
+    
+    await agent.shutdown()
 
 async def example_advanced_usage():
     """高級使用示例"""
@@ -200,6 +206,8 @@ async def example_advanced_usage():
     )
     
     print(f"優化結果: {result}")
+    
+    await agent.shutdown()
 
 async def example_monitoring_and_health():
     """監控和健康檢查示例"""
@@ -217,6 +225,8 @@ async def example_monitoring_and_health():
     health = await agent.health_check()
     print(f"系統健康: {health['healthy']}")
     print(f"工具可用性: {health['available_tools']}/{health['total_tools']}")
+    
+    await agent.shutdown()
 
 async def example_batch_processing():
     """批量處理示例"""
@@ -240,6 +250,8 @@ async def example_batch_processing():
     print("批量處理結果:")
     for i, result in enumerate(results):
         print(f"  {i+1}. {requests[i]}: {'成功' if result['success'] else '失敗'}")
+    
+    await agent.shutdown()
 
 async def example_error_handling():
     """錯誤處理示例"""
@@ -262,6 +274,8 @@ async def example_error_handling():
             
     except Exception as e:
         print(f"異常處理: {e}")
+    
+    await agent.shutdown()
 
 async def example_custom_workflow():
     """自定義工作流示例"""
@@ -293,6 +307,8 @@ async def example_custom_workflow():
     print(f"  執行時間: {result['execution_time']:.2f}s")
     print(f"  置信度: {result['confidence']:.2%}")
     print(f"  使用工具: {', '.join(result['tools_used'])}")
+    
+    await agent.shutdown()
 
 # 主函數
 async def main():
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+MCP服務器壓測腳本
+MCP Server Load Test
+
+以固定並發向一個或多個服務地址發送請求，比較吞吐量（requests/sec）和延遲，
+用於對比Flask版本與ASGI版本（asgi_server.py）的服務能力。
+
+用法:
+    python examples/server_load_test.py --target flask=http://localhost:5002 --target asgi=http://localhost:5012
+    python examples/server_load_test.py --target asgi=http://localhost:5000 --path /api/classify --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import aiohttp
+
+async def run_load(base_url: str, path: str, payload: Dict, requests: int,
+                   concurrency: int, timeout: float) -> Dict[str, float]:
+    """對單個服務地址執行壓測"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    next_index = 0
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+
+        async def worker():
+            nonlocal next_index
+            while next_index < requests:
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    async with session.post(f"{base_url}{path}", json=payload) as response:
+                        await response.read()
+                        statuses[response.status] += 1
+                except Exception as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - start)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_time = time.perf_counter() - wall_start
+
+    latencies.sort()
+    succeeded = statuses.get(200, 0)
+    return {
+        'requests': len(latencies),
+        'succeeded': succeeded,
+        'rps': succeeded / wall_time if wall_time > 0 else 0.0,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        'p95_ms': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000 if latencies else 0.0,
+        'statuses': dict(statuses)
+    }
+
+def parse_target(value: str) -> Tuple[str, str]:
+    name, _, url = value.partition('=')
+    if not url:
+        return value, value
+    return name, url.rstrip('/')
+
+async def main():
+    parser = argparse.ArgumentParser(description="MCP服務器吞吐量對比壓測")
+    parser.add_argument("--target", action="append", required=True, help="name=url，可指定多次")
+    parser.add_argument("--path", default="/api/process", help="請求路徑")
+    parser.add_argument("--request", default="請分析保險業數位轉型的趨勢和挑戰", help="請求內容")
+    parser.add_argument("--requests", type=int, default=500, help="每個目標的請求總數")
+    parser.add_argument("--concurrency", type=int, default=32, help="並發數")
+    parser.add_argument("--timeout", type=float, default=60.0, help="單個請求超時（秒）")
+    args = parser.parse_args()
+
+    payload = {'request': args.request}
+    print(f"{'target':>12} | {'ok':>6} {'req/s':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} | statuses")
+    print("-" * 90)
+
+    for target in args.target:
+        name, url = parse_target(target)
+        result = await run_load(url, args.path, payload, args.requests, args.concurrency, args.timeout)
+        print(f"{name:>12} | {result['succeeded']:>6} {result['rps']:>8.1f} {result['mean_ms']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} | {json.dumps(result['statuses'])}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,13 +6,14 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import asyncio
-import aiohttp
 import json
 import logging
 import time
 import os
 from typing import List, Dict, Any
 
+from components.http_client_manager import get_http_client_manager, close_http_client_manager
+
 # 完全動態MCP核心
 class FullyDynamicMCP:
     """完全動態MCP - 零硬編碼"""
@@ -21,6 +22,8 @@ class FullyDynamicMCP:
         self.llm_config = llm_config
         self.request_count = 0
         self.performance_metrics = {}
+        self.http_client = get_http_client_manager()
+        self.llm_timeout = llm_config.get("timeout", 120)
     
     async def call_llm(self, prompt: str, system_prompt: str = "") -> str:
         """調用大模型API"""
@@ -53,13 +56,12 @@ class FullyDynamicMCP:
                 "stream": False
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("response", "無回應")
-                    else:
-                        return f"Ollama API錯誤: {response.status}"
+            async with self.http_client.post(url, json=payload, timeout=self.llm_timeout) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result.get("response", "無回應")
+                else:
+                    return f"Ollama API錯誤: {response.status}"
                         
         except Exception as e:
             return f"Ollama調用失敗: {str(e)}"
@@ -81,13 +83,12 @@ class FullyDynamicMCP:
                 ]
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result["choices"][0]["message"]["content"]
-                    else:
-                        return f"OpenAI API錯誤: {response.status}"
+            async with self.http_client.post(url, headers=headers, json=payload, timeout=self.llm_timeout) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result["choices"][0]["message"]["content"]
+                else:
+                    return f"OpenAI API錯誤: {response.status}"
                         
         except Exception as e:
             return f"OpenAI調用失敗: {str(e)}"
@@ -407,7 +408,8 @@ llm_config = {
     "provider": os.getenv("LLM_PROVIDER", "mock"),  # mock, ollama, openai, claude
     "model": os.getenv("LLM_MODEL", "llama3"),
     "api_key": os.getenv("LLM_API_KEY", ""),
-    "base_url": os.getenv("LLM_BASE_URL", "http://localhost:11434")
+    "base_url": os.getenv("LLM_BASE_URL", "http://localhost:11434"),
+    "timeout": float(os.getenv("LLM_TIMEOUT", "120"))
 }
 
 dynamic_mcp = FullyDynamicMCP(llm_config)
@@ -439,6 +441,7 @@ def process_request():
         
         result = loop.run_until_complete(dynamic_mcp.process(user_input))
         
+        loop.run_until_complete(close_http_client_manager())
         loop.close()
         
         return jsonify(result)
@@ -462,6 +465,7 @@ def cloud_search():
         
         result = loop.run_until_complete(dynamic_mcp.cloud_search_mcp(user_input))
         
+        loop.run_until_complete(close_http_client_manager())
         loop.close()
         
         return jsonify(result)
@@ -488,6 +492,7 @@ def identify_domains():
             dynamic_mcp.identify_domains(user_input, context)
         )
         
+        loop.run_until_complete(close_http_client_manager())
         loop.close()
         
         return jsonify({
@@ -511,6 +516,7 @@ def get_status():
             "base_url": llm_config["base_url"]
         },
         "performance_metrics": dynamic_mcp.performance_metrics,
+        "http_client": dynamic_mcp.http_client.get_metrics(),
         "total_requests": dynamic_mcp.request_count,
         "features": [
             "cloud_search_mcp",
@@ -544,6 +550,7 @@ def demo_request():
         result["demo_type"] = demo_type
         result["demo_request"] = user_input
         
+        loop.run_until_complete(close_http_client_manager())
         loop.close()
         
         return jsonify(result)
@@ -6,6 +6,7 @@ Enhanced Simplified Agent Architecture - Test Suite
 
 import pytest
 import asyncio
+import random
 import time
 from unittest.mock import Mock, AsyncMock, patch
 from typing import Dict, Any
@@ -13,7 +14,8 @@ from typing import Dict, Any
 # 導入測試目標
 from ..core.enhanced_agent_core import EnhancedAgentCore
 from ..tools.enhanced_tool_registry import EnhancedToolRegistry
-from ..actions.action_executor import ActionExecutor
+from ..tools.tool_registry import ToolRegistry, ToolInfo, ToolType, ToolStatus
+from ..actions.action_executor import ActionExecutor, ExecutionMode, ExecutionResult, ExecutionStatus
 from ..config.enhanced_config import create_enhanced_config
 from ..core.agent_core import AgentRequest, Priority, TaskStatus
 
@@ -367,6 +369,145 @@ class TestPerformance:
             # 記憶體增長應該在合理範圍內（小於100MB）
             assert memory_increase < 100 * 1024 * 1024
 
+class TestActionExecutorDAG:
+    """Action Executor DAG模式測試"""
+    
+    @staticmethod
+    def _create_executor(durations: Dict[str, float], failing=()):
+        """創建用模擬任務執行的Executor，記錄每個任務的啟動順序和上游結果"""
+        executor = ActionExecutor({'max_concurrent_tasks': 4})
+        executor.started = []
+        executor.dependency_results = {}
+        
+        async def fake_execute(task):
+            executor.started.append(task.tool_id)
+            executor.dependency_results[task.tool_id] = task.parameters.get('dependency_results', {})
+            await asyncio.sleep(durations[task.tool_id])
+            status = ExecutionStatus.FAILED if task.tool_id in failing else ExecutionStatus.COMPLETED
+            return ExecutionResult(
+                task_id=task.id,
+                tool_id=task.tool_id,
+                status=status,
+                result=f"{task.tool_id}_result",
+                execution_time=durations[task.tool_id]
+            )
+        
+        executor._execute_single_task = fake_execute
+        return executor
+    
+    @staticmethod
+    def _create_request():
+        return AgentRequest(id="dag_test", type="analysis", content="DAG測試請求")
+    
+    @pytest.mark.asyncio
+    async def test_cycle_detection(self):
+        """測試依賴有環時不執行任何任務"""
+        executor = self._create_executor({'a': 0.0, 'b': 0.0})
+        
+        result = await executor.execute(
+            self._create_request(), ['a', 'b'], mode=ExecutionMode.DAG,
+            dependencies={'a': ['b'], 'b': ['a']}
+        )
+        
+        assert 'cycle' in result['error']
+        assert executor.started == []
+        await executor.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_critical_path_ordering(self):
+        """測試任務按依賴順序啟動，關鍵路徑取最長的依賴鏈"""
+        executor = self._create_executor({'a': 0.01, 'b': 0.05, 'c': 0.01, 'd': 0.01})
+        
+        result = await executor.execute(
+            self._create_request(), ['a', 'b', 'c', 'd'], mode=ExecutionMode.DAG,
+            dependencies={'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}
+        )
+        
+        assert executor.started[0] == 'a'
+        assert executor.started[-1] == 'd'
+        assert executor.dependency_results['d'] == {'b': 'b_result', 'c': 'c_result'}
+        
+        tools_by_task = {r.task_id: r.tool_id for r in result['task_results']}
+        assert [tools_by_task[task_id] for task_id in result['details']['critical_path']] == ['a', 'b', 'd']
+        assert result['details']['critical_path_time'] == pytest.approx(0.07)
+        assert result['details']['total_task_time'] == pytest.approx(0.08)
+        await executor.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_downstream_cancellation(self):
+        """測試必需任務失敗時取消所有下游任務，可選任務失敗時下游繼續執行"""
+        durations = {'a': 0.0, 'b': 0.0, 'c': 0.0, 'd': 0.0}
+        executor = self._create_executor(durations, failing={'a', 'c'})
+        
+        result = await executor.execute(
+            self._create_request(), ['a', 'b', 'c', 'd'], mode=ExecutionMode.DAG,
+            dependencies={'b': ['a'], 'd': ['c']},
+            optional_tools=['c']
+        )
+        
+        statuses = {r.tool_id: r.status for r in result['task_results']}
+        assert statuses == {
+            'a': ExecutionStatus.FAILED,
+            'b': ExecutionStatus.CANCELLED,
+            'c': ExecutionStatus.FAILED,
+            'd': ExecutionStatus.COMPLETED
+        }
+        assert 'b' not in executor.started
+        assert executor.dependency_results['d'] == {}
+        await executor.shutdown()
+
+class TestToolRegistryHealthCheck:
+    """Tool Registry健康檢查測試"""
+    
+    @staticmethod
+    async def _create_registry(tool_ids, **config):
+        registry = ToolRegistry(dict({'auto_discovery': False}, **config))
+        for tool_id in tool_ids:
+            await registry.register_tool(ToolInfo(
+                id=tool_id,
+                name=tool_id,
+                type=ToolType.PYTHON_MODULE,
+                description="健康檢查測試工具",
+                version="1.0.0",
+                capabilities=[]
+            ))
+        return registry
+    
+    @pytest.mark.asyncio
+    async def test_timeout_marks_tool_unavailable(self):
+        """測試探測超時的工具被標記為不可用，探測期間被註銷的工具直接跳過"""
+        registry = await self._create_registry(['slow', 'removed'], health_check_timeout=0.05)
+        
+        async def slow_check(tool_id):
+            if tool_id == 'removed':
+                del registry.tools[tool_id]
+            await asyncio.sleep(1)
+        
+        with patch.object(registry, 'health_check_tool', side_effect=slow_check):
+            await registry.health_check_all(spread=0.0)
+        
+        assert registry.tools['slow'].status == ToolStatus.UNAVAILABLE
+        assert 'removed' not in registry.tools
+    
+    @pytest.mark.asyncio
+    async def test_jitter_spread_from_interval(self):
+        """測試默認按 health_check_interval * health_check_jitter 錯開探測，最近成功的工具跳過探測"""
+        registry = await self._create_registry(
+            ['a', 'b', 'recent'], health_check_interval=10, health_check_jitter=0.3
+        )
+        registry.tools['recent'].status = ToolStatus.AVAILABLE
+        registry.record_tool_result('recent', True)
+        
+        with patch.object(random, 'uniform', return_value=0.0) as uniform:
+            await registry.health_check_all()
+            assert [call.args for call in uniform.call_args_list] == [(0, 3.0), (0, 3.0)]
+            
+            uniform.reset_mock()
+            await registry.initialize()
+            uniform.assert_not_called()
+        
+        assert registry.tools['a'].status == ToolStatus.AVAILABLE
+
 # 測試配置
 pytest_plugins = ['pytest_asyncio']
 
@@ -12,11 +12,14 @@ import json
 import logging
 import importlib
 import inspect
+import random
+import time
 from typing import Dict, List, Any, Optional, Callable, Type
 from dataclasses import dataclass, asdict
 from enum import Enum
 from pathlib import Path
-import aiohttp
+
+from ..components.http_client_manager import get_http_client_manager
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +96,15 @@ class ToolRegistry:
         self.tag_index: Dict[str, List[str]] = {}  # 標籤 -> 工具ID列表
         self.discovery_paths = self.config.get('discovery_paths', [])
         self.auto_discovery = self.config.get('auto_discovery', True)
+        self.http_client = get_http_client_manager(self.config.get('http_client'))
+        
+        # 健康檢查配置
+        self.health_check_timeout = self.config.get('health_check_timeout', 5.0)
+        self.health_check_concurrency = self.config.get('health_check_concurrency', 20)
+        self.health_check_interval = self.config.get('health_check_interval', 60)
+        self.health_check_jitter = self.config.get('health_check_jitter', 0.5)  # 探測在間隔內的分散比例
+        self.passive_health_window = self.config.get('passive_health_window', self.health_check_interval)
+        self.last_success: Dict[str, float] = {}  # 工具ID -> 最近一次成功執行時間（monotonic）
         
         logger.info("ToolRegistry initialized")
     
@@ -106,8 +118,8 @@ class ToolRegistry:
         # 加載預配置的工具
         await self.load_predefined_tools()
         
-        # 執行初始健康檢查
-        await self.health_check_all()
+        # 執行初始健康檢查（立即完成，不錯開）
+        await self.health_check_all(spread=0.0)
         
         logger.info(f"ToolRegistry initialized with {len(self.tools)} tools")
     
@@ -142,11 +154,10 @@ class ToolRegistry:
             try:
                 # 嘗試連接MCP服務
                 health_url = f"{endpoint['url']}/health"
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(health_url, timeout=5) as response:
-                        if response.status == 200:
-                            service_info = await response.json()
-                            await self._register_mcp_service(endpoint, service_info)
+                async with self.http_client.get(health_url, timeout=5, max_retries=0) as response:
+                    if response.status == 200:
+                        service_info = await response.json()
+                        await self._register_mcp_service(endpoint, service_info)
             except Exception as e:
                 logger.warning(f"Failed to discover MCP service {endpoint['name']}: {e}")
     
@@ -220,11 +231,10 @@ class ToolRegistry:
         for endpoint in api_endpoints:
             try:
                 health_url = f"{endpoint['url']}/health"
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(health_url, timeout=5) as response:
-                        if response.status == 200:
-                            api_info = await response.json()
-                            await self._register_http_api(endpoint, api_info)
+                async with self.http_client.get(health_url, timeout=5, max_retries=0) as response:
+                    if response.status == 200:
+                        api_info = await response.json()
+                        await self._register_http_api(endpoint, api_info)
             except Exception as e:
                 logger.warning(f"Failed to discover HTTP API {endpoint['name']}: {e}")
     
@@ -744,15 +754,47 @@ class ToolRegistry:
                 matching_tools.append(tool_id)
         return matching_tools
     
-    async def health_check_all(self):
-        """檢查所有工具健康狀態"""
+    def record_tool_result(self, tool_id: str, success: bool):
+        """記錄工具執行結果，最近執行成功的工具在健康檢查中跳過主動探測"""
+        if success:
+            self.last_success[tool_id] = time.monotonic()
+    
+    async def health_check_all(self, spread: Optional[float] = None):
+        """
+        並發檢查所有工具健康狀態
+        
+        Args:
+            spread: 探測在該秒數內隨機錯開，避免同時發出；默認為 health_check_interval * health_check_jitter
+        """
         logger.info("Performing health check on all tools...")
         
-        for tool_id, tool_info in self.tools.items():
-            try:
-                await self.health_check_tool(tool_id)
-            except Exception as e:
-                logger.warning(f"Health check failed for tool {tool_id}: {e}")
+        if spread is None:
+            spread = self.health_check_interval * self.health_check_jitter
+        semaphore = asyncio.Semaphore(self.health_check_concurrency)
+        now = time.monotonic()
+        
+        async def check(tool_id: str):
+            if spread > 0:
+                await asyncio.sleep(random.uniform(0, spread))
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(self.health_check_tool(tool_id), self.health_check_timeout)
+                except asyncio.TimeoutError:
+                    # 探測期間工具可能已被註銷
+                    tool_info = self.tools.get(tool_id)
+                    if tool_info is None:
+                        return
+                    tool_info.status = ToolStatus.UNAVAILABLE
+                    logger.warning(f"Health check timed out for tool {tool_id}")
+                except Exception as e:
+                    logger.warning(f"Health check failed for tool {tool_id}: {e}")
+        
+        tool_ids = [
+            tool_id for tool_id, tool_info in self.tools.items()
+            if not (tool_info.status == ToolStatus.AVAILABLE and
+                    now - self.last_success.get(tool_id, float('-inf')) < self.passive_health_window)
+        ]
+        await asyncio.gather(*(check(tool_id) for tool_id in tool_ids))
     
     async def health_check_tool(self, tool_id: str) -> bool:
         """檢查單個工具健康狀態"""
@@ -762,15 +804,14 @@ class ToolRegistry:
         
         try:
             if tool_info.health_check_url:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(tool_info.health_check_url, timeout=5) as response:
-                        if response.status == 200:
-                            tool_info.status = ToolStatus.AVAILABLE
-                            tool_info.last_health_check = str(asyncio.get_event_loop().time())
-                            return True
-                        else:
-                            tool_info.status = ToolStatus.UNAVAILABLE
-                            return False
+                async with self.http_client.get(tool_info.health_check_url, timeout=self.health_check_timeout, max_retries=0) as response:
+                    if response.status == 200:
+                        tool_info.status = ToolStatus.AVAILABLE
+                        tool_info.last_health_check = str(asyncio.get_event_loop().time())
+                        return True
+                    else:
+                        tool_info.status = ToolStatus.UNAVAILABLE
+                        return False
             else:
                 # 對於沒有健康檢查URL的工具，假設可用
                 tool_info.status = ToolStatus.AVAILABLE
@@ -303,6 +303,92 @@ class PowerAutomationCLI:
             print(f"❌ 測試運行失敗: {response['result']['message']}")
             return False
     
+    async def _storage_request(self, method: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        發送存儲請求
+        
+        Args:
+            method: 存儲方法名
+            params: 參數
+            
+        Returns:
+            Optional[Dict[str, Any]]: 響應數據，失敗時為None
+        """
+        if not self.mcp_adapter:
+            print("MCP適配器未初始化")
+            return None
+        
+        request = {
+            "id": f"cli_{int(time.time())}",
+            "method": f"server.storage_{method}",
+            "params": params,
+            "timestamp": time.time()
+        }
+        
+        response = await self.mcp_adapter.handle_request(request)
+        
+        if response["result"]["status"] == "success":
+            return response["result"]["data"]
+        else:
+            print(f"❌ 存儲請求失敗: {response['result']['message']}")
+            return None
+    
+    async def create_backup(self) -> bool:
+        """
+        創建備份
+        
+        Returns:
+            bool: 備份是否成功
+        """
+        print("正在創建備份...")
+        data = await self._storage_request("backup", {})
+        if data and data.get("success"):
+            print(f"✅ 備份創建成功: {data.get('backup_id')}")
+            return True
+        return False
+    
+    async def restore_backup(self, backup_id: Optional[str] = None, target_path: Optional[str] = None) -> bool:
+        """
+        從備份恢復
+        
+        Args:
+            backup_id: 備份ID，默認為最新備份
+            target_path: 恢復目標目錄，默認為存儲根目錄
+            
+        Returns:
+            bool: 恢復是否成功
+        """
+        print(f"正在恢復備份: {backup_id or '最新備份'}")
+        data = await self._storage_request("restore_backup", {"backup_id": backup_id, "target_path": target_path})
+        if data and data.get("success"):
+            print("✅ 備份恢復成功")
+            return True
+        return False
+    
+    async def verify_backup(self, backup_id: Optional[str] = None) -> bool:
+        """
+        校驗備份
+        
+        Args:
+            backup_id: 備份ID，默認為最新備份
+            
+        Returns:
+            bool: 備份是否完整
+        """
+        print(f"正在校驗備份: {backup_id or '最新備份'}")
+        data = await self._storage_request("verify_backup", {"backup_id": backup_id})
+        if not data:
+            return False
+        
+        if data.get("valid"):
+            print(f"✅ 備份完整: {data['backup_id']} ({data['file_count']} 個文件)")
+            return True
+        
+        print(f"❌ 備份校驗失敗: {data.get('backup_id')}")
+        for problem in data.get("problems", []):
+            print(f"  - {problem}")
+        return False
+    
     async def interactive_mode(self):
         """交互模式"""
         self.interactive_mode = True
@@ -348,6 +434,14 @@ class PowerAutomationCLI:
                 elif command.startswith('test '):
                     test_case = command[5:]
                     await self.run_test(test_case)
+                elif command.lower() == 'backup':
+                    await self.create_backup()
+                elif command.split()[0] == 'restore':
+                    parts = command.split()
+                    await self.restore_backup(parts[1] if len(parts) > 1 else None)
+                elif command.split()[0] == 'verify-backup':
+                    parts = command.split()
+                    await self.verify_backup(parts[1] if len(parts) > 1 else None)
                 else:
                     print(f"未知命令: {command}")
                     print("輸入 'help' 查看可用命令")
@@ -374,6 +468,9 @@ class PowerAutomationCLI:
   conversations          - 獲取對話歷史
   tasks                  - 獲取任務列表
   test <test_case>       - 運行自動化測試
+  backup                 - 創建備份
+  restore [backup_id]    - 從備份恢復
+  verify-backup [id]     - 校驗備份
   exit/quit/q            - 退出交互模式
 
 示例:
@@ -419,6 +516,16 @@ async def main():
     test_parser = subparsers.add_parser("test", help="運行自動化測試")
     test_parser.add_argument("test_case", help="測試案例名稱")
     
+    # 備份命令
+    subparsers.add_parser("backup", help="創建備份")
+    
+    restore_parser = subparsers.add_parser("restore", help="從備份恢復")
+    restore_parser.add_argument("backup_id", nargs="?", help="備份ID（默認最新）")
+    restore_parser.add_argument("--target", help="恢復目標目錄（默認存儲根目錄）")
+    
+    verify_parser = subparsers.add_parser("verify-backup", help="校驗備份")
+    verify_parser.add_argument("backup_id", nargs="?", help="備份ID（默認最新）")
+    
     # 交互模式
     subparsers.add_parser("interactive", help="進入交互模式")
     
@@ -469,6 +576,16 @@ async def main():
         elif args.command == "test":
             await cli.run_test(args.test_case)
             
+        elif args.command == "backup":
+            await cli.create_backup()
+            
+        elif args.command == "restore":
+            await cli.restore_backup(args.backup_id, args.target)
+            
+        elif args.command == "verify-backup":
+            if not await cli.verify_backup(args.backup_id):
+                return 1
+            
         elif args.command == "interactive":
             await cli.interactive_mode()
             
@@ -9,12 +9,18 @@ Date: 2025-06-23
 """
 
 import asyncio
+import codecs
 import json
 import logging
 import os
+import re
 import shutil
 import sys
+import tarfile
+import threading
 import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 import sqlite3
@@ -25,12 +31,31 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from shared.exceptions import StorageError, async_handle_exceptions
-from shared.utils import ensure_directory, calculate_file_hash, format_bytes
+from shared.utils import ensure_directory, calculate_file_hash, format_bytes, link_or_copy
 
 
 class DataStorage:
     """數據存儲管理模組"""
     
+    # 需要提取內容做全文索引的文本文件類型
+    TEXT_EXTENSIONS = ('.txt', '.md', '.json', '.csv')
+    
+    # 索引寫入（使用UPSERT而非REPLACE，保證更新觸發器同步全文索引）
+    INDEX_UPSERT_SQL = """
+    INSERT INTO files 
+    (file_id, file_name, file_path, category, size, hash, content, created_at, modified_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(file_id) DO UPDATE SET
+        file_name = excluded.file_name,
+        file_path = excluded.file_path,
+        category = excluded.category,
+        size = excluded.size,
+        hash = excluded.hash,
+        content = excluded.content,
+        created_at = excluded.created_at,
+        modified_at = excluded.modified_at
+    """
+    
     def __init__(self, config: Dict[str, Any], logger: logging.Logger):
         """
         初始化Data Storage
@@ -50,12 +75,37 @@ class DataStorage:
         self.compression_enabled = config.get("compression_enabled", True)
         self.max_file_size = config.get("max_file_size", "100MB")
         self.allowed_extensions = config.get("allowed_extensions", [".pdf", ".png", ".jpg", ".jpeg", ".txt", ".md", ".json", ".csv"])
+        self.index_chunk_size = config.get("index_chunk_size", 64 * 1024)
+        self.index_max_chars = config.get("index_max_chars", 2 * 1024 * 1024)
+        self.search_limit = config.get("search_limit", 100)
+        self.io_workers = config.get("io_workers", min(32, (os.cpu_count() or 1) + 4))
+        self.dedup_enabled = config.get("dedup_enabled", True)
+        self.blob_gc_grace = config.get("blob_gc_grace", 3600)
+        self.stats_reconcile_interval = config.get("stats_reconcile_interval", 3600)
+        self.backup_mode = config.get("backup_mode", "incremental")
+        self.backup_full_every = config.get("backup_full_every", 7)
+        self.backup_keep = config.get("backup_keep", 5)
+        
+        # 內容尋址存儲目錄：按哈希保存唯一內容，分類目錄下的文件是指向它的引用
+        self.blob_path = os.path.join(self.base_path, config.get("blob_dir", "blobs"))
         
         # 路徑配置
         self.paths = config.get("paths", {})
         
         # 數據庫連接
         self.db_connection = None
+        self.fts_enabled = False
+        
+        # 按分類增量維護的存儲統計，以及對賬掃描用的目錄緩存
+        # 目錄緩存: {dir_path: (mtime_ns, file_count, total_size, subdirs)}
+        self.category_stats: Dict[str, Dict[str, int]] = {}
+        self.dir_stats_cache: Dict[str, tuple] = {}
+        
+        # 文件哈希、複製等阻塞IO的線程池
+        self.io_pool = ThreadPoolExecutor(max_workers=self.io_workers)
+        
+        # 備份壓縮在獨立進程中執行，避免佔用事件循環和GIL（按需創建）
+        self.backup_pool: Optional[ProcessPoolExecutor] = None
         
         # 狀態信息
         self.status = {
@@ -65,7 +115,9 @@ class DataStorage:
             "total_size": 0,
             "indexed_files": 0,
             "last_cleanup": None,
-            "last_backup": None
+            "last_backup": None,
+            "last_backup_id": None,
+            "last_stats_reconcile": None
         }
     
     async def initialize(self) -> bool:
@@ -135,6 +187,11 @@ class DataStorage:
                 self.db_connection.close()
                 self.db_connection = None
             
+            self.io_pool.shutdown(wait=False)
+            if self.backup_pool:
+                self.backup_pool.shutdown(wait=False)
+                self.backup_pool = None
+            
             self.status["running"] = False
             self.logger.info("Data Storage已停止")
             return True
@@ -153,7 +210,7 @@ class DataStorage:
         try:
             status = self.status.copy()
             
-            # 添加存儲統計
+            # 添加存儲統計（讀取增量維護的計數器，不掃描文件系統）
             status["storage_stats"] = await self._get_storage_stats()
             
             # 添加配置信息
@@ -188,7 +245,8 @@ class DataStorage:
             # 路由到相應的方法
             if method == "search":
                 query = params.get("query", "")
-                results = await self.search_files(query)
+                limit = params.get("limit", self.search_limit)
+                results = await self.search_files(query, limit)
                 return {"results": results, "count": len(results)}
                 
             elif method == "store_file":
@@ -197,6 +255,11 @@ class DataStorage:
                 result = await self.store_file(file_path, category)
                 return {"success": result, "message": "文件存儲完成"}
                 
+            elif method == "store_files":
+                file_paths = params.get("file_paths", [])
+                category = params.get("category", "files")
+                return await self.store_files(file_paths, category)
+                
             elif method == "get_file":
                 file_id = params.get("file_id", "")
                 file_info = await self.get_file(file_id)
@@ -209,12 +272,31 @@ class DataStorage:
                 
             elif method == "backup":
                 result = await self.create_backup()
-                return {"success": result, "message": "備份創建完成"}
+                return {"success": result, "message": "備份創建完成", "backup_id": self.status["last_backup_id"]}
+                
+            elif method == "list_backups":
+                backups = await self.list_backups()
+                return {"backups": backups, "count": len(backups)}
+                
+            elif method == "restore_backup":
+                backup_id = params.get("backup_id")
+                target_path = params.get("target_path")
+                result = await self.restore_backup(backup_id, target_path)
+                return {"success": result, "message": "備份恢復完成"}
+                
+            elif method == "verify_backup":
+                backup_id = params.get("backup_id")
+                return await self.verify_backup(backup_id)
                 
             elif method == "cleanup":
                 result = await self.cleanup_old_files()
                 return {"success": result, "message": "清理完成"}
                 
+            elif method == "reconcile_stats":
+                force = params.get("force", False)
+                stats = await self.reconcile_storage_stats(force)
+                return {"storage_stats": stats}
+                
             else:
                 raise StorageError(f"未知的Storage方法: {method}")
             
@@ -223,12 +305,16 @@ class DataStorage:
             raise
     
     @async_handle_exceptions(default_return=[])
-    async def search_files(self, query: str) -> List[Dict[str, Any]]:
+    async def search_files(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         搜索文件
         
+        使用FTS5全文索引時，結果按bm25相關度排序並附帶內容摘要；
+        每個查詢詞都按前綴匹配（如 "rep" 可匹配 "report"）。
+        
         Args:
             query: 搜索查詢
+            limit: 最大返回結果數
             
         Returns:
             List[Dict[str, Any]]: 搜索結果
@@ -238,19 +324,48 @@ class DataStorage:
                 return await self._simple_file_search(query)
             
             self.logger.info(f"搜索文件: {query}")
+            limit = limit or self.search_limit
             
-            # 構建SQL查詢
-            sql = """
-            SELECT file_id, file_name, file_path, category, size, created_at, modified_at
-            FROM files 
-            WHERE file_name LIKE ? OR content LIKE ?
-            ORDER BY modified_at DESC
-            LIMIT 100
-            """
+            match_expr = self._build_fts_query(query)
+            if self.fts_enabled and query.strip() and not match_expr:
+                # 查詢只有標點等非詞字符，沒有可匹配的詞
+                return []
             
-            search_pattern = f"%{query}%"
             cursor = self.db_connection.cursor()
-            cursor.execute(sql, (search_pattern, search_pattern))
+            
+            if self.fts_enabled and match_expr:
+                # bm25權重：文件名命中比內容命中更重要
+                sql = """
+                SELECT f.file_id, f.file_name, f.file_path, f.category, f.size, f.created_at, f.modified_at,
+                       bm25(files_fts, 10.0, 1.0) AS rank,
+                       snippet(files_fts, 1, '[', ']', '...', 16) AS snippet
+                FROM files_fts
+                JOIN files f ON f.rowid = files_fts.rowid
+                WHERE files_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """
+                cursor.execute(sql, (match_expr, limit))
+            elif self.fts_enabled:
+                # 空查詢：按修改時間列出最近的文件
+                sql = """
+                SELECT file_id, file_name, file_path, category, size, created_at, modified_at, NULL, NULL
+                FROM files
+                ORDER BY modified_at DESC
+                LIMIT ?
+                """
+                cursor.execute(sql, (limit,))
+            else:
+                # SQLite未編譯FTS5時回退到LIKE搜索
+                sql = """
+                SELECT file_id, file_name, file_path, category, size, created_at, modified_at, NULL, NULL
+                FROM files 
+                WHERE file_name LIKE ? OR content LIKE ?
+                ORDER BY modified_at DESC
+                LIMIT ?
+                """
+                search_pattern = f"%{query}%"
+                cursor.execute(sql, (search_pattern, search_pattern, limit))
             
             results = []
             for row in cursor.fetchall():
@@ -264,6 +379,10 @@ class DataStorage:
                     "created_at": row[5],
                     "modified_at": row[6]
                 }
+                if row[7] is not None:
+                    # bm25越小越相關，取反作為得分
+                    result["score"] = -row[7]
+                    result["snippet"] = row[8]
                 results.append(result)
             
             self.logger.info(f"搜索完成，找到 {len(results)} 個結果")
@@ -286,51 +405,98 @@ class DataStorage:
             bool: 存儲是否成功
         """
         try:
-            if not os.path.exists(file_path):
-                raise StorageError(f"文件不存在: {file_path}")
-            
             self.logger.info(f"存儲文件: {file_path} -> {category}")
             
-            # 檢查文件大小
-            file_size = os.path.getsize(file_path)
-            max_size = self._parse_size(self.max_file_size)
-            if file_size > max_size:
-                raise StorageError(f"文件過大: {format_bytes(file_size)} > {self.max_file_size}")
-            
-            # 檢查文件擴展名
-            file_ext = Path(file_path).suffix.lower()
-            if self.allowed_extensions and file_ext not in self.allowed_extensions:
-                raise StorageError(f"不支持的文件類型: {file_ext}")
-            
-            # 創建目標目錄
-            category_path = self.paths.get(category, category)
-            target_dir = os.path.join(self.base_path, category_path)
-            ensure_directory(target_dir)
-            
-            # 生成唯一文件名
-            file_name = Path(file_path).name
-            file_hash = calculate_file_hash(file_path)
-            unique_name = f"{file_hash}_{file_name}"
-            target_path = os.path.join(target_dir, unique_name)
-            
-            # 複製文件
-            shutil.copy2(file_path, target_path)
+            loop = asyncio.get_event_loop()
+            stored = await loop.run_in_executor(self.io_pool, self._copy_to_storage, file_path, category)
             
             # 更新索引
-            if self.index_enabled:
-                await self._index_file(target_path, category, file_hash)
+            if stored["record"]:
+                self._write_index_records([stored["record"]], [stored["blob"]] if stored["blob"] else None)
             
-            # 更新統計
-            self.status["total_files"] += 1
-            self.status["total_size"] += file_size
+            # 更新統計（目標已存在或被覆蓋時沒有新增文件，只計入大小變化）
+            added = 0 if stored["placement"] in ("existing", "replaced") else 1
+            self._adjust_category_stats(category, added, stored["size_delta"])
             
-            self.logger.info(f"✅ 文件存儲成功: {target_path}")
+            self.logger.info(f"✅ 文件存儲成功: {stored['target_path']}")
             return True
             
         except Exception as e:
             self.logger.error(f"存儲文件失敗: {e}")
             raise StorageError(f"存儲文件失敗: {e}", path=file_path, operation="store")
     
+    async def store_files(self, file_paths: List[str], category: str = "files") -> Dict[str, Any]:
+        """
+        批量存儲文件
+        
+        哈希、複製和內容提取在線程池中並行執行，所有索引記錄在一個事務中寫入，
+        單個文件失敗不影響其他文件。
+        
+        Args:
+            file_paths: 文件路徑列表
+            category: 文件分類
+            
+        Returns:
+            Dict[str, Any]: 批量存儲結果，包含每個文件的結果
+        """
+        self.logger.info(f"批量存儲 {len(file_paths)} 個文件 -> {category}")
+        start_time = time.time()
+        
+        loop = asyncio.get_event_loop()
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(self.io_pool, self._copy_to_storage, file_path, category)
+              for file_path in file_paths),
+            return_exceptions=True
+        )
+        
+        results = []
+        records = []
+        blobs = []
+        size_delta = 0
+        for file_path, outcome in zip(file_paths, outcomes):
+            if isinstance(outcome, Exception):
+                results.append({"file_path": file_path, "success": False, "error": str(outcome)})
+                continue
+            
+            results.append({
+                "file_path": file_path,
+                "success": True,
+                "target_path": outcome["target_path"],
+                "hash": outcome["hash"],
+                "size": outcome["size"],
+                "placement": outcome["placement"]
+            })
+            size_delta += outcome["size_delta"]
+            if outcome["record"]:
+                records.append(outcome["record"])
+            if outcome["blob"]:
+                blobs.append(outcome["blob"])
+        
+        # 一次事務寫入全部索引記錄
+        if records:
+            try:
+                self._write_index_records(records, blobs)
+            except Exception as e:
+                self.logger.error(f"批量寫入索引失敗: {e}")
+                for result in results:
+                    if result["success"]:
+                        result["index_error"] = str(e)
+        
+        succeeded = [result for result in results if result["success"]]
+        added = [result for result in succeeded if result["placement"] not in ("existing", "replaced")]
+        self._adjust_category_stats(category, len(added), size_delta)
+        
+        duration = time.time() - start_time
+        self.logger.info(f"✅ 批量存儲完成: {len(succeeded)}/{len(file_paths)} 成功，耗時 {duration:.2f}秒")
+        
+        return {
+            "total": len(file_paths),
+            "succeeded": len(succeeded),
+            "failed": len(file_paths) - len(succeeded),
+            "duration": duration,
+            "results": results
+        }
+    
     @async_handle_exceptions(default_return=None)
     async def get_file(self, file_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -394,7 +560,7 @@ class DataStorage:
             
             # 刪除物理文件
             if os.path.exists(file_path):
-                os.remove(file_path)
+                self._remove_stored_file(file_info["category"], file_path)
             
             # 從索引中刪除
             if self.index_enabled and self.db_connection:
@@ -403,10 +569,6 @@ class DataStorage:
                 cursor.execute(sql, (file_id,))
                 self.db_connection.commit()
             
-            # 更新統計
-            self.status["total_files"] -= 1
-            self.status["total_size"] -= file_info["size"]
-            
             self.logger.info(f"✅ 文件刪除成功: {file_path}")
             return True
             
@@ -419,6 +581,11 @@ class DataStorage:
         """
         創建備份
         
+        每次備份寫出一個清單（manifest），記錄所有文件的大小、mtime及其內容所在的歸檔。
+        增量模式下只歸檔相對上一個清單新增或變化的文件，未變化的文件引用舊歸檔，
+        因此恢復時只需讀取目標清單。每 backup_full_every 次增量後重新做一次全量備份。
+        壓縮在獨立進程中執行，數據庫使用SQLite在線備份API生成一致快照。
+        
         Returns:
             bool: 備份是否成功
         """
@@ -429,36 +596,212 @@ class DataStorage:
             self.logger.info("正在創建備份...")
             
             # 創建備份目錄
-            backup_dir = os.path.join(self.base_path, self.paths.get("backups", "backups"))
+            backup_dir = self._get_backup_dir()
             ensure_directory(backup_dir)
             
-            # 生成備份文件名
-            timestamp = int(time.time())
-            backup_name = f"powerautomation_backup_{timestamp}.tar.gz"
+            # 生成備份文件名：納秒時間戳加隨機後綴，同一秒內的多次備份不會互相覆蓋
+            created_ns = time.time_ns()
+            timestamp = created_ns // 1_000_000_000
+            backup_suffix = f"{created_ns}_{uuid.uuid4().hex[:8]}"
+            backup_id = f"powerautomation_backup_{backup_suffix}"
+            backup_name = f"{backup_id}.tar.gz"
             backup_path = os.path.join(backup_dir, backup_name)
             
-            # 創建壓縮備份
-            import tarfile
-            with tarfile.open(backup_path, "w:gz") as tar:
-                for category, path in self.paths.items():
-                    if category != "backups":
-                        full_path = os.path.join(self.base_path, path)
-                        if os.path.exists(full_path):
-                            tar.add(full_path, arcname=path)
+            loop = asyncio.get_event_loop()
+            previous = self._load_backup_manifest(backup_dir)
+            snapshot = await loop.run_in_executor(self.io_pool, self._scan_backup_files)
             
-            # 備份數據庫
+            is_full = (
+                self.backup_mode != "incremental"
+                or previous is None
+                or previous.get("chain_length", 0) + 1 >= self.backup_full_every
+            )
+            previous_files = {} if is_full else previous["files"]
+            
+            # 找出需要歸檔的文件，未變化的文件沿用上次所在的歸檔
+            files = {}
+            changed = []
+            for arcname, meta in snapshot.items():
+                previous_entry = previous_files.get(arcname)
+                if previous_entry and previous_entry["size"] == meta["size"] \
+                        and previous_entry["mtime_ns"] == meta["mtime_ns"]:
+                    files[arcname] = previous_entry
+                else:
+                    files[arcname] = dict(meta, archive=backup_name)
+                    changed.append(arcname)
+            
+            # 在工作進程中壓縮歸檔
+            if changed:
+                missing = await loop.run_in_executor(
+                    self._get_backup_pool(), _write_backup_archive, backup_path, self.base_path, changed
+                )
+                for arcname in missing:
+                    files.pop(arcname, None)
+                self._adjust_category_stats("backups", 1, os.path.getsize(backup_path))
+            
+            # 備份數據庫（在線備份API，寫入期間也能得到一致快照）
+            database_name = None
             if self.index_enabled and self.db_connection:
-                db_backup_path = os.path.join(backup_dir, f"database_backup_{timestamp}.db")
-                shutil.copy2(os.path.join(self.base_path, "index.db"), db_backup_path)
+                database_name = f"database_backup_{backup_suffix}.db"
+                database_path = os.path.join(backup_dir, database_name)
+                await loop.run_in_executor(
+                    self.io_pool, self._snapshot_database,
+                    os.path.join(self.base_path, "index.db"), database_path
+                )
+                self._adjust_category_stats("backups", 1, os.path.getsize(database_path))
+            
+            # 最後寫入清單，作為備份完成的標記
+            manifest = {
+                "backup_id": backup_id,
+                "timestamp": timestamp,
+                "created_ns": created_ns,
+                "type": "full" if is_full else "incremental",
+                "parent": None if is_full else previous["backup_id"],
+                "chain_length": 0 if is_full else previous.get("chain_length", 0) + 1,
+                "archive": backup_name if changed else None,
+                "database": database_name,
+                "files": files
+            }
+            manifest_path = os.path.join(backup_dir, f"{backup_id}.manifest.json")
+            temp_manifest_path = f"{manifest_path}.tmp"
+            with open(temp_manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(temp_manifest_path, manifest_path)
+            self._adjust_category_stats("backups", 1, os.path.getsize(manifest_path))
             
             self.status["last_backup"] = time.time()
-            self.logger.info(f"✅ 備份創建成功: {backup_path}")
+            self.status["last_backup_id"] = backup_id
+            self.logger.info(
+                f"✅ 備份創建成功: {backup_id} ({manifest['type']}，歸檔 {len(changed)}/{len(files)} 個文件)"
+            )
             return True
             
         except Exception as e:
             self.logger.error(f"創建備份失敗: {e}")
             raise StorageError(f"創建備份失敗: {e}", operation="backup")
     
+    async def list_backups(self) -> List[Dict[str, Any]]:
+        """
+        列出可用備份
+        
+        Returns:
+            List[Dict[str, Any]]: 按時間倒序的備份摘要
+        """
+        backups = []
+        for manifest in self._load_backup_manifests(self._get_backup_dir()):
+            backups.append({
+                "backup_id": manifest["backup_id"],
+                "timestamp": manifest["timestamp"],
+                "type": manifest["type"],
+                "parent": manifest["parent"],
+                "file_count": len(manifest["files"]),
+                "has_database": manifest["database"] is not None
+            })
+        return backups
+    
+    @async_handle_exceptions(default_return=False)
+    async def restore_backup(self, backup_id: Optional[str] = None, target_path: Optional[str] = None) -> bool:
+        """
+        從備份恢復
+        
+        按清單從各歸檔中取出對應文件；恢復到原存儲目錄時會替換索引數據庫並重新載入。
+        當前存在但不在清單中的文件不會被刪除。
+        
+        Args:
+            backup_id: 備份ID，默認為最新備份
+            target_path: 恢復目標目錄，默認為存儲根目錄
+            
+        Returns:
+            bool: 恢復是否成功
+        """
+        try:
+            backup_dir = self._get_backup_dir()
+            manifest = self._load_backup_manifest(backup_dir, backup_id)
+            if not manifest:
+                raise StorageError(f"備份不存在: {backup_id or 'latest'}", operation="restore")
+            
+            target_path = target_path or self.base_path
+            in_place = os.path.abspath(target_path) == os.path.abspath(self.base_path)
+            self.logger.info(f"正在恢復備份: {manifest['backup_id']} -> {target_path}")
+            
+            # 按歸檔分組需要提取的文件
+            plan: Dict[str, List[str]] = {}
+            for arcname, entry in manifest["files"].items():
+                plan.setdefault(entry["archive"], []).append(arcname)
+            
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                self._get_backup_pool(), _extract_backup_archives, backup_dir, target_path, plan
+            )
+            
+            # 恢復數據庫
+            if manifest["database"]:
+                database_backup = os.path.join(backup_dir, manifest["database"])
+                database_target = os.path.join(target_path, "index.db")
+                
+                if in_place and self.db_connection:
+                    self.db_connection.close()
+                    self.db_connection = None
+                
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(database_target + suffix):
+                        os.remove(database_target + suffix)
+                shutil.copy2(database_backup, database_target)
+                
+                if in_place and self.index_enabled:
+                    await self._initialize_database()
+            
+            if in_place:
+                await self._scan_existing_files()
+            
+            self.logger.info(f"✅ 備份恢復成功: {manifest['backup_id']}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"恢復備份失敗: {e}")
+            raise StorageError(f"恢復備份失敗: {e}", operation="restore")
+    
+    async def verify_backup(self, backup_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        校驗備份完整性
+        
+        檢查清單引用的每個歸檔是否存在、可完整解壓且包含所需文件，
+        並對數據庫快照執行 integrity_check。
+        
+        Args:
+            backup_id: 備份ID，默認為最新備份
+            
+        Returns:
+            Dict[str, Any]: 校驗結果
+        """
+        backup_dir = self._get_backup_dir()
+        manifest = self._load_backup_manifest(backup_dir, backup_id)
+        if not manifest:
+            return {"backup_id": backup_id, "valid": False, "problems": ["備份清單不存在"]}
+        
+        expected: Dict[str, Dict[str, int]] = {}
+        for arcname, entry in manifest["files"].items():
+            expected.setdefault(entry["archive"], {})[arcname] = entry["size"]
+        
+        loop = asyncio.get_event_loop()
+        problems = await loop.run_in_executor(
+            self._get_backup_pool(), _verify_backup_archives, backup_dir, expected
+        )
+        
+        if manifest["database"]:
+            database_backup = os.path.join(backup_dir, manifest["database"])
+            problems.extend(await loop.run_in_executor(self.io_pool, self._verify_database, database_backup))
+        
+        result = {
+            "backup_id": manifest["backup_id"],
+            "valid": not problems,
+            "file_count": len(manifest["files"]),
+            "archive_count": len(expected),
+            "problems": problems
+        }
+        self.logger.info(f"備份校驗完成: {manifest['backup_id']} - {'通過' if result['valid'] else '失敗'}")
+        return result
+    
     @async_handle_exceptions(default_return=False)
     async def cleanup_old_files(self) -> bool:
         """
@@ -480,7 +823,8 @@ class DataStorage:
                     file_path = os.path.join(temp_dir, file_name)
                     if os.path.isfile(file_path):
                         if os.path.getmtime(file_path) < cutoff_time:
-                            os.remove(file_path)
+                            self._remove_stored_file("temp", file_path)
+                            self._remove_index_entries(file_path)
                             cleaned_count += 1
             
             # 清理舊日誌
@@ -490,23 +834,17 @@ class DataStorage:
                     if file_name.endswith(".log"):
                         file_path = os.path.join(log_dir, file_name)
                         if os.path.getmtime(file_path) < cutoff_time:
-                            os.remove(file_path)
+                            self._remove_stored_file("logs", file_path)
                             cleaned_count += 1
             
             # 清理舊備份
-            backup_dir = os.path.join(self.base_path, self.paths.get("backups", "backups"))
+            backup_dir = self._get_backup_dir()
             if os.path.exists(backup_dir):
-                backup_files = []
-                for file_name in os.listdir(backup_dir):
-                    if file_name.startswith("powerautomation_backup_"):
-                        file_path = os.path.join(backup_dir, file_name)
-                        backup_files.append((file_path, os.path.getmtime(file_path)))
-                
-                # 保留最新的5個備份
-                backup_files.sort(key=lambda x: x[1], reverse=True)
-                for file_path, _ in backup_files[5:]:
-                    os.remove(file_path)
-                    cleaned_count += 1
+                cleaned_count += self._prune_backups(backup_dir)
+            
+            # 回收不再被引用的內容塊
+            if self.dedup_enabled:
+                cleaned_count += self._collect_unreferenced_blobs()
             
             self.status["last_cleanup"] = time.time()
             self.logger.info(f"✅ 清理完成，刪除了 {cleaned_count} 個文件")
@@ -516,6 +854,169 @@ class DataStorage:
             self.logger.error(f"清理文件失敗: {e}")
             raise StorageError(f"清理文件失敗: {e}", operation="cleanup")
     
+    def _get_backup_dir(self) -> str:
+        """獲取備份目錄"""
+        return os.path.join(self.base_path, self.paths.get("backups", "backups"))
+    
+    def _get_backup_pool(self) -> ProcessPoolExecutor:
+        """獲取備份工作進程池"""
+        if self.backup_pool is None:
+            self.backup_pool = ProcessPoolExecutor(max_workers=1)
+        return self.backup_pool
+    
+    def _load_backup_manifests(self, backup_dir: str) -> List[Dict[str, Any]]:
+        """
+        載入全部備份清單
+        
+        Args:
+            backup_dir: 備份目錄
+            
+        Returns:
+            List[Dict[str, Any]]: 按時間倒序的清單列表
+        """
+        manifests = []
+        if not os.path.exists(backup_dir):
+            return manifests
+        
+        for file_name in os.listdir(backup_dir):
+            if file_name.startswith("powerautomation_backup_") and file_name.endswith(".manifest.json"):
+                try:
+                    with open(os.path.join(backup_dir, file_name), 'r', encoding='utf-8') as f:
+                        manifests.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"讀取備份清單失敗: {file_name}: {e}")
+        
+        # 舊版清單沒有 created_ns，按秒級時間戳排序
+        manifests.sort(
+            key=lambda manifest: manifest.get("created_ns", manifest["timestamp"] * 1_000_000_000),
+            reverse=True
+        )
+        return manifests
+    
+    def _load_backup_manifest(self, backup_dir: str, backup_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        載入指定備份清單
+        
+        Args:
+            backup_dir: 備份目錄
+            backup_id: 備份ID，默認為最新備份
+            
+        Returns:
+            Optional[Dict[str, Any]]: 備份清單
+        """
+        for manifest in self._load_backup_manifests(backup_dir):
+            if backup_id is None or manifest["backup_id"] == backup_id:
+                return manifest
+        return None
+    
+    def _prune_backups(self, backup_dir: str) -> int:
+        """
+        清理舊備份
+        
+        保留最新的 backup_keep 個清單；歸檔和數據庫快照只要仍被保留的清單引用就不會刪除。
+        
+        Args:
+            backup_dir: 備份目錄
+            
+        Returns:
+            int: 刪除的文件數
+        """
+        manifests = self._load_backup_manifests(backup_dir)
+        retained = manifests[:self.backup_keep]
+        
+        referenced = set()
+        for manifest in retained:
+            referenced.add(f"{manifest['backup_id']}.manifest.json")
+            if manifest["database"]:
+                referenced.add(manifest["database"])
+            for entry in manifest["files"].values():
+                referenced.add(entry["archive"])
+        
+        # 沒有清單的舊格式備份按時間保留最新的 backup_keep 個
+        legacy_archives = sorted(
+            (file_name for file_name in os.listdir(backup_dir)
+             if file_name.startswith("powerautomation_backup_") and file_name.endswith(".tar.gz")
+             and not any(file_name == f"{manifest['backup_id']}.tar.gz" for manifest in manifests)),
+            reverse=True
+        )
+        referenced.update(legacy_archives[:self.backup_keep])
+        
+        removed = 0
+        for file_name in os.listdir(backup_dir):
+            is_backup_file = file_name.startswith(("powerautomation_backup_", "database_backup_"))
+            if is_backup_file and file_name not in referenced and not file_name.endswith(".tmp"):
+                self._remove_stored_file("backups", os.path.join(backup_dir, file_name))
+                removed += 1
+        
+        return removed
+    
+    def _scan_backup_files(self) -> Dict[str, Dict[str, int]]:
+        """
+        掃描需要備份的文件（阻塞操作，在線程池中執行）
+        
+        Returns:
+            Dict[str, Dict[str, int]]: {相對路徑: {"size", "mtime_ns"}}
+        """
+        snapshot = {}
+        for category, path in self.paths.items():
+            if category == "backups":
+                continue
+            pending = [os.path.join(self.base_path, path)]
+            while pending:
+                try:
+                    with os.scandir(pending.pop()) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif entry.is_file():
+                                stat = entry.stat()
+                                arcname = os.path.relpath(entry.path, self.base_path)
+                                snapshot[arcname] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                except OSError:
+                    continue
+        return snapshot
+    
+    def _snapshot_database(self, source_path: str, backup_path: str):
+        """
+        使用SQLite在線備份API生成數據庫快照（在線程池中執行，使用獨立連接）
+        
+        Args:
+            source_path: 源數據庫路徑
+            backup_path: 快照路徑
+        """
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(backup_path)
+        try:
+            source.backup(target, pages=1024)
+            # 快照使用回滾日誌模式，保證是不依賴-wal文件的單個文件
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+            source.close()
+    
+    def _verify_database(self, database_path: str) -> List[str]:
+        """
+        校驗數據庫快照
+        
+        Args:
+            database_path: 快照路徑
+            
+        Returns:
+            List[str]: 發現的問題
+        """
+        if not os.path.exists(database_path):
+            return [f"數據庫快照不存在: {os.path.basename(database_path)}"]
+        
+        connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+        try:
+            result = connection.execute("PRAGMA integrity_check").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            return [f"數據庫快照損壞: {e}"]
+        finally:
+            connection.close()
+        
+        return [] if result == "ok" else [f"數據庫快照校驗失敗: {result}"]
+    
     async def _create_directory_structure(self):
         """創建目錄結構"""
         try:
@@ -527,6 +1028,9 @@ class DataStorage:
                 full_path = os.path.join(self.base_path, path)
                 ensure_directory(full_path)
             
+            if self.dedup_enabled:
+                ensure_directory(self.blob_path)
+            
         except Exception as e:
             raise StorageError(f"創建目錄結構失敗: {e}")
     
@@ -536,6 +1040,10 @@ class DataStorage:
             db_path = os.path.join(self.base_path, "index.db")
             self.db_connection = sqlite3.connect(db_path)
             
+            # WAL模式：寫入不阻塞讀取，批量事務提交只需一次fsync
+            self.db_connection.execute("PRAGMA journal_mode=WAL")
+            self.db_connection.execute("PRAGMA synchronous=NORMAL")
+            
             # 創建文件索引表
             sql = """
             CREATE TABLE IF NOT EXISTS files (
@@ -557,71 +1065,565 @@ class DataStorage:
             self.db_connection.execute("CREATE INDEX IF NOT EXISTS idx_file_name ON files(file_name)")
             self.db_connection.execute("CREATE INDEX IF NOT EXISTS idx_category ON files(category)")
             self.db_connection.execute("CREATE INDEX IF NOT EXISTS idx_hash ON files(hash)")
+            self.db_connection.execute("CREATE INDEX IF NOT EXISTS idx_file_path ON files(file_path)")
+            
+            # 創建內容塊引用計數表，files的增刪通過觸發器維護ref_count
+            self.db_connection.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                blob_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_blobs_ref_count ON blobs(ref_count);
+            CREATE TRIGGER IF NOT EXISTS files_blob_ref_ai AFTER INSERT ON files BEGIN
+                UPDATE blobs SET ref_count = ref_count + 1, updated_at = CAST(strftime('%s', 'now') AS REAL)
+                WHERE hash = new.hash;
+            END;
+            CREATE TRIGGER IF NOT EXISTS files_blob_ref_ad AFTER DELETE ON files BEGIN
+                UPDATE blobs SET ref_count = ref_count - 1, updated_at = CAST(strftime('%s', 'now') AS REAL)
+                WHERE hash = old.hash;
+            END;
+            """)
+            
+            # 創建存儲統計表
+            self.db_connection.executescript("""
+            CREATE TABLE IF NOT EXISTS category_stats (
+                category TEXT PRIMARY KEY,
+                file_count INTEGER NOT NULL,
+                total_size INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dir_stats (
+                dir_path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                file_count INTEGER NOT NULL,
+                total_size INTEGER NOT NULL,
+                subdirs TEXT NOT NULL
+            );
+            """)
+            
+            # 創建全文索引
+            self.fts_enabled = self._initialize_fts()
             
             self.db_connection.commit()
             
         except Exception as e:
             raise StorageError(f"初始化數據庫失敗: {e}")
     
-    async def _scan_existing_files(self):
-        """掃描現有文件"""
+    def _initialize_fts(self) -> bool:
+        """
+        創建FTS5全文索引表及同步觸發器
+        
+        files_fts 是以 files 為外部內容表的FTS5索引，正文只在 files 中存一份；
+        觸發器保證 files 的插入、更新、刪除同步到索引。
+        
+        Returns:
+            bool: FTS5是否可用
+        """
+        cursor = self.db_connection.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files_fts'")
+        fts_exists = cursor.fetchone() is not None
+        
         try:
-            total_files = 0
-            total_size = 0
+            self.db_connection.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+                file_name, content,
+                content='files', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+            """)
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"SQLite不支持FTS5，搜索將回退到LIKE查詢: {e}")
+            return False
+        
+        self.db_connection.executescript("""
+        CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN
+            INSERT INTO files_fts(rowid, file_name, content)
+            VALUES (new.rowid, new.file_name, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN
+            INSERT INTO files_fts(files_fts, rowid, file_name, content)
+            VALUES ('delete', old.rowid, old.file_name, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE ON files BEGIN
+            INSERT INTO files_fts(files_fts, rowid, file_name, content)
+            VALUES ('delete', old.rowid, old.file_name, old.content);
+            INSERT INTO files_fts(rowid, file_name, content)
+            VALUES (new.rowid, new.file_name, new.content);
+        END;
+        """)
+        
+        if not fts_exists:
+            # 舊版數據庫升級：為已有記錄重建全文索引
+            self.db_connection.execute("INSERT INTO files_fts(files_fts) VALUES ('rebuild')")
+        
+        return True
+    
+    def _build_fts_query(self, query: str) -> str:
+        """
+        將用戶查詢轉換為FTS5 MATCH表達式
+        
+        每個詞都加引號避免FTS語法注入，並追加 * 做前綴匹配，多個詞之間為AND關係。
+        
+        Args:
+            query: 用戶查詢
             
-            for category, path in self.paths.items():
-                full_path = os.path.join(self.base_path, path)
-                if os.path.exists(full_path):
-                    for root, dirs, files in os.walk(full_path):
-                        for file_name in files:
-                            file_path = os.path.join(root, file_name)
-                            if os.path.isfile(file_path):
-                                total_files += 1
-                                total_size += os.path.getsize(file_path)
+        Returns:
+            str: MATCH表達式，查詢為空時返回空字符串
+        """
+        terms = re.findall(r"\w+", query, flags=re.UNICODE)
+        return " ".join(f'"{term}"*' for term in terms)
+    
+    def _read_text_content(self, file_path: str) -> str:
+        """
+        分塊流式讀取文本內容用於索引
+        
+        使用增量解碼器逐塊讀取，避免一次性載入大文件，並且不會在塊邊界截斷多字節字符；
+        內容上限由 index_max_chars 控制。
+        
+        Args:
+            file_path: 文件路徑
             
-            self.status["total_files"] = total_files
-            self.status["total_size"] = total_size
+        Returns:
+            str: 文本內容
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        chunks = []
+        remaining = self.index_max_chars
+        
+        with open(file_path, 'rb') as f:
+            while remaining > 0:
+                raw = f.read(self.index_chunk_size)
+                text = decoder.decode(raw, final=not raw)
+                if text:
+                    chunks.append(text[:remaining])
+                    remaining -= len(text)
+                if not raw:
+                    break
+        
+        return "".join(chunks)
+    
+    async def _scan_existing_files(self):
+        """掃描現有文件（優先載入持久化的統計，僅對有變化的目錄重新掃描）"""
+        try:
+            self._load_persisted_stats()
+            await self.reconcile_storage_stats()
             
         except Exception as e:
             self.logger.error(f"掃描現有文件失敗: {e}")
     
-    async def _index_file(self, file_path: str, category: str, file_hash: str):
-        """索引文件"""
-        try:
-            if not self.db_connection:
-                return
-            
-            file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
-            created_at = os.path.getctime(file_path)
-            modified_at = os.path.getmtime(file_path)
+    async def reconcile_storage_stats(self, force: bool = False) -> Dict[str, Any]:
+        """
+        對賬存儲統計
+        
+        使用 os.scandir 遍歷各分類目錄；目錄mtime未變化時直接復用上次的結果，
+        不再列出其中的文件。外部寫入（日誌、備份等）引起的偏差在此修正。
+        
+        Args:
+            force: 是否忽略目錄緩存強制全量掃描（可發現原地修改導致的大小變化）
             
-            # 生成文件ID
-            file_id = hashlib.md5(f"{file_path}_{file_hash}".encode()).hexdigest()
+        Returns:
+            Dict[str, Any]: 對賬後的存儲統計
+        """
+        dir_cache = {} if force else dict(self.dir_stats_cache)
+        loop = asyncio.get_event_loop()
+        
+        category_stats = {}
+        scanned_dirs = {}
+        for category, path in self.paths.items():
+            full_path = os.path.join(self.base_path, path)
+            if not os.path.exists(full_path):
+                continue
+            file_count, total_size, scanned = await loop.run_in_executor(
+                self.io_pool, self._scan_directory_tree, full_path, dir_cache
+            )
+            category_stats[category] = {"file_count": file_count, "total_size": total_size}
+            scanned_dirs.update(scanned)
+        
+        self.category_stats = category_stats
+        self.dir_stats_cache = scanned_dirs
+        self._refresh_status_totals()
+        self._persist_stats(replace_dirs=True)
+        
+        self.status["last_stats_reconcile"] = time.time()
+        return await self._get_storage_stats()
+    
+    def _scan_directory_tree(self, root: str, dir_cache: Dict[str, tuple]) -> tuple:
+        """
+        掃描目錄樹（阻塞操作，在線程池中執行）
+        
+        Args:
+            root: 根目錄
+            dir_cache: 上次掃描的目錄緩存
             
-            # 提取文件內容（如果是文本文件）
-            content = ""
+        Returns:
+            tuple: (文件數, 總大小, 本次掃描的目錄緩存)
+        """
+        file_count = 0
+        total_size = 0
+        scanned = {}
+        
+        pending = [root]
+        while pending:
+            dir_path = pending.pop()
             try:
-                if file_name.endswith(('.txt', '.md', '.json', '.csv')):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()[:10000]  # 只索引前10000字符
-            except:
-                pass
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
             
-            # 插入或更新索引
-            sql = """
-            INSERT OR REPLACE INTO files 
-            (file_id, file_name, file_path, category, size, hash, content, created_at, modified_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
+            cached = dir_cache.get(dir_path)
+            if cached and cached[0] == mtime_ns:
+                _, count, size, subdirs = cached
+            else:
+                count = 0
+                size = 0
+                subdirs = []
+                try:
+                    with os.scandir(dir_path) as entries:
+                        for entry in entries:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.path)
+                                elif entry.is_file():
+                                    count += 1
+                                    size += entry.stat().st_size
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+            
+            scanned[dir_path] = (mtime_ns, count, size, subdirs)
+            file_count += count
+            total_size += size
+            pending.extend(subdirs)
+        
+        return file_count, total_size, scanned
+    
+    def _adjust_category_stats(self, category: str, file_delta: int, size_delta: int):
+        """
+        增量更新分類統計
+        
+        Args:
+            category: 文件分類
+            file_delta: 文件數變化
+            size_delta: 大小變化（字節）
+        """
+        if category not in self.paths or (file_delta == 0 and size_delta == 0):
+            return
+        
+        stats = self.category_stats.setdefault(category, {"file_count": 0, "total_size": 0})
+        stats["file_count"] = max(0, stats["file_count"] + file_delta)
+        stats["total_size"] = max(0, stats["total_size"] + size_delta)
+        self._refresh_status_totals()
+        
+        if self.index_enabled and self.db_connection:
+            with self.db_connection:
+                self.db_connection.execute(
+                    """
+                    INSERT INTO category_stats (category, file_count, total_size, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(category) DO UPDATE SET
+                        file_count = excluded.file_count,
+                        total_size = excluded.total_size,
+                        updated_at = excluded.updated_at
+                    """,
+                    (category, stats["file_count"], stats["total_size"], time.time())
+                )
+    
+    def _remove_stored_file(self, category: str, file_path: str):
+        """
+        刪除存儲目錄中的文件並更新分類統計
+        
+        Args:
+            category: 文件分類
+            file_path: 文件路徑
+        """
+        file_size = os.path.getsize(file_path)
+        os.remove(file_path)
+        self._adjust_category_stats(category, -1, -file_size)
+    
+    def _refresh_status_totals(self):
+        """根據分類統計刷新總文件數和總大小"""
+        self.status["total_files"] = sum(stats["file_count"] for stats in self.category_stats.values())
+        self.status["total_size"] = sum(stats["total_size"] for stats in self.category_stats.values())
+    
+    def _load_persisted_stats(self):
+        """從索引數據庫載入上次保存的分類統計和目錄緩存"""
+        if not self.index_enabled or not self.db_connection:
+            return
+        
+        cursor = self.db_connection.cursor()
+        cursor.execute("SELECT category, file_count, total_size FROM category_stats")
+        self.category_stats = {
+            row[0]: {"file_count": row[1], "total_size": row[2]}
+            for row in cursor.fetchall()
+        }
+        
+        cursor.execute("SELECT dir_path, mtime_ns, file_count, total_size, subdirs FROM dir_stats")
+        self.dir_stats_cache = {
+            row[0]: (row[1], row[2], row[3], json.loads(row[4]))
+            for row in cursor.fetchall()
+        }
+        self._refresh_status_totals()
+    
+    def _persist_stats(self, replace_dirs: bool = False):
+        """
+        保存分類統計和目錄緩存到索引數據庫
+        
+        Args:
+            replace_dirs: 是否整體替換目錄緩存（對賬後使用）
+        """
+        if not self.index_enabled or not self.db_connection:
+            return
+        
+        now = time.time()
+        with self.db_connection:
+            self.db_connection.execute("DELETE FROM category_stats")
+            self.db_connection.executemany(
+                "INSERT INTO category_stats (category, file_count, total_size, updated_at) VALUES (?, ?, ?, ?)",
+                [(category, stats["file_count"], stats["total_size"], now)
+                 for category, stats in self.category_stats.items()]
+            )
+            if replace_dirs:
+                self.db_connection.execute("DELETE FROM dir_stats")
+                self.db_connection.executemany(
+                    "INSERT INTO dir_stats (dir_path, mtime_ns, file_count, total_size, subdirs) VALUES (?, ?, ?, ?, ?)",
+                    [(dir_path, mtime_ns, count, size, json.dumps(subdirs))
+                     for dir_path, (mtime_ns, count, size, subdirs) in self.dir_stats_cache.items()]
+                )
+    
+    def _copy_to_storage(self, file_path: str, category: str) -> Dict[str, Any]:
+        """
+        校驗、哈希並複製文件到存儲目錄（阻塞操作，在線程池中執行）
+        
+        Args:
+            file_path: 文件路徑
+            category: 文件分類
             
-            self.db_connection.execute(sql, (
-                file_id, file_name, file_path, category, file_size,
-                file_hash, content, created_at, modified_at
-            ))
-            self.db_connection.commit()
+        Returns:
+            Dict[str, Any]: 目標路徑、哈希、大小及待寫入的索引記錄
+        """
+        if not os.path.exists(file_path):
+            raise StorageError(f"文件不存在: {file_path}", path=file_path, operation="store")
+        
+        # 檢查文件大小
+        file_size = os.path.getsize(file_path)
+        max_size = self._parse_size(self.max_file_size)
+        if file_size > max_size:
+            raise StorageError(f"文件過大: {format_bytes(file_size)} > {self.max_file_size}", path=file_path, operation="store")
+        
+        # 檢查文件擴展名
+        file_ext = Path(file_path).suffix.lower()
+        if self.allowed_extensions and file_ext not in self.allowed_extensions:
+            raise StorageError(f"不支持的文件類型: {file_ext}", path=file_path, operation="store")
+        
+        # 創建目標目錄
+        category_path = self.paths.get(category, category)
+        target_dir = os.path.join(self.base_path, category_path)
+        ensure_directory(target_dir)
+        
+        # 生成唯一文件名
+        file_name = Path(file_path).name
+        file_hash = calculate_file_hash(file_path)
+        unique_name = f"{file_hash}_{file_name}"
+        target_path = os.path.join(target_dir, unique_name)
+        
+        # 放置文件：相同內容只在內容尋址存儲中保存一份，分類目錄下使用硬鏈接/reflink引用
+        # size_delta 為分類目錄佔用空間的變化，目標已存在時不重複計入
+        blob = None
+        if self.dedup_enabled:
+            blob_path = self._ensure_blob(file_path, file_hash)
+            blob = (file_hash, blob_path, file_size)
+            placement = "existing"
+            size_delta = 0
+            if not os.path.exists(target_path):
+                placement = link_or_copy(blob_path, target_path)
+                size_delta = file_size
+        elif os.path.exists(target_path):
+            previous_size = os.path.getsize(target_path)
+            placement = "existing"
+            if previous_size != file_size:
+                # 已有目標被改動過，用源文件覆蓋
+                shutil.copy2(file_path, target_path)
+                placement = "replaced"
+            size_delta = file_size - previous_size
+        else:
+            shutil.copy2(file_path, target_path)
+            placement = "copy"
+            size_delta = file_size
+        
+        record = None
+        if self.index_enabled:
+            record = self._build_index_record(target_path, category, file_hash)
+        
+        return {
+            "target_path": target_path,
+            "hash": file_hash,
+            "size": file_size,
+            "placement": placement,
+            "size_delta": size_delta,
+            "blob": blob,
+            "record": record
+        }
+    
+    def _ensure_blob(self, file_path: str, file_hash: str) -> str:
+        """
+        確保內容塊存在（阻塞操作，在線程池中執行）
+        
+        內容塊不使用硬鏈接指向源文件，避免外部修改源文件時破壞已存儲的內容。
+        
+        Args:
+            file_path: 源文件路徑
+            file_hash: 文件哈希
             
-            self.status["indexed_files"] += 1
+        Returns:
+            str: 內容塊路徑
+        """
+        blob_dir = os.path.join(self.blob_path, file_hash[:2])
+        blob_path = os.path.join(blob_dir, file_hash)
+        if os.path.exists(blob_path):
+            return blob_path
+        
+        ensure_directory(blob_dir)
+        
+        # 先寫臨時文件再原子重命名，並發寫入同一內容時不會產生半寫的內容塊
+        temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            link_or_copy(file_path, temp_path, allow_hardlink=False)
+            os.replace(temp_path, blob_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        return blob_path
+    
+    def _collect_unreferenced_blobs(self) -> int:
+        """
+        回收引用計數為零的內容塊
+        
+        引用歸零後保留 blob_gc_grace 秒，避免與正在進行的存儲操作競爭。
+        未啟用索引時以硬鏈接數判斷引用。
+        
+        Returns:
+            int: 刪除的內容塊數量
+        """
+        grace_cutoff = time.time() - self.blob_gc_grace
+        removed = 0
+        
+        if self.index_enabled and self.db_connection:
+            cursor = self.db_connection.cursor()
+            cursor.execute(
+                "SELECT hash, blob_path FROM blobs WHERE ref_count <= 0 AND updated_at < ?",
+                (grace_cutoff,)
+            )
+            for blob_hash, blob_path in cursor.fetchall():
+                if os.path.exists(blob_path):
+                    os.remove(blob_path)
+                removed += 1
+                with self.db_connection:
+                    self.db_connection.execute(
+                        "DELETE FROM blobs WHERE hash = ? AND ref_count <= 0", (blob_hash,)
+                    )
+            return removed
+        
+        if not os.path.exists(self.blob_path):
+            return 0
+        
+        for shard in os.scandir(self.blob_path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                stat = entry.stat()
+                if stat.st_nlink <= 1 and stat.st_mtime < grace_cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        
+        return removed
+    
+    def _remove_index_entries(self, file_path: str):
+        """
+        刪除指向某路徑的索引記錄（觸發器同步減少內容塊引用計數）
+        
+        Args:
+            file_path: 已刪除的文件路徑
+        """
+        if not self.index_enabled or not self.db_connection:
+            return
+        
+        with self.db_connection:
+            self.db_connection.execute("DELETE FROM files WHERE file_path = ?", (file_path,))
+    
+    def _build_index_record(self, file_path: str, category: str, file_hash: str) -> tuple:
+        """
+        構建索引記錄（不訪問數據庫，可在線程池中執行）
+        
+        Args:
+            file_path: 存儲後的文件路徑
+            category: 文件分類
+            file_hash: 文件哈希
+            
+        Returns:
+            tuple: 與 INDEX_UPSERT_SQL 參數順序一致的記錄
+        """
+        file_name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        
+        # 生成文件ID
+        file_id = hashlib.md5(f"{file_path}_{file_hash}".encode()).hexdigest()
+        
+        # 提取文件內容（如果是文本文件）
+        content = ""
+        try:
+            if file_name.lower().endswith(self.TEXT_EXTENSIONS):
+                content = self._read_text_content(file_path)
+        except OSError as e:
+            self.logger.warning(f"讀取文件內容失敗，僅索引文件名: {file_path}: {e}")
+        
+        return (
+            file_id, file_name, file_path, category, stat.st_size,
+            file_hash, content, stat.st_ctime, stat.st_mtime
+        )
+    
+    def _write_index_records(self, records: List[tuple], blobs: Optional[List[tuple]] = None):
+        """
+        在單個事務中寫入索引記錄
+        
+        內容塊記錄先於文件記錄寫入，文件記錄的插入觸發器據此增加引用計數。
+        
+        Args:
+            records: _build_index_record 生成的記錄列表
+            blobs: (hash, blob_path, size) 內容塊列表
+        """
+        if not self.db_connection:
+            return
+        
+        now = time.time()
+        with self.db_connection:
+            if blobs:
+                self.db_connection.executemany(
+                    """
+                    INSERT INTO blobs (hash, blob_path, size, ref_count, created_at, updated_at)
+                    VALUES (?, ?, ?, 0, ?, ?)
+                    ON CONFLICT(hash) DO NOTHING
+                    """,
+                    [(blob_hash, blob_path, size, now, now) for blob_hash, blob_path, size in blobs]
+                )
+            self.db_connection.executemany(self.INDEX_UPSERT_SQL, records)
+        
+        self.status["indexed_files"] += len(records)
+    
+    async def _index_file(self, file_path: str, category: str, file_hash: str):
+        """索引文件"""
+        try:
+            if not self.db_connection:
+                return
+            
+            record = self._build_index_record(file_path, category, file_hash)
+            self._write_index_records([record])
             
         except Exception as e:
             self.logger.error(f"索引文件失敗: {e}")
@@ -629,58 +1631,63 @@ class DataStorage:
     async def _simple_file_search(self, query: str) -> List[Dict[str, Any]]:
         """簡單文件搜索（不使用數據庫）"""
         try:
-            results = []
-            
-            for category, path in self.paths.items():
-                full_path = os.path.join(self.base_path, path)
-                if os.path.exists(full_path):
-                    for root, dirs, files in os.walk(full_path):
-                        for file_name in files:
-                            if query.lower() in file_name.lower():
-                                file_path = os.path.join(root, file_name)
-                                file_size = os.path.getsize(file_path)
-                                
-                                result = {
-                                    "file_id": hashlib.md5(file_path.encode()).hexdigest(),
-                                    "file_name": file_name,
-                                    "file_path": file_path,
-                                    "category": category,
-                                    "size": file_size,
-                                    "size_formatted": format_bytes(file_size),
-                                    "created_at": os.path.getctime(file_path),
-                                    "modified_at": os.path.getmtime(file_path)
-                                }
-                                results.append(result)
-            
-            return results
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.io_pool, self._scan_matching_files, query.lower())
             
         except Exception as e:
             self.logger.error(f"簡單文件搜索失敗: {e}")
             return []
     
+    def _scan_matching_files(self, query: str) -> List[Dict[str, Any]]:
+        """
+        按文件名掃描匹配文件（阻塞操作，在線程池中執行）
+        
+        只對文件名匹配的條目做一次stat。
+        
+        Args:
+            query: 小寫的搜索查詢
+            
+        Returns:
+            List[Dict[str, Any]]: 搜索結果
+        """
+        results = []
+        
+        for category, path in self.paths.items():
+            pending = [os.path.join(self.base_path, path)]
+            while pending:
+                try:
+                    with os.scandir(pending.pop()) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif query in entry.name.lower() and entry.is_file():
+                                stat = entry.stat()
+                                results.append({
+                                    "file_id": hashlib.md5(entry.path.encode()).hexdigest(),
+                                    "file_name": entry.name,
+                                    "file_path": entry.path,
+                                    "category": category,
+                                    "size": stat.st_size,
+                                    "size_formatted": format_bytes(stat.st_size),
+                                    "created_at": stat.st_ctime,
+                                    "modified_at": stat.st_mtime
+                                })
+                except OSError:
+                    continue
+        
+        return results
+    
     async def _get_storage_stats(self) -> Dict[str, Any]:
-        """獲取存儲統計"""
+        """獲取存儲統計（O(分類數)，數據由存儲、刪除、清理及對賬維護）"""
         try:
             stats = {}
             
-            for category, path in self.paths.items():
-                full_path = os.path.join(self.base_path, path)
-                if os.path.exists(full_path):
-                    file_count = 0
-                    total_size = 0
-                    
-                    for root, dirs, files in os.walk(full_path):
-                        for file_name in files:
-                            file_path = os.path.join(root, file_name)
-                            if os.path.isfile(file_path):
-                                file_count += 1
-                                total_size += os.path.getsize(file_path)
-                    
-                    stats[category] = {
-                        "file_count": file_count,
-                        "total_size": total_size,
-                        "total_size_formatted": format_bytes(total_size)
-                    }
+            for category, category_stats in self.category_stats.items():
+                stats[category] = {
+                    "file_count": category_stats["file_count"],
+                    "total_size": category_stats["total_size"],
+                    "total_size_formatted": format_bytes(category_stats["total_size"])
+                }
             
             return stats
             
@@ -697,6 +1704,11 @@ class DataStorage:
                    time.time() - self.status["last_cleanup"] > 3600:
                     await self.cleanup_old_files()
                 
+                # 定期對賬存儲統計
+                if self.status["last_stats_reconcile"] is None or \
+                   time.time() - self.status["last_stats_reconcile"] > self.stats_reconcile_interval:
+                    await self.reconcile_storage_stats()
+                
                 # 每天執行一次備份
                 if self.backup_enabled and \
                    (self.status["last_backup"] is None or \
@@ -730,3 +1742,95 @@ class DataStorage:
         
         return int(float(size_str))
 
+
+def _write_backup_archive(archive_path: str, base_path: str, arcnames: List[str]) -> List[str]:
+    """
+    將文件寫入壓縮歸檔（在備份工作進程中執行）
+    
+    Args:
+        archive_path: 歸檔路徑
+        base_path: 存儲根目錄
+        arcnames: 相對於根目錄的文件路徑
+        
+    Returns:
+        List[str]: 掃描後已被刪除、未能歸檔的文件
+    """
+    missing = []
+    temp_path = f"{archive_path}.tmp"
+    with tarfile.open(temp_path, "w:gz") as tar:
+        for arcname in arcnames:
+            try:
+                tar.add(os.path.join(base_path, arcname), arcname=arcname, recursive=False)
+            except FileNotFoundError:
+                missing.append(arcname)
+    os.replace(temp_path, archive_path)
+    return missing
+
+
+def _extract_backup_archives(backup_dir: str, target_path: str, plan: Dict[str, List[str]]):
+    """
+    從多個歸檔中提取文件（在備份工作進程中執行）
+    
+    Args:
+        backup_dir: 備份目錄
+        target_path: 恢復目標目錄
+        plan: {歸檔名: [需要提取的文件]}
+    """
+    for archive_name, arcnames in plan.items():
+        with tarfile.open(os.path.join(backup_dir, archive_name), "r:gz") as tar:
+            members = [tar.getmember(arcname) for arcname in arcnames]
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(target_path, members=members, filter="data")
+            else:
+                tar.extractall(target_path, members=members)
+
+
+def _verify_backup_archives(backup_dir: str, expected: Dict[str, Dict[str, int]]) -> List[str]:
+    """
+    校驗歸檔完整性（在備份工作進程中執行）
+    
+    Args:
+        backup_dir: 備份目錄
+        expected: {歸檔名: {文件: 大小}}
+        
+    Returns:
+        List[str]: 發現的問題
+    """
+    problems = []
+    for archive_name, files in expected.items():
+        archive_path = os.path.join(backup_dir, archive_name)
+        if not os.path.exists(archive_path):
+            problems.append(f"歸檔不存在: {archive_name}")
+            continue
+        
+        try:
+            found = {}
+            links = {}
+            with tarfile.open(archive_path, "r:gz") as tar:
+                for member in tar:
+                    if member.islnk():
+                        links[member.name] = member.linkname
+                        continue
+                    # 完整讀取內容以觸發gzip CRC校驗；清單已不再引用的成員也要記錄，
+                    # 它們可能是其他成員的硬鏈接目標
+                    extracted = tar.extractfile(member)
+                    if extracted is not None:
+                        while extracted.read(1024 * 1024):
+                            pass
+                    found[member.name] = member.size
+        except (tarfile.TarError, OSError, EOFError) as e:
+            problems.append(f"歸檔損壞: {archive_name}: {e}")
+            continue
+        
+        # 硬鏈接成員不重複存儲內容，大小以同一歸檔內的鏈接目標為準
+        for name, linkname in links.items():
+            if name in files:
+                found[name] = found.get(linkname, -1)
+        
+        for arcname, size in files.items():
+            if arcname not in found:
+                problems.append(f"歸檔缺少文件: {archive_name}: {arcname}")
+            elif found[arcname] != size:
+                problems.append(f"文件大小不符: {archive_name}: {arcname}")
+    
+    return problems
@@ -14,6 +14,7 @@ from .utils import (
     get_system_info,
     create_directory_structure,
     calculate_file_hash,
+    link_or_copy,
     format_bytes,
     format_duration,
     safe_json_loads,
@@ -46,6 +47,7 @@ __all__ = [
     "get_system_info",
     "create_directory_structure",
     "calculate_file_hash",
+    "link_or_copy",
     "format_bytes",
     "format_duration",
     "safe_json_loads",
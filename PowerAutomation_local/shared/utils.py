@@ -14,6 +14,7 @@ import platform
 import psutil
 import json
 import hashlib
+import shutil
 import time
 from pathlib import Path
 from typing import Dict, Any, Optional, List
@@ -267,6 +268,42 @@ def calculate_file_hash(file_path: str, algorithm: str = "md5") -> Optional[str]
         return None
 
 
+def link_or_copy(src_path: str, dst_path: str, allow_hardlink: bool = True) -> str:
+    """
+    以最低成本將文件放置到目標路徑
+    
+    依次嘗試硬鏈接、reflink（寫時複製克隆，如btrfs/XFS）和普通複製。
+    硬鏈接與源文件共享inode，修改任一方都會影響另一方，因此只應對不可變內容使用。
+    
+    Args:
+        src_path: 源文件路徑
+        dst_path: 目標文件路徑
+        allow_hardlink: 是否允許使用硬鏈接
+        
+    Returns:
+        str: 實際使用的方式（"hardlink"、"reflink" 或 "copy"）
+    """
+    if allow_hardlink:
+        try:
+            os.link(src_path, dst_path)
+            return "hardlink"
+        except OSError:
+            pass
+    
+    try:
+        import fcntl
+        FICLONE = 0x40049409  # linux/fs.h
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(src_path, dst_path)
+        return "reflink"
+    except (ImportError, OSError):
+        pass
+    
+    shutil.copy2(src_path, dst_path)
+    return "copy"
+
+
 def format_bytes(bytes_value: int) -> str:
     """
     格式化字節數
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PowerAutomation Data Storage 備份測試
+測試連續創建的備份互不覆蓋，且都能校驗和恢復
+"""
+
+import logging
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.storage.data_storage import DataStorage
+
+
+class DataStorageBackupTest(unittest.IsolatedAsyncioTestCase):
+    """備份創建、校驗和恢復測試"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = DataStorage({
+            "base_path": os.path.join(self.temp_dir.name, "data"),
+            "paths": {"uploads": "uploads", "backups": "backups"},
+            "backup_mode": "incremental"
+        }, logging.getLogger(__name__))
+        self.assertTrue(await self.storage.initialize())
+        self.upload_dir = os.path.join(self.storage.base_path, "uploads")
+
+    async def asyncTearDown(self):
+        await self.storage.stop()
+        self.temp_dir.cleanup()
+
+    def _write_upload(self, file_name: str, content: str):
+        with open(os.path.join(self.upload_dir, file_name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    async def test_back_to_back_backups(self):
+        """同一秒內的兩次備份各自保留歸檔，增量清單引用的文件都可校驗和恢復"""
+        self._write_upload("first.txt", "first")
+        self.assertTrue(await self.storage.create_backup())
+        first_id = self.storage.status["last_backup_id"]
+
+        self._write_upload("second.txt", "second")
+        self.assertTrue(await self.storage.create_backup())
+        second_id = self.storage.status["last_backup_id"]
+
+        self.assertNotEqual(first_id, second_id)
+        backups = await self.storage.list_backups()
+        self.assertEqual([backup["backup_id"] for backup in backups], [second_id, first_id])
+        self.assertEqual(backups[0]["type"], "incremental")
+
+        for backup_id in (first_id, second_id):
+            result = await self.storage.verify_backup(backup_id)
+            self.assertTrue(result["valid"], result["problems"])
+
+        target_path = os.path.join(self.temp_dir.name, "restored")
+        self.assertTrue(await self.storage.restore_backup(second_id, target_path))
+        for file_name, content in (("first.txt", "first"), ("second.txt", "second")):
+            with open(os.path.join(target_path, "uploads", file_name), 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), content)
+
+    async def test_hardlink_target_outside_manifest(self):
+        """硬鏈接成員的鏈接目標已不在清單中時，校驗和恢復仍使用歸檔中的目標內容"""
+        self._write_upload("original.txt", "linked")
+        os.link(os.path.join(self.upload_dir, "original.txt"), os.path.join(self.upload_dir, "alias.txt"))
+        self.assertTrue(await self.storage.create_backup())
+        first_id = self.storage.status["last_backup_id"]
+
+        # 刪除歸檔中的鏈接目標，下一次增量清單只引用硬鏈接成員
+        archive_path = os.path.join(self.storage._get_backup_dir(), f"{first_id}.tar.gz")
+        with tarfile.open(archive_path, "r:gz") as tar:
+            link_member = next(member for member in tar.getmembers() if member.islnk())
+        os.remove(os.path.join(self.storage.base_path, link_member.linkname))
+        self.assertTrue(await self.storage.create_backup())
+        second_id = self.storage.status["last_backup_id"]
+
+        result = await self.storage.verify_backup(second_id)
+        self.assertTrue(result["valid"], result["problems"])
+
+        target_path = os.path.join(self.temp_dir.name, "restored")
+        self.assertTrue(await self.storage.restore_backup(second_id, target_path))
+        with open(os.path.join(target_path, link_member.name), 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), "linked")
+
+    async def test_backup_stats_match_reconcile(self):
+        """備份和清理增量維護的 backups 統計與對賬掃描一致"""
+        self.storage.backup_keep = 1
+        for index in range(3):
+            self._write_upload(f"file_{index}.txt", str(index))
+            self.assertTrue(await self.storage.create_backup())
+        self.assertTrue(await self.storage.cleanup_old_files())
+
+        incremental = dict(self.storage.category_stats["backups"])
+        await self.storage.reconcile_storage_stats(force=True)
+        self.assertEqual(incremental, self.storage.category_stats["backups"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+PowerAutomation Data Storage 去重測試
+測試內容尋址存儲只保存一份相同內容，以及重複存儲時的分類統計
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.storage.data_storage import DataStorage
+
+
+class DataStorageDedupTest(unittest.IsolatedAsyncioTestCase):
+    """內容塊去重和存儲統計測試"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        await self.storage.stop()
+        self.temp_dir.cleanup()
+
+    async def _create_storage(self, dedup_enabled: bool):
+        self.storage = DataStorage({
+            "base_path": os.path.join(self.temp_dir.name, "data"),
+            "paths": {"files": "files", "uploads": "uploads"},
+            "dedup_enabled": dedup_enabled
+        }, logging.getLogger(__name__))
+        self.assertTrue(await self.storage.initialize())
+
+    def _write_source(self, file_name: str, content: str) -> str:
+        source_path = os.path.join(self.temp_dir.name, file_name)
+        with open(source_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return source_path
+
+    def _blob_files(self):
+        return [os.path.join(root, name)
+                for root, _, names in os.walk(self.storage.blob_path) for name in names]
+
+    async def test_same_content_stored_once(self):
+        """不同分類中的相同內容共用一個內容塊，統計按文件計入"""
+        await self._create_storage(dedup_enabled=True)
+        source_path = self._write_source("shared.txt", "shared content")
+
+        self.assertTrue(await self.storage.store_file(source_path, "files"))
+        result = await self.storage.store_files([source_path], "uploads")
+        self.assertEqual(result["succeeded"], 1)
+
+        self.assertEqual(len(self._blob_files()), 1)
+        ref_count = self.storage.db_connection.execute("SELECT ref_count FROM blobs").fetchone()[0]
+        self.assertEqual(ref_count, 2)
+        for category in ("files", "uploads"):
+            self.assertEqual(self.storage.category_stats[category]["file_count"], 1)
+            self.assertEqual(self.storage.category_stats[category]["total_size"], len("shared content"))
+
+    async def test_store_same_file_twice_keeps_stats(self):
+        """重複存儲同一文件不重複計入統計"""
+        await self._create_storage(dedup_enabled=True)
+        source_path = self._write_source("again.txt", "again")
+
+        self.assertTrue(await self.storage.store_file(source_path))
+        self.assertTrue(await self.storage.store_file(source_path))
+        self.assertEqual(self.storage.category_stats["files"], {"file_count": 1, "total_size": 5})
+
+    async def test_existing_target_without_dedup(self):
+        """關閉去重時，已存在的目標不重複計入，被改動的目標被覆蓋且只計入大小變化"""
+        await self._create_storage(dedup_enabled=False)
+        source_path = self._write_source("plain.txt", "plain")
+
+        result = await self.storage.store_files([source_path])
+        self.assertEqual(result["results"][0]["placement"], "copy")
+        target_path = result["results"][0]["target_path"]
+
+        result = await self.storage.store_files([source_path])
+        self.assertEqual(result["results"][0]["placement"], "existing")
+        self.assertEqual(self.storage.category_stats["files"], {"file_count": 1, "total_size": 5})
+
+        with open(target_path, 'w', encoding='utf-8') as f:
+            f.write("corrupted target")
+        await self.storage.reconcile_storage_stats(force=True)
+        self.assertEqual(self.storage.category_stats["files"]["total_size"], len("corrupted target"))
+
+        result = await self.storage.store_files([source_path])
+        self.assertEqual(result["results"][0]["placement"], "replaced")
+        with open(target_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), "plain")
+        self.assertEqual(self.storage.category_stats["files"], {"file_count": 1, "total_size": 5})
+        self.assertEqual(self._blob_files(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+PowerAutomation Data Storage 搜索測試
+測試FTS5全文搜索的前綴匹配、相關度排序和非詞查詢
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.storage.data_storage import DataStorage
+
+
+class DataStorageSearchTest(unittest.IsolatedAsyncioTestCase):
+    """全文搜索測試"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = DataStorage({
+            "base_path": os.path.join(self.temp_dir.name, "data"),
+            "paths": {"files": "files"}
+        }, logging.getLogger(__name__))
+        self.assertTrue(await self.storage.initialize())
+        if not self.storage.fts_enabled:
+            self.skipTest("SQLite未編譯FTS5")
+
+        for file_name, content in (("report.txt", "quarterly revenue summary"),
+                                   ("notes.txt", "meeting notes about the report"),
+                                   ("todo.txt", "buy milk")):
+            source_path = os.path.join(self.temp_dir.name, file_name)
+            with open(source_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            self.assertTrue(await self.storage.store_file(source_path))
+
+    async def asyncTearDown(self):
+        await self.storage.stop()
+        self.temp_dir.cleanup()
+
+    async def test_prefix_match_ranks_file_name_first(self):
+        """前綴匹配同時命中文件名和內容，文件名命中排在前面"""
+        results = await self.storage.search_files("rep")
+        self.assertEqual([result["file_name"].split("_", 1)[1] for result in results],
+                         ["report.txt", "notes.txt"])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertIn("[", results[1]["snippet"])
+
+    async def test_terms_are_combined_with_and(self):
+        """多個查詢詞之間為AND關係"""
+        results = await self.storage.search_files("meeting report")
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]["file_name"].endswith("notes.txt"))
+
+    async def test_query_without_terms_returns_nothing(self):
+        """只有標點的查詢不返回結果，空查詢列出最近的文件"""
+        self.assertEqual(await self.storage.search_files("!!!"), [])
+        self.assertEqual(len(await self.storage.search_files("")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
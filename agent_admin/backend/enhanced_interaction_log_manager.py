@@ -15,7 +15,14 @@ import sys
 import json
 import logging
 import hashlib
-from typing import Dict, List, Any, Optional, Union, Tuple
+import sqlite3
+import threading
+import uuid
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterable
 from datetime import datetime, timedelta
 from pathlib import Path
 from dataclasses import dataclass, asdict
@@ -126,8 +133,9 @@ class DataStandardizer:
     
     def _generate_session_id(self) -> str:
         """生成會話ID"""
+        # 加入隨機部分，批量並行標準化時同一時刻生成的ID也不會衝突
         timestamp = datetime.now().isoformat()
-        return hashlib.md5(timestamp.encode()).hexdigest()[:16]
+        return hashlib.md5(f"{timestamp}_{uuid.uuid4().hex}".encode()).hexdigest()[:16]
     
     def _extract_context(self, replay_data: Dict[str, Any]) -> Dict[str, Any]:
         """提取上下文信息"""
@@ -210,51 +218,254 @@ class DataStandardizer:
         else:
             return 'complex'
 
+def _to_epoch(value: Any) -> float:
+    """將時間戳（epoch秒或ISO字符串）轉換為epoch秒，無法解析時返回NaN"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return float('nan')
+
+@dataclass
+class ActionSequenceArrays:
+    """動作序列的列式表示
+
+    一個或多個動作序列首尾拼接為動作類型編碼、成功標記、執行時間和時間戳數組，
+    offsets[i]:offsets[i + 1] 為第 i 個序列的範圍。動作只遍歷一次，之後的序列和
+    時間特徵都在這些數組上做向量化計算。
+    """
+    action_types: List[Any]
+    type_codes: np.ndarray  # 相同動作類型的編碼相同
+    success: np.ndarray
+    durations: np.ndarray
+    timestamps: np.ndarray  # epoch秒，缺失或無法解析時為NaN
+    offsets: np.ndarray
+    
+    @classmethod
+    def from_sequences(cls, sequences: List[List[Dict[str, Any]]], type_key: str = 'type',
+                       duration_key: str = 'execution_time') -> 'ActionSequenceArrays':
+        """
+        從多個動作字典列表構建列式表示
+        
+        Args:
+            sequences: 動作序列列表
+            type_key: 動作類型字段名
+            duration_key: 執行時間字段名
+        """
+        actions = [action for action_sequence in sequences for action in action_sequence]
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum([len(action_sequence) for action_sequence in sequences], out=offsets[1:])
+        
+        # 按列各用一個推導式構建，比逐動作追加到多個列表快得多
+        type_index: Dict[Any, int] = {}
+        action_types = [action.get(type_key) for action in actions]
+        type_codes = [type_index.setdefault(action_type, len(type_index)) for action_type in action_types]
+        
+        raw_timestamps = [action.get('timestamp') for action in actions]
+        if any(timestamp is not None for timestamp in raw_timestamps):
+            timestamps = np.array([_to_epoch(timestamp) for timestamp in raw_timestamps], dtype=np.float64)
+        else:
+            timestamps = np.full(len(actions), np.nan)
+        
+        return cls(
+            action_types=action_types,
+            type_codes=np.array(type_codes, dtype=np.int32),
+            success=np.array([bool(action.get('success', True)) for action in actions], dtype=bool),
+            durations=np.array([action.get(duration_key) or 0 for action in actions], dtype=np.float64),
+            timestamps=timestamps,
+            offsets=offsets
+        )
+    
+    @classmethod
+    def from_actions(cls, action_sequence: List[Dict[str, Any]], type_key: str = 'type',
+                     duration_key: str = 'execution_time') -> 'ActionSequenceArrays':
+        """從單個動作序列構建列式表示"""
+        return cls.from_sequences([action_sequence], type_key, duration_key)
+    
+    @property
+    def sequence_count(self) -> int:
+        return len(self.offsets) - 1
+    
+    @cached_property
+    def counts(self) -> np.ndarray:
+        """各序列的動作數"""
+        return np.diff(self.offsets)
+    
+    @cached_property
+    def segment(self) -> np.ndarray:
+        """每個動作所屬的序列下標"""
+        return np.repeat(np.arange(self.sequence_count), self.counts)
+    
+    def __len__(self) -> int:
+        return len(self.action_types)
+
 class FeatureExtractor:
     """特徵提取器"""
     
+    # 序列統計量列，build_feature_matrix 在其後追加 OUTCOME_COLUMNS
+    SEQUENCE_COLUMNS = [
+        'action_count',
+        'success_rate',
+        'error_count',
+        'retry_count',
+        'total_time',
+        'average_action_time',
+        'time_variance',
+        'peak_time',
+        'wall_time'
+    ]
+    
+    OUTCOME_COLUMNS = [
+        'overall_success',
+        'completion_time',
+        'user_satisfaction',
+        'resource_efficiency',
+        'user_intent_clarity'
+    ]
+    
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.FeatureExtractor")
     
     def extract_features(self, interaction_data: InteractionData) -> Dict[str, Any]:
         """提取交互特徵"""
         try:
-            features = {
-                'basic_features': self._extract_basic_features(interaction_data),
-                'sequence_features': self._extract_sequence_features(interaction_data),
-                'context_features': self._extract_context_features(interaction_data),
-                'outcome_features': self._extract_outcome_features(interaction_data),
-                'temporal_features': self._extract_temporal_features(interaction_data)
-            }
-            
-            return features
-            
+            return self.extract_features_batch([interaction_data])[0]
         except Exception as e:
             self.logger.error(f"特徵提取失敗: {e}")
             return {}
     
-    def _extract_basic_features(self, interaction_data: InteractionData) -> Dict[str, Any]:
+    def extract_features_batch(self, interactions: List[InteractionData]) -> List[Dict[str, Any]]:
+        """
+        批量提取交互特徵
+        
+        所有動作序列拼接為一個列式表示，序列和時間特徵對整批一次算出。
+        
+        Args:
+            interactions: 標準化交互數據列表
+        
+        Returns:
+            與 extract_features 結構相同的特徵字典列表
+        """
+        arrays = ActionSequenceArrays.from_sequences([item.action_sequence for item in interactions])
+        stats = self._sequence_statistics(arrays).tolist()
+        error_positions = self._find_error_positions(arrays)
+        retry_patterns = self._identify_retry_patterns(arrays)
+        branching_points = self._find_branching_points(arrays)
+        time_distributions = self._analyze_time_distribution(arrays)
+        offsets = arrays.offsets.tolist()
+        
+        features_list = []
+        for i, interaction_data in enumerate(interactions):
+            row_stats = dict(zip(self.SEQUENCE_COLUMNS, stats[i]))
+            action_types = arrays.action_types[offsets[i]:offsets[i + 1]]
+            
+            features_list.append({
+                'basic_features': self._extract_basic_features(interaction_data, row_stats),
+                'sequence_features': {
+                    'action_types': action_types,
+                    'action_pattern': self._extract_action_pattern(action_types),
+                    'error_positions': error_positions[i],
+                    'retry_patterns': retry_patterns[i],
+                    'branching_points': branching_points[i]
+                },
+                'context_features': self._extract_context_features(interaction_data),
+                'outcome_features': self._extract_outcome_features(interaction_data),
+                'temporal_features': self._extract_temporal_features(row_stats, time_distributions[i])
+            })
+        
+        return features_list
+    
+    def build_feature_matrix(self, interactions: List[InteractionData]) -> Tuple[np.ndarray, List[str]]:
+        """
+        將多個交互轉換為數值特徵矩陣，供模式分析和RL訓練使用
+        
+        Args:
+            interactions: 標準化交互數據列表
+        
+        Returns:
+            (特徵矩陣, 列名)，矩陣每行對應一個交互
+        """
+        arrays = ActionSequenceArrays.from_sequences([item.action_sequence for item in interactions])
+        sequence_stats = self._sequence_statistics(arrays)
+        
+        outcome_stats = np.zeros((len(interactions), len(self.OUTCOME_COLUMNS)), dtype=np.float64)
+        for i, interaction_data in enumerate(interactions):
+            outcome = self._extract_outcome_features(interaction_data)
+            outcome_stats[i] = [
+                float(outcome['overall_success']),
+                outcome['completion_time'],
+                outcome['user_satisfaction'],
+                outcome['resource_efficiency'],
+                self._assess_intent_clarity(interaction_data.context.get('user_intent', ''))
+            ]
+        
+        return np.hstack([sequence_stats, outcome_stats]), self.SEQUENCE_COLUMNS + self.OUTCOME_COLUMNS
+    
+    def _sequence_statistics(self, arrays: ActionSequenceArrays) -> np.ndarray:
+        """按序列分段計算 SEQUENCE_COLUMNS 中的統計量"""
+        n = arrays.sequence_count
+        stats = np.zeros((n, len(self.SEQUENCE_COLUMNS)), dtype=np.float64)
+        if len(arrays) == 0:
+            return stats
+        
+        counts = arrays.counts
+        segment = arrays.segment
+        success = arrays.success
+        durations = arrays.durations
+        timestamps = arrays.timestamps
+        
+        safe_counts = np.maximum(counts, 1)
+        total_time = np.bincount(segment, weights=durations, minlength=n)
+        mean_time = total_time / safe_counts
+        variance = np.bincount(segment, weights=(durations - mean_time[segment]) ** 2, minlength=n) / safe_counts
+        
+        peak_time = np.full(n, -np.inf)
+        np.maximum.at(peak_time, segment, durations)
+        
+        # 牆鐘時間：首尾有效時間戳之差
+        valid = ~np.isnan(timestamps)
+        first_ts = np.full(n, np.inf)
+        last_ts = np.full(n, -np.inf)
+        np.minimum.at(first_ts, segment[valid], timestamps[valid])
+        np.maximum.at(last_ts, segment[valid], timestamps[valid])
+        
+        stats[:, 0] = counts
+        stats[:, 1] = np.bincount(segment, weights=success, minlength=n) / safe_counts
+        stats[:, 2] = np.bincount(segment, weights=~success, minlength=n)
+        stats[:, 3] = np.bincount(segment[:-1][self._retry_mask(arrays)], minlength=n)
+        stats[:, 4] = total_time
+        stats[:, 5] = mean_time
+        stats[:, 6] = np.where(counts >= 2, variance, 0.0)
+        stats[:, 7] = np.where(counts > 0, peak_time, 0.0)
+        stats[:, 8] = np.where(np.isfinite(first_ts), last_ts - first_ts, 0.0)
+        return stats
+    
+    def _split_positions(self, arrays: ActionSequenceArrays, positions: np.ndarray) -> List[List[int]]:
+        """將拼接數組中的全局下標按序列拆分，並轉換為序列內的下標"""
+        local = (positions - arrays.offsets[:-1][arrays.segment[positions]]).tolist()
+        bounds = np.searchsorted(positions, arrays.offsets).tolist()
+        return [local[bounds[i]:bounds[i + 1]] for i in range(arrays.sequence_count)]
+    
+    def _retry_mask(self, arrays: ActionSequenceArrays) -> np.ndarray:
+        """相鄰動作對的重試標記：同一序列內失敗後緊接著同類型動作"""
+        segment = arrays.segment
+        return ((segment[:-1] == segment[1:]) &
+                (arrays.type_codes[:-1] == arrays.type_codes[1:]) &
+                ~arrays.success[:-1])
+    
+    def _extract_basic_features(self, interaction_data: InteractionData, stats: Dict[str, float]) -> Dict[str, Any]:
         """提取基本特徵"""
         return {
             'interaction_type': interaction_data.interaction_type.value,
-            'action_count': len(interaction_data.action_sequence),
-            'success_rate': self._calculate_action_success_rate(interaction_data.action_sequence),
+            'action_count': int(stats['action_count']),
+            'success_rate': stats['success_rate'],
             'complexity': interaction_data.metadata.get('complexity', 'medium'),
             'user_id': interaction_data.user_id
         }
     
-    def _extract_sequence_features(self, interaction_data: InteractionData) -> Dict[str, Any]:
-        """提取序列特徵"""
-        action_sequence = interaction_data.action_sequence
-        
-        return {
-            'action_types': [action.get('type') for action in action_sequence],
-            'action_pattern': self._extract_action_pattern(action_sequence),
-            'error_positions': self._find_error_positions(action_sequence),
-            'retry_patterns': self._identify_retry_patterns(action_sequence),
-            'branching_points': self._find_branching_points(action_sequence)
-        }
-    
     def _extract_context_features(self, interaction_data: InteractionData) -> Dict[str, Any]:
         """提取上下文特徵"""
         context = interaction_data.context
@@ -279,69 +490,51 @@ class FeatureExtractor:
             'resource_efficiency': self._calculate_resource_efficiency(outcomes.get('resources_used', {}))
         }
     
-    def _extract_temporal_features(self, interaction_data: InteractionData) -> Dict[str, Any]:
+    def _extract_temporal_features(self, stats: Dict[str, float], time_distribution: Dict[str, float]) -> Dict[str, Any]:
         """提取時間特徵"""
-        action_sequence = interaction_data.action_sequence
-        
-        execution_times = [action.get('execution_time', 0) for action in action_sequence]
-        
         return {
-            'total_time': sum(execution_times),
-            'average_action_time': sum(execution_times) / len(execution_times) if execution_times else 0,
-            'time_variance': self._calculate_time_variance(execution_times),
-            'peak_time': max(execution_times) if execution_times else 0,
-            'time_distribution': self._analyze_time_distribution(execution_times)
+            'total_time': stats['total_time'],
+            'average_action_time': stats['average_action_time'],
+            'time_variance': stats['time_variance'],
+            'peak_time': stats['peak_time'],
+            'wall_time': stats['wall_time'],
+            'time_distribution': time_distribution
         }
     
-    def _calculate_action_success_rate(self, action_sequence: List[Dict[str, Any]]) -> float:
-        """計算動作成功率"""
-        if not action_sequence:
-            return 0.0
-        
-        successful_actions = sum(1 for action in action_sequence if action.get('success', True))
-        return successful_actions / len(action_sequence)
-    
-    def _extract_action_pattern(self, action_sequence: List[Dict[str, Any]]) -> str:
+    def _extract_action_pattern(self, action_types: List[Any]) -> str:
         """提取動作模式"""
-        action_types = [action.get('type', 'unknown') for action in action_sequence]
-        return ' -> '.join(action_types)
-    
-    def _find_error_positions(self, action_sequence: List[Dict[str, Any]]) -> List[int]:
-        """找到錯誤位置"""
-        error_positions = []
-        for i, action in enumerate(action_sequence):
-            if not action.get('success', True):
-                error_positions.append(i)
-        return error_positions
-    
-    def _identify_retry_patterns(self, action_sequence: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """識別重試模式"""
-        retry_patterns = []
+        return ' -> '.join('unknown' if action_type is None else str(action_type) for action_type in action_types)
+    
+    def _find_error_positions(self, arrays: ActionSequenceArrays) -> List[List[int]]:
+        """找到各序列的錯誤位置"""
+        return self._split_positions(arrays, np.flatnonzero(~arrays.success))
+    
+    def _identify_retry_patterns(self, arrays: ActionSequenceArrays) -> List[List[Dict[str, Any]]]:
+        """識別各序列的重試模式"""
+        retry_positions = np.flatnonzero(self._retry_mask(arrays))
+        action_types = [arrays.action_types[i] for i in retry_positions.tolist()]
         
-        for i in range(len(action_sequence) - 1):
-            current_action = action_sequence[i]
-            next_action = action_sequence[i + 1]
-            
-            if (current_action.get('type') == next_action.get('type') and
-                not current_action.get('success', True)):
-                retry_patterns.append({
-                    'position': i,
-                    'action_type': current_action.get('type'),
+        retry_patterns = []
+        start = 0
+        for positions in self._split_positions(arrays, retry_positions):
+            retry_patterns.append([
+                {
+                    'position': position,
+                    'action_type': action_type,
                     'retry_count': 1
-                })
+                }
+                for position, action_type in zip(positions, action_types[start:start + len(positions)])
+            ])
+            start += len(positions)
         
         return retry_patterns
     
-    def _find_branching_points(self, action_sequence: List[Dict[str, Any]]) -> List[int]:
-        """找到分支點"""
-        # 簡化實現：找到錯誤後的恢復點
-        branching_points = []
-        
-        for i, action in enumerate(action_sequence):
-            if not action.get('success', True) and i < len(action_sequence) - 1:
-                branching_points.append(i + 1)
-        
-        return branching_points
+    def _find_branching_points(self, arrays: ActionSequenceArrays) -> List[List[int]]:
+        """找到各序列的分支點"""
+        # 簡化實現：找到錯誤後的恢復點（同一序列內失敗動作的下一個位置）
+        segment = arrays.segment
+        recovery = (segment[:-1] == segment[1:]) & ~arrays.success[:-1]
+        return self._split_positions(arrays, np.flatnonzero(recovery) + 1)
     
     def _classify_task_type(self, context: Dict[str, Any]) -> str:
         """分類任務類型"""
@@ -397,30 +590,28 @@ class FeatureExtractor:
         efficiency = 1.0 - (cpu_usage + memory_usage) / 2
         return max(0.0, min(1.0, efficiency))
     
-    def _calculate_time_variance(self, execution_times: List[float]) -> float:
-        """計算時間方差"""
-        if len(execution_times) < 2:
-            return 0.0
-        
-        mean_time = sum(execution_times) / len(execution_times)
-        variance = sum((t - mean_time) ** 2 for t in execution_times) / len(execution_times)
-        return variance
-    
-    def _analyze_time_distribution(self, execution_times: List[float]) -> Dict[str, float]:
-        """分析時間分布"""
-        if not execution_times:
-            return {}
-        
-        sorted_times = sorted(execution_times)
-        n = len(sorted_times)
-        
-        return {
-            'min': sorted_times[0],
-            'q1': sorted_times[n // 4] if n > 4 else sorted_times[0],
-            'median': sorted_times[n // 2],
-            'q3': sorted_times[3 * n // 4] if n > 4 else sorted_times[-1],
-            'max': sorted_times[-1]
-        }
+    def _analyze_time_distribution(self, arrays: ActionSequenceArrays) -> List[Dict[str, float]]:
+        """分析各序列的時間分布"""
+        counts = arrays.counts
+        starts = arrays.offsets[:-1]
+        
+        # 按 (序列, 執行時間) 排序後，各分位數即為每段內固定偏移處的元素
+        sorted_times = arrays.durations[np.lexsort((arrays.durations, arrays.segment))]
+        nonempty = counts > 0
+        starts, counts = starts[nonempty], counts[nonempty]
+        many = counts > 4
+        
+        quantiles = np.column_stack([
+            sorted_times[starts],
+            sorted_times[np.where(many, starts + counts // 4, starts)],
+            sorted_times[starts + counts // 2],
+            sorted_times[np.where(many, starts + 3 * counts // 4, starts + counts - 1)],
+            sorted_times[starts + counts - 1]
+        ]).tolist() if len(starts) else []
+        
+        keys = ('min', 'q1', 'median', 'q3', 'max')
+        rows = iter(quantiles)
+        return [dict(zip(keys, next(rows))) if has_actions else {} for has_actions in nonempty.tolist()]
 
 class PatternAnalyzer:
     """模式分析器"""
@@ -429,8 +620,14 @@ class PatternAnalyzer:
         self.logger = logging.getLogger(f"{__name__}.PatternAnalyzer")
         self.patterns_db = {}
     
-    def analyze_patterns(self, features: Dict[str, Any]) -> Dict[str, Any]:
-        """分析操作模式"""
+    def analyze_patterns(self, features: Dict[str, Any], update_db: bool = True) -> Dict[str, Any]:
+        """
+        分析操作模式
+        
+        Args:
+            features: 交互特徵
+            update_db: 是否立即寫入模式數據庫，批量處理時由調用方按批寫入
+        """
         try:
             patterns = {
                 'successful_workflows': self._identify_successful_workflows(features),
@@ -441,7 +638,8 @@ class PatternAnalyzer:
             }
             
             # 更新模式數據庫
-            self._update_patterns_db(patterns)
+            if update_db:
+                self._update_patterns_db(patterns)
             
             return patterns
             
@@ -668,6 +866,10 @@ class PatternAnalyzer:
             if pattern_type not in self.patterns_db:
                 self.patterns_db[pattern_type] = []
             
+            # user_preferences 等以單個字典表示的模式按一條記錄保存
+            if isinstance(pattern_list, dict):
+                pattern_list = [pattern_list]
+            
             for pattern in pattern_list:
                 pattern['discovered_at'] = timestamp
                 self.patterns_db[pattern_type].append(pattern)
@@ -684,8 +886,14 @@ class WorkflowTemplateManager:
         # 加載現有模板
         self._load_existing_templates()
     
-    def generate_templates(self, patterns: Dict[str, Any]) -> Dict[str, List[WorkflowTemplate]]:
-        """基於模式生成工作流模板"""
+    def generate_templates(self, patterns: Dict[str, Any], save: bool = True) -> Dict[str, List[WorkflowTemplate]]:
+        """
+        基於模式生成工作流模板
+        
+        Args:
+            patterns: 模式分析結果
+            save: 是否立即寫入模板文件，批量處理時由調用方按批寫入
+        """
         templates = {}
         
         try:
@@ -708,7 +916,8 @@ class WorkflowTemplateManager:
                 )
             
             # 保存模板
-            self._save_templates(templates)
+            if save:
+                self._save_templates(templates)
             
             return templates
             
@@ -942,9 +1151,257 @@ class WorkflowTemplateManager:
         
         return matching_templates
 
+class SessionIndex:
+    """會話索引
+
+    將每個會話的任務類型、複雜度、結果、時間戳和歸一化特徵向量寫入SQLite，
+    相似會話查詢只讀索引，不需要逐個加載會話目錄中的JSON文件。
+    """
+    
+    SCHEMA_VERSION = 1
+    
+    # 特徵向量的各維度，均歸一化到 [0, 1]
+    VECTOR_FIELDS = [
+        'success_rate',
+        'overall_success',
+        'user_satisfaction',
+        'resource_efficiency',
+        'user_intent_clarity',
+        'complexity',
+        'initial_state_complexity',
+        'action_count',
+        'completion_time',
+        'error_count',
+        'available_tools'
+    ]
+    
+    COMPLEXITY_LEVELS = {'simple': 0.0, 'medium': 0.5, 'complex': 1.0}
+    
+    # 計數類特徵的歸一化上限
+    SCALES = {
+        'action_count': 20,
+        'completion_time': 300,  # 5分鐘為基準，與獎勵計算一致
+        'error_count': 5,
+        'available_tools': 20
+    }
+    
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = str(db_path)
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(f"{__name__}.SessionIndex")
+        
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            # 向量維度或表結構變化時重建索引
+            self.connection.execute("DROP TABLE IF EXISTS sessions")
+        
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                timestamp TEXT,
+                task_type TEXT,
+                interaction_type TEXT,
+                complexity TEXT,
+                overall_success INTEGER,
+                success_rate REAL,
+                action_count INTEGER,
+                completion_time REAL,
+                user_satisfaction REAL,
+                error_count INTEGER,
+                feature_vector BLOB NOT NULL
+            )
+        """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_task_type ON sessions(task_type, timestamp)"
+        )
+        self.connection.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        self.connection.commit()
+    
+    @staticmethod
+    def flatten_features(features: Dict[str, Any]) -> Dict[str, Any]:
+        """將 FeatureExtractor 的分組特徵合併為一層"""
+        flat = {}
+        for group in ('basic_features', 'context_features', 'outcome_features'):
+            flat.update(features.get(group, {}))
+        return flat
+    
+    def vectorize(self, values: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        將特徵值轉換為歸一化向量
+        
+        Args:
+            values: 扁平的特徵字典，缺少的維度視為未知
+        
+        Returns:
+            (向量, 掩碼)，掩碼為1的維度表示該特徵有值
+        """
+        vector = np.zeros(len(self.VECTOR_FIELDS), dtype=np.float32)
+        mask = np.zeros(len(self.VECTOR_FIELDS), dtype=np.float32)
+        
+        for i, name in enumerate(self.VECTOR_FIELDS):
+            value = values.get(name)
+            if value is None:
+                continue
+            
+            if name in ('complexity', 'initial_state_complexity'):
+                if value not in self.COMPLEXITY_LEVELS:
+                    continue
+                value = self.COMPLEXITY_LEVELS[value]
+            elif name in self.SCALES:
+                value = min(float(value) / self.SCALES[name], 1.0)
+            
+            vector[i] = max(0.0, min(1.0, float(value)))
+            mask[i] = 1.0
+        
+        return vector, mask
+    
+    def upsert(self, interaction_data: InteractionData, features: Dict[str, Any]):
+        """寫入或更新一個會話的索引記錄"""
+        self.upsert_many([(interaction_data, features)])
+    
+    def upsert_many(self, items: List[Tuple[InteractionData, Dict[str, Any]]]):
+        """在一個事務中寫入或更新多個會話的索引記錄"""
+        rows = [self._build_row(interaction_data, features) for interaction_data, features in items]
+        
+        with self.lock:
+            self.connection.executemany(
+                """
+                INSERT OR REPLACE INTO sessions (
+                    session_id, timestamp, task_type, interaction_type, complexity,
+                    overall_success, success_rate, action_count, completion_time,
+                    user_satisfaction, error_count, feature_vector
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+            self.connection.commit()
+    
+    def _build_row(self, interaction_data: InteractionData, features: Dict[str, Any]) -> Tuple:
+        flat = self.flatten_features(features)
+        vector, _ = self.vectorize(flat)
+        
+        return (
+            interaction_data.session_id,
+            interaction_data.timestamp,
+            flat.get('task_type', 'general'),
+            interaction_data.interaction_type.value,
+            flat.get('complexity', 'medium'),
+            int(bool(flat.get('overall_success', False))),
+            flat.get('success_rate', 0.0),
+            flat.get('action_count', 0),
+            flat.get('completion_time', 0),
+            flat.get('user_satisfaction', 0.5),
+            flat.get('error_count', 0),
+            vector.tobytes()
+        )
+    
+    def query(self, values: Dict[str, Any], task_type: Optional[str] = None,
+              limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        查詢最相似的會話
+        
+        Args:
+            values: 查詢特徵（扁平字典），只比較其中有值的維度
+            task_type: 任務類型過濾，None表示不過濾
+            limit: 返回數量
+        
+        Returns:
+            按相似度降序排列的會話摘要，相似度相同時較新的會話在前
+        """
+        sql = """
+            SELECT session_id, timestamp, task_type, interaction_type, complexity,
+                   overall_success, success_rate, action_count, completion_time,
+                   user_satisfaction, error_count, feature_vector
+            FROM sessions
+        """
+        params: Tuple = ()
+        if task_type is not None:
+            sql += " WHERE task_type = ?"
+            params = (task_type,)
+        sql += " ORDER BY timestamp DESC"
+        
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        
+        if not rows or limit <= 0:
+            return []
+        
+        query_vector, mask = self.vectorize(values)
+        matrix = np.frombuffer(b''.join(row[-1] for row in rows), dtype=np.float32)
+        matrix = matrix.reshape(len(rows), len(self.VECTOR_FIELDS))
+        
+        # 相似度 = 1 - 已知維度上的平均絕對差
+        known = mask.sum()
+        if known > 0:
+            scores = 1.0 - (np.abs(matrix - query_vector) * mask).sum(axis=1) / known
+        else:
+            scores = np.ones(len(rows), dtype=np.float32)
+        
+        order = np.argsort(-scores, kind='stable')[:limit]
+        
+        columns = ['session_id', 'timestamp', 'task_type', 'interaction_type', 'complexity',
+                   'overall_success', 'success_rate', 'action_count', 'completion_time',
+                   'user_satisfaction', 'error_count']
+        results = []
+        for i in order:
+            summary = dict(zip(columns, rows[i][:-1]))
+            summary['overall_success'] = bool(summary['overall_success'])
+            results.append({
+                'session_id': summary['session_id'],
+                'summary': summary,
+                'similarity_score': float(scores[i])
+            })
+        
+        return results
+    
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+# 批量處理工作進程中的組件實例，每個進程首次調用時創建
+_worker_components: Optional[Tuple[DataStandardizer, FeatureExtractor]] = None
+
+def _standardize_and_extract(replays: List[Dict[str, Any]]) -> List[Tuple[Optional[InteractionData], Dict[str, Any], Optional[str]]]:
+    """標準化一組Replay並批量提取特徵（在進程池中執行）
+
+    Returns:
+        與輸入順序對應的 (標準化數據, 特徵, 錯誤信息) 列表
+    """
+    global _worker_components
+    if _worker_components is None:
+        _worker_components = (DataStandardizer(), FeatureExtractor())
+    standardizer, extractor = _worker_components
+    
+    results: List[Tuple[Optional[InteractionData], Dict[str, Any], Optional[str]]] = []
+    for replay_data in replays:
+        try:
+            results.append((standardizer.standardize_replay(replay_data), {}, None))
+        except Exception as e:
+            results.append((None, {}, str(e)))
+    
+    standardized = [item for item, _, _ in results if item is not None]
+    try:
+        features_iter = iter(extractor.extract_features_batch(standardized))
+    except Exception as e:
+        return [(None, {}, f"特徵提取失敗: {e}") if item is not None else (item, features, error)
+                for item, features, error in results]
+    
+    return [(item, next(features_iter), None) if item is not None else (item, features, error)
+            for item, features, error in results]
+
 class EnhancedInteractionLogManager:
     """增強版交互日誌管理器"""
     
+    MAX_BATCH_ERRORS = 100  # 批處理摘要中保留的錯誤信息數
+    
     def __init__(self, data_dir: str = "enhanced_interaction_data"):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
@@ -954,6 +1411,7 @@ class EnhancedInteractionLogManager:
         self.feature_extractor = FeatureExtractor()
         self.pattern_analyzer = PatternAnalyzer()
         self.workflow_templates = WorkflowTemplateManager(str(self.data_dir / "templates"))
+        self.session_index = SessionIndex(self.data_dir / "session_index.db")
         
         # 統計信息
         self.statistics = {
@@ -964,6 +1422,11 @@ class EnhancedInteractionLogManager:
         }
         
         self.logger = logging.getLogger(__name__)
+        
+        # 首次啟用索引時為已有的會話補建索引
+        if self.session_index.count() == 0:
+            self.rebuild_session_index()
+        
         self.logger.info("Enhanced Interaction Log Manager 初始化完成")
     
     def process_replay_data(self, replay_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -1120,69 +1583,253 @@ class EnhancedInteractionLogManager:
                                templates: Dict[str, List[WorkflowTemplate]]):
         """保存處理結果"""
         try:
-            # 創建保存目錄
-            session_dir = self.data_dir / "sessions" / interaction_data.session_id
-            session_dir.mkdir(parents=True, exist_ok=True)
+            session_dir = self._write_session_files(interaction_data, features, patterns, indent=2)
+            self._write_statistics()
             
-            # 保存標準化數據
-            with open(session_dir / "interaction_data.json", 'w', encoding='utf-8') as f:
-                json.dump(asdict(interaction_data), f, ensure_ascii=False, indent=2, default=str)
+            # 更新會話索引
+            self.session_index.upsert(interaction_data, features)
             
-            # 保存特徵
-            with open(session_dir / "features.json", 'w', encoding='utf-8') as f:
-                json.dump(features, f, ensure_ascii=False, indent=2)
+            self.logger.info(f"處理結果已保存到 {session_dir}")
             
-            # 保存模式
-            with open(session_dir / "patterns.json", 'w', encoding='utf-8') as f:
-                json.dump(patterns, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"保存處理結果失敗: {e}")
+    
+    def _write_session_files(self, interaction_data: InteractionData,
+                             features: Dict[str, Any],
+                             patterns: Dict[str, Any],
+                             indent: Optional[int] = 2) -> Path:
+        """寫入單個會話的標準化數據、特徵和模式文件"""
+        # 創建保存目錄
+        session_dir = self.data_dir / "sessions" / interaction_data.session_id
+        session_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 保存標準化數據
+        with open(session_dir / "interaction_data.json", 'w', encoding='utf-8') as f:
+            json.dump(asdict(interaction_data), f, ensure_ascii=False, indent=indent, default=str)
+        
+        # 保存特徵
+        with open(session_dir / "features.json", 'w', encoding='utf-8') as f:
+            json.dump(features, f, ensure_ascii=False, indent=indent)
+        
+        # 保存模式
+        with open(session_dir / "patterns.json", 'w', encoding='utf-8') as f:
+            json.dump(patterns, f, ensure_ascii=False, indent=indent)
+        
+        return session_dir
+    
+    def _write_statistics(self):
+        """保存統計信息"""
+        with open(self.data_dir / "statistics.json", 'w', encoding='utf-8') as f:
+            json.dump(self.statistics, f, ensure_ascii=False, indent=2)
+    
+    def process_replay_batch(self, replays: Iterable[Dict[str, Any]], batch_size: int = 100,
+                             workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        批量處理Replay數據
+        
+        replays 可以是任意可迭代對象（包括生成器），按 batch_size 分批讀取，不會一次性加載。
+        標準化和特徵提取在進程池中並行執行；模式數據庫、模板文件、會話索引和統計信息
+        每批只更新一次，會話文件以緊湊JSON寫入。
+        
+        Args:
+            replays: Replay數據的可迭代對象
+            batch_size: 每批處理的Replay數
+            workers: 進程池大小，默認為CPU核數；小於等於1時在當前進程中處理
+        
+        Returns:
+            批處理摘要：處理數、失敗數、錯誤列表（最多 MAX_BATCH_ERRORS 條）和統計信息
+        """
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        summary = {'processed': 0, 'failed': 0, 'batches': 0, 'errors': []}
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        
+        try:
+            iterator = iter(replays)
+            while True:
+                chunk = list(itertools.islice(iterator, batch_size))
+                if not chunk:
+                    break
+                
+                if executor:
+                    # 每個工作進程對一段Replay做一次批量特徵提取
+                    step = max(1, -(-len(chunk) // (workers * 4)))
+                    parts = [chunk[i:i + step] for i in range(0, len(chunk), step)]
+                    extracted = [item for part in executor.map(_standardize_and_extract, parts) for item in part]
+                else:
+                    extracted = _standardize_and_extract(chunk)
+                
+                self._process_extracted_batch(extracted, summary)
+                summary['batches'] += 1
+                self.logger.info(f"批次 {summary['batches']} 完成，累計處理 {summary['processed']} 個Replay")
+        finally:
+            if executor:
+                executor.shutdown()
+        
+        summary['statistics'] = self.statistics.copy()
+        return summary
+    
+    def _process_extracted_batch(self, extracted: List[Tuple[Optional[InteractionData], Dict[str, Any], Optional[str]]],
+                                 summary: Dict[str, Any]):
+        """對一批已提取特徵的Replay進行模式分析並按批寫入結果"""
+        processed = []
+        batch_patterns: Dict[str, List[Dict[str, Any]]] = {}
+        batch_templates: Dict[str, Dict[str, WorkflowTemplate]] = {}
+        
+        for interaction_data, features, error in extracted:
+            if interaction_data is None:
+                self._record_batch_error(summary, error)
+                continue
             
-            # 保存統計信息
-            with open(self.data_dir / "statistics.json", 'w', encoding='utf-8') as f:
-                json.dump(self.statistics, f, ensure_ascii=False, indent=2)
+            patterns = self.pattern_analyzer.analyze_patterns(features, update_db=False)
+            templates = self.workflow_templates.generate_templates(patterns, save=False)
             
-            self.logger.info(f"處理結果已保存到 {session_dir}")
+            for pattern_type, pattern_list in patterns.items():
+                entries = [pattern_list] if isinstance(pattern_list, dict) else pattern_list
+                batch_patterns.setdefault(pattern_type, []).extend(entries)
+            for template_type, template_list in templates.items():
+                for template in template_list:
+                    batch_templates.setdefault(template_type, {})[template.id] = template
             
+            processed.append((interaction_data, features, patterns, templates))
+        
+        # 模式數據庫和模板文件每批只更新一次
+        self.pattern_analyzer._update_patterns_db(batch_patterns)
+        if batch_templates:
+            self.workflow_templates._save_templates(
+                {template_type: list(templates.values()) for template_type, templates in batch_templates.items()}
+            )
+        
+        index_items = []
+        for interaction_data, features, patterns, templates in processed:
+            self._update_statistics(interaction_data, patterns, templates)
+            try:
+                self._write_session_files(interaction_data, features, patterns, indent=None)
+                index_items.append((interaction_data, features))
+                summary['processed'] += 1
+            except Exception as e:
+                self.logger.error(f"保存會話失敗 {interaction_data.session_id}: {e}")
+                self._record_batch_error(summary, str(e))
+        
+        try:
+            self.session_index.upsert_many(index_items)
+            self._write_statistics()
         except Exception as e:
-            self.logger.error(f"保存處理結果失敗: {e}")
+            self.logger.error(f"保存批處理結果失敗: {e}")
+    
+    def _record_batch_error(self, summary: Dict[str, Any], error: str):
+        summary['failed'] += 1
+        if len(summary['errors']) < self.MAX_BATCH_ERRORS:
+            summary['errors'].append(error)
+    
+    def ingest_jsonl(self, path: Union[str, Path], batch_size: int = 100,
+                     workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        從JSONL/NDJSON文件流式導入Replay數據，每行一個Replay
+        
+        Args:
+            path: JSONL文件路徑
+            batch_size: 每批處理的Replay數
+            workers: 進程池大小
+        
+        Returns:
+            批處理摘要，另含無法解析的行數 invalid_lines
+        """
+        invalid_lines = 0
+        
+        def read_replays():
+            nonlocal invalid_lines
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        invalid_lines += 1
+                        self.logger.warning(f"跳過無法解析的行 {path}:{line_number}: {e}")
+        
+        summary = self.process_replay_batch(read_replays(), batch_size=batch_size, workers=workers)
+        summary['invalid_lines'] = invalid_lines
+        return summary
     
     def get_statistics(self) -> Dict[str, Any]:
         """獲取統計信息"""
         return self.statistics.copy()
     
-    def find_similar_interactions(self, context: Dict[str, Any], limit: int = 5) -> List[Dict[str, Any]]:
-        """找到相似的交互"""
-        # 簡化實現：基於任務類型匹配
-        similar_interactions = []
+    def find_similar_interactions(self, context: Dict[str, Any], limit: int = 5,
+                                  include_data: bool = False) -> List[Dict[str, Any]]:
+        """
+        找到相似的交互
         
-        target_task_type = context.get('task_type', 'unknown')
+        Args:
+            context: 查詢上下文，可包含 task_type 或 task_description，
+                     以及 SessionIndex.VECTOR_FIELDS 中的任意特徵
+            limit: 返回數量
+            include_data: 是否為返回的會話加載完整的 interaction_data.json
         
-        # 搜索會話目錄
-        sessions_dir = self.data_dir / "sessions"
-        if sessions_dir.exists():
-            for session_dir in sessions_dir.iterdir():
-                if session_dir.is_dir():
-                    interaction_file = session_dir / "interaction_data.json"
-                    if interaction_file.exists():
-                        try:
-                            with open(interaction_file, 'r', encoding='utf-8') as f:
-                                interaction_data = json.load(f)
-                            
-                            # 檢查任務類型匹配
-                            if interaction_data.get('context', {}).get('task_type') == target_task_type:
-                                similar_interactions.append({
-                                    'session_id': interaction_data.get('session_id'),
-                                    'interaction_data': interaction_data,
-                                    'similarity_score': 0.8  # 簡化的相似度分數
-                                })
-                                
-                                if len(similar_interactions) >= limit:
-                                    break
-                                    
-                        except Exception as e:
-                            self.logger.error(f"讀取交互數據失敗 {interaction_file}: {e}")
+        Returns:
+            按相似度降序排列的會話列表
+        """
+        task_type = context.get('task_type')
+        if task_type is None and context.get('task_description'):
+            task_type = self.feature_extractor._classify_task_type(context)
+        
+        try:
+            similar_interactions = self.session_index.query(context, task_type=task_type, limit=limit)
+        except Exception as e:
+            self.logger.error(f"查詢會話索引失敗: {e}")
+            return []
+        
+        if include_data:
+            # 只讀取前k個會話的數據文件
+            for item in similar_interactions:
+                interaction_file = self.data_dir / "sessions" / item['session_id'] / "interaction_data.json"
+                try:
+                    with open(interaction_file, 'r', encoding='utf-8') as f:
+                        item['interaction_data'] = json.load(f)
+                except Exception as e:
+                    self.logger.error(f"讀取交互數據失敗 {interaction_file}: {e}")
         
         return similar_interactions
     
+    def rebuild_session_index(self) -> int:
+        """
+        根據會話目錄重建會話索引
+        
+        Returns:
+            寫入索引的會話數
+        """
+        sessions_dir = self.data_dir / "sessions"
+        if not sessions_dir.exists():
+            return 0
+        
+        indexed = 0
+        for session_dir in sessions_dir.iterdir():
+            interaction_file = session_dir / "interaction_data.json"
+            features_file = session_dir / "features.json"
+            if not (interaction_file.exists() and features_file.exists()):
+                continue
+            
+            try:
+                with open(interaction_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                with open(features_file, 'r', encoding='utf-8') as f:
+                    features = json.load(f)
+                
+                interaction_type = str(data.get('interaction_type', InteractionType.USER_INTERACTION.value))
+                interaction_type = interaction_type.split('.')[-1].lower()  # 兼容 "InteractionType.X" 形式
+                data['interaction_type'] = InteractionType(interaction_type)
+                
+                self.session_index.upsert(InteractionData(**data), features)
+                indexed += 1
+            except Exception as e:
+                self.logger.error(f"重建會話索引失敗 {session_dir}: {e}")
+        
+        if indexed:
+            self.logger.info(f"會話索引重建完成，共 {indexed} 個會話")
+        return indexed
+    
     def get_workflow_recommendations(self, context: Dict[str, Any]) -> List[WorkflowTemplate]:
         """獲取工作流推薦"""
         return self.workflow_templates.find_matching_templates(context)
@@ -1190,6 +1837,9 @@ class EnhancedInteractionLogManager:
 # 導出主要類
 __all__ = [
     'EnhancedInteractionLogManager',
+    'SessionIndex',
+    'ActionSequenceArrays',
+    'FeatureExtractor',
     'InteractionData',
     'WorkflowTemplate',
     'InteractionType',
@@ -284,42 +284,58 @@ class ReplayDataParser:
     
     def _analyze_operation_patterns(self, operations: List[ReplayOperation]) -> Dict[str, Any]:
         """分析操作模式"""
+        # 執行時間和成功標記只提取一次，時間和成功分析都在數組上向量化計算
+        durations = np.array([op.duration or 0.0 for op in operations], dtype=np.float64)
+        success = np.array([bool(op.success) for op in operations], dtype=bool)
+        
         patterns = {
             'action_sequence': [op.action_type for op in operations],
-            'timing_analysis': self._analyze_timing(operations),
-            'success_pattern': self._analyze_success_pattern(operations),
+            'timing_analysis': self._analyze_timing(durations),
+            'success_pattern': self._analyze_success_pattern(success),
             'target_analysis': self._analyze_targets(operations),
             'value_patterns': self._analyze_value_patterns(operations)
         }
         
         return patterns
     
-    def _analyze_timing(self, operations: List[ReplayOperation]) -> Dict[str, Any]:
+    def _analyze_timing(self, durations: np.ndarray) -> Dict[str, Any]:
         """分析時間模式"""
-        durations = [op.duration for op in operations]
+        has_operations = len(durations) > 0
         
         return {
-            'total_duration': sum(durations),
-            'average_duration': np.mean(durations) if durations else 0,
-            'max_duration': max(durations) if durations else 0,
-            'min_duration': min(durations) if durations else 0,
-            'duration_variance': np.var(durations) if durations else 0,
-            'slow_operations': [i for i, d in enumerate(durations) if d > 2.0]
+            'total_duration': float(durations.sum()),
+            'average_duration': float(durations.mean()) if has_operations else 0,
+            'max_duration': float(durations.max()) if has_operations else 0,
+            'min_duration': float(durations.min()) if has_operations else 0,
+            'duration_variance': float(durations.var()) if has_operations else 0,
+            'slow_operations': np.flatnonzero(durations > 2.0).tolist()
         }
     
-    def _analyze_success_pattern(self, operations: List[ReplayOperation]) -> Dict[str, Any]:
+    def _analyze_success_pattern(self, success: np.ndarray) -> Dict[str, Any]:
         """分析成功模式"""
-        total_ops = len(operations)
-        successful_ops = sum(1 for op in operations if op.success)
+        total_ops = len(success)
+        successful_ops = int(success.sum())
         
         return {
             'total_operations': total_ops,
             'successful_operations': successful_ops,
             'success_rate': successful_ops / total_ops if total_ops > 0 else 0,
-            'failed_operations': [i for i, op in enumerate(operations) if not op.success],
-            'consecutive_successes': self._find_consecutive_successes(operations)
+            'failed_operations': np.flatnonzero(~success).tolist(),
+            'consecutive_successes': self._find_consecutive_successes(success)
         }
     
+    def _find_consecutive_successes(self, success: np.ndarray) -> List[Dict[str, int]]:
+        """找到連續成功的操作段"""
+        # 在首尾補0後做差分，+1為成功段起點，-1為成功段終點（不含）
+        edges = np.diff(np.concatenate(([0], success.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        
+        return [
+            {'start': start, 'length': end - start}
+            for start, end in zip(starts.tolist(), ends.tolist())
+        ]
+    
     def _analyze_targets(self, operations: List[ReplayOperation]) -> Dict[str, Any]:
         """分析目標元素"""
         targets = [op.target for op in operations if op.target]
@@ -21,6 +21,9 @@ from pathlib import Path
 from dataclasses import dataclass, asdict
 from enum import Enum
 import pickle
+import sqlite3
+import threading
+import zlib
 from collections import defaultdict, deque
 
 # 配置日誌
@@ -84,11 +87,140 @@ class LearningExperience:
         if self.timestamp is None:
             self.timestamp = datetime.now().isoformat()
 
+class ContextIndex:
+    """上下文索引
+
+    任務類型、複雜度和環境按各自的詞表編碼為整數，精確比較；不匹配時沿用原有的部分相似度
+    （任務 0、複雜度 0.5、環境 0.3），按 0.5/0.3/0.2 加權。查詢附帶動作序列或獎勵時，
+    再加入動作 1-gram/2-gram（特徵哈希後歸一化）和獎勵（角度編碼）的余弦相似度。
+    各列按行追加到預分配的NumPy數組中，容量不足時倍增。
+    """
+    
+    # (字段, 默認值, 權重, 不匹配時的相似度)
+    FIELDS = [
+        ('task_type', 'unknown', 0.5, 0.0),
+        ('complexity', 'medium', 0.3, 0.5),
+        ('environment_type', 'unknown', 0.2, 0.3)
+    ]
+    ACTION_DIM = 64
+    ACTION_WEIGHT = 0.3
+    REWARD_WEIGHT = 0.1
+    
+    def __init__(self, initial_capacity: int = 1024):
+        self.vocabularies: List[Dict[str, int]] = [{} for _ in self.FIELDS]
+        self.codes = np.zeros((initial_capacity, len(self.FIELDS)), dtype=np.int32)
+        self.action_matrix = np.zeros((initial_capacity, self.ACTION_DIM), dtype=np.float32)
+        self.reward_matrix = np.zeros((initial_capacity, 2), dtype=np.float32)
+        self.entries: List[Tuple[str, Dict[str, Any]]] = []
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def embed(self, context_state: Dict[str, Any], action_sequence: Optional[List[Dict[str, Any]]] = None,
+              reward: Optional[float] = None, extend_vocabulary: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        嵌入上下文
+        
+        Args:
+            context_state: 上下文狀態（task_type、complexity、environment_type）
+            action_sequence: 動作序列，缺省時不參與比較
+            reward: 總獎勵，缺省時不參與比較
+            extend_vocabulary: 是否為新出現的字段值分配編碼；查詢時未見過的值編碼為 -1，不與任何行匹配
+        
+        Returns:
+            (字段編碼, 動作向量或None, 獎勵向量或None)
+        """
+        codes = np.empty(len(self.FIELDS), dtype=np.int32)
+        for position, (name, default, _, _) in enumerate(self.FIELDS):
+            value = str(context_state.get(name, default))
+            vocabulary = self.vocabularies[position]
+            if extend_vocabulary:
+                codes[position] = vocabulary.setdefault(value, len(vocabulary))
+            else:
+                codes[position] = vocabulary.get(value, -1)
+        
+        actions = None
+        if action_sequence:
+            actions = np.zeros(self.ACTION_DIM, dtype=np.float32)
+            action_types = [str(action.get('action_type', 'unknown')) for action in action_sequence]
+            for gram in action_types + [f"{a}->{b}" for a, b in zip(action_types, action_types[1:])]:
+                actions[zlib.crc32(gram.encode('utf-8')) % self.ACTION_DIM] += 1.0
+            actions /= np.linalg.norm(actions)
+        
+        reward_vector = None
+        if reward is not None:
+            theta = (np.tanh(float(reward)) + 1.0) / 2.0 * np.pi / 2
+            reward_vector = np.array([np.cos(theta), np.sin(theta)], dtype=np.float32)
+        
+        return codes, actions, reward_vector
+    
+    def add(self, pattern_key: str, pattern: Dict[str, Any]):
+        """將模式追加到索引"""
+        codes, actions, reward_vector = self.embed(
+            pattern.get('context_state', {}),
+            pattern.get('action_sequence', []),
+            pattern.get('total_reward', 0.0),
+            extend_vocabulary=True
+        )
+        
+        row = len(self.entries)
+        if row == len(self.codes):
+            self.codes = np.concatenate([self.codes, np.zeros_like(self.codes)])
+            self.action_matrix = np.concatenate([self.action_matrix, np.zeros_like(self.action_matrix)])
+            self.reward_matrix = np.concatenate([self.reward_matrix, np.zeros_like(self.reward_matrix)])
+        
+        self.codes[row] = codes
+        if actions is not None:
+            self.action_matrix[row] = actions
+        self.reward_matrix[row] = reward_vector
+        self.entries.append((pattern_key, pattern))
+    
+    def query(self, embedding: Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]],
+              top_k: int = 10, min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        相似度 top-k 查詢
+        
+        Args:
+            embedding: embed 返回的查詢嵌入
+            top_k: 返回數量
+            min_similarity: 相似度下限
+        
+        Returns:
+            按相似度降序排列的 (行號, 相似度) 列表
+        """
+        count = len(self.entries)
+        if count == 0 or top_k <= 0:
+            return []
+        
+        codes, actions, reward_vector = embedding
+        scores = np.zeros(count)
+        total_weight = 0.0
+        for position, (_, _, weight, mismatch) in enumerate(self.FIELDS):
+            scores += weight * np.where(self.codes[:count, position] == codes[position], 1.0, mismatch)
+            total_weight += weight
+        
+        if actions is not None:
+            scores += self.ACTION_WEIGHT * (self.action_matrix[:count] @ actions)
+            total_weight += self.ACTION_WEIGHT
+        if reward_vector is not None:
+            scores += self.REWARD_WEIGHT * (self.reward_matrix[:count] @ reward_vector)
+            total_weight += self.REWARD_WEIGHT
+        scores /= total_weight
+        
+        candidates = np.flatnonzero(scores >= min_similarity)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        
+        # 相似度相同時較早學到的模式在前
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(int(row), min(float(scores[row]), 1.0)) for row in candidates[order]]
+
 class PatternMatcher:
     """模式匹配器"""
     
     def __init__(self):
         self.patterns_db = defaultdict(list)
+        self.context_index = ContextIndex()
         self.similarity_threshold = 0.7
         self.logger = logging.getLogger(f"{__name__}.PatternMatcher")
     
@@ -106,6 +238,7 @@ class PatternMatcher:
             # 存儲模式
             pattern_key = self._generate_pattern_key(context_state)
             self.patterns_db[pattern_key].append(pattern)
+            self.context_index.add(pattern_key, pattern)
             
             # 分析模式洞察
             insights = self._analyze_pattern_insights(pattern_key)
@@ -123,39 +256,37 @@ class PatternMatcher:
             self.logger.error(f"模式學習失敗: {e}")
             return {}
     
-    def find_similar_contexts(self, current_context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """找到相似上下文"""
+    def find_similar_contexts(self, current_context: Dict[str, Any], top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        找到相似上下文
+        
+        Args:
+            current_context: 當前上下文，可附帶 action_sequence / reward_signals 參與匹配
+            top_k: 返回數量
+        
+        Returns:
+            按相似度降序排列的相似上下文
+        """
         try:
             current_pattern_key = self._generate_pattern_key(current_context)
-            similar_contexts = []
-            
-            # 精確匹配
-            if current_pattern_key in self.patterns_db:
-                for pattern in self.patterns_db[current_pattern_key]:
-                    similar_contexts.append({
-                        'context': pattern['context_state'],
-                        'similarity_score': 1.0,
-                        'match_type': 'exact',
-                        'pattern': pattern
-                    })
-            
-            # 模糊匹配
-            for pattern_key, patterns in self.patterns_db.items():
-                if pattern_key != current_pattern_key:
-                    similarity = self._calculate_context_similarity(current_context, pattern_key)
-                    if similarity >= self.similarity_threshold:
-                        for pattern in patterns:
-                            similar_contexts.append({
-                                'context': pattern['context_state'],
-                                'similarity_score': similarity,
-                                'match_type': 'fuzzy',
-                                'pattern': pattern
-                            })
+            reward_signals = current_context.get('reward_signals')
+            embedding = self.context_index.embed(
+                current_context,
+                current_context.get('action_sequence'),
+                reward_signals.get('total_reward') if reward_signals else None
+            )
             
-            # 按相似度排序
-            similar_contexts.sort(key=lambda x: x['similarity_score'], reverse=True)
+            similar_contexts = []
+            for row, similarity in self.context_index.query(embedding, top_k, self.similarity_threshold):
+                pattern_key, pattern = self.context_index.entries[row]
+                similar_contexts.append({
+                    'context': pattern['context_state'],
+                    'similarity_score': similarity,
+                    'match_type': 'exact' if pattern_key == current_pattern_key else 'fuzzy',
+                    'pattern': pattern
+                })
             
-            return similar_contexts[:10]  # 返回前10個最相似的
+            return similar_contexts
             
         except Exception as e:
             self.logger.error(f"相似上下文查找失敗: {e}")
@@ -208,28 +339,6 @@ class PatternMatcher:
         
         return insights
     
-    def _calculate_context_similarity(self, context1: Dict[str, Any], pattern_key: str) -> float:
-        """計算上下文相似度"""
-        # 簡化實現：基於任務類型和複雜度
-        context1_key = self._generate_pattern_key(context1)
-        
-        # 分解模式鍵
-        parts1 = context1_key.split('_')
-        parts2 = pattern_key.split('_')
-        
-        if len(parts1) != 3 or len(parts2) != 3:
-            return 0.0
-        
-        # 計算各部分相似度
-        task_similarity = 1.0 if parts1[0] == parts2[0] else 0.0
-        complexity_similarity = 1.0 if parts1[1] == parts2[1] else 0.5
-        environment_similarity = 1.0 if parts1[2] == parts2[2] else 0.3
-        
-        # 加權平均
-        similarity = (task_similarity * 0.5 + complexity_similarity * 0.3 + environment_similarity * 0.2)
-        
-        return similarity
-    
     def _calculate_success_rate(self, action_sequence: List[Dict[str, Any]]) -> float:
         """計算成功率"""
         if not action_sequence:
@@ -699,22 +808,57 @@ class FeedbackProcessor:
         return summary
 
 class KnowledgeBase:
-    """知識庫"""
+    """知識庫
+
+    策略、模式和學習經驗存儲在 knowledge_dir/knowledge.db（SQLite WAL）中：
+    每次更新只寫入變化的一行，經驗以追加方式寫入並按需加載；
+    經驗表是容量為 max_experiences 的環形緩衝，每追加 compaction_interval 條壓縮一次。
+    """
     
-    def __init__(self, knowledge_dir: str = "rl_knowledge"):
+    def __init__(self, knowledge_dir: str = "rl_knowledge", max_experiences: int = 1000,
+                 compaction_interval: int = 100):
         self.knowledge_dir = Path(knowledge_dir)
         self.knowledge_dir.mkdir(exist_ok=True)
         
-        self.experiences = []
+        self.max_experiences = max_experiences
+        self.compaction_interval = compaction_interval
+        self._appends_since_compaction = 0
+        
         self.strategies = {}
         self.patterns = {}
         self.metrics = {}
         
+        self.lock = threading.Lock()
         self.logger = logging.getLogger(f"{__name__}.KnowledgeBase")
         
+        self.connection = sqlite3.connect(str(self.knowledge_dir / "knowledge.db"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS strategies (
+                strategy_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS patterns (
+                pattern_key TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS experiences (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT,
+                data TEXT NOT NULL
+            );
+        """)
+        self.connection.commit()
+        
         # 加載現有知識
         self._load_knowledge()
     
+    @property
+    def experiences(self) -> List[LearningExperience]:
+        """按時間順序返回環形緩衝中的全部經驗（按需從數據庫加載）"""
+        return self.get_recent_experiences(self.max_experiences)
+    
     def update(self, optimized_strategies: Dict[str, Any]):
         """更新知識庫"""
         try:
@@ -723,21 +867,87 @@ class KnowledgeBase:
             # 更新策略
             self.strategies[strategy_id] = optimized_strategies
             
-            # 保存知識
-            self._save_knowledge()
+            # 只寫入變化的策略
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO strategies (strategy_id, data) VALUES (?, ?)",
+                    (strategy_id, json.dumps(optimized_strategies, ensure_ascii=False, default=str))
+                )
+                self.connection.commit()
             
             self.logger.info(f"知識庫更新完成: {strategy_id}")
             
         except Exception as e:
             self.logger.error(f"知識庫更新失敗: {e}")
     
+    def set_pattern(self, pattern_key: str, pattern: Dict[str, Any]):
+        """保存單個模式"""
+        self.patterns[pattern_key] = pattern
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO patterns (pattern_key, data) VALUES (?, ?)",
+                (pattern_key, json.dumps(pattern, ensure_ascii=False, default=str))
+            )
+            self.connection.commit()
+    
     def add_experience(self, experience: LearningExperience):
         """添加學習經驗"""
-        self.experiences.append(experience)
-        
-        # 限制經驗數量
-        if len(self.experiences) > 1000:
-            self.experiences = self.experiences[-1000:]
+        try:
+            with self.lock:
+                self.connection.execute(
+                    "INSERT INTO experiences (session_id, data) VALUES (?, ?)",
+                    (experience.session_id, json.dumps(asdict(experience), ensure_ascii=False, default=str))
+                )
+                self.connection.commit()
+            
+            # 限制經驗數量：按批壓縮，而不是每次追加都截斷
+            self._appends_since_compaction += 1
+            if self._appends_since_compaction >= self.compaction_interval:
+                self.compact()
+                
+        except Exception as e:
+            self.logger.error(f"添加學習經驗失敗: {e}")
+    
+    def get_recent_experiences(self, limit: int = 10) -> List[LearningExperience]:
+        """
+        獲取最近的經驗
+        
+        Args:
+            limit: 返回數量，不超過 max_experiences
+        
+        Returns:
+            按時間順序排列的經驗列表
+        """
+        limit = min(limit, self.max_experiences)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT data FROM experiences ORDER BY seq DESC LIMIT ?", (limit,)
+            ).fetchall()
+        
+        return [self._experience_from_json(data) for (data,) in reversed(rows)]
+    
+    def experience_count(self) -> int:
+        """環形緩衝中的經驗數"""
+        with self.lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM experiences").fetchone()[0]
+        return min(count, self.max_experiences)
+    
+    def compact(self):
+        """刪除超出環形緩衝容量的經驗，並將WAL合併回數據庫文件"""
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM experiences WHERE seq <= (SELECT MAX(seq) FROM experiences) - ?",
+                (self.max_experiences,)
+            )
+            self.connection.commit()
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._appends_since_compaction = 0
+    
+    def close(self):
+        """壓縮並關閉數據庫連接"""
+        self.compact()
+        with self.lock:
+            self.connection.close()
     
     def get_recent_updates(self) -> Dict[str, Any]:
         """獲取最近更新"""
@@ -753,73 +963,84 @@ class KnowledgeBase:
                 recent_strategies[strategy_id] = strategy
         
         # 獲取最近的經驗
-        for experience in self.experiences[-10:]:  # 最近10個經驗
+        for experience in self.get_recent_experiences(10):  # 最近10個經驗
             recent_experiences.append(asdict(experience))
         
         return {
             'recent_strategies': recent_strategies,
             'recent_experiences': recent_experiences,
             'total_strategies': len(self.strategies),
-            'total_experiences': len(self.experiences)
+            'total_experiences': self.experience_count()
         }
     
-    def _save_knowledge(self):
-        """保存知識到文件"""
-        try:
-            # 保存策略
-            strategies_file = self.knowledge_dir / "strategies.json"
-            with open(strategies_file, 'w', encoding='utf-8') as f:
-                json.dump(self.strategies, f, ensure_ascii=False, indent=2)
-            
-            # 保存經驗
-            experiences_file = self.knowledge_dir / "experiences.pkl"
-            with open(experiences_file, 'wb') as f:
-                pickle.dump(self.experiences, f)
-            
-            # 保存模式
-            patterns_file = self.knowledge_dir / "patterns.json"
-            with open(patterns_file, 'w', encoding='utf-8') as f:
-                json.dump(self.patterns, f, ensure_ascii=False, indent=2)
-            
-            self.logger.info("知識保存完成")
-            
-        except Exception as e:
-            self.logger.error(f"知識保存失敗: {e}")
+    @staticmethod
+    def _experience_from_json(data: str) -> LearningExperience:
+        experience = json.loads(data)
+        experience['context_state'] = ContextState(**experience['context_state'])
+        return LearningExperience(**experience)
     
     def _load_knowledge(self):
-        """從文件加載知識"""
+        """從數據庫加載策略和模式，經驗按需加載"""
         try:
-            # 加載策略
-            strategies_file = self.knowledge_dir / "strategies.json"
-            if strategies_file.exists():
-                with open(strategies_file, 'r', encoding='utf-8') as f:
-                    self.strategies = json.load(f)
-            
-            # 加載經驗
-            experiences_file = self.knowledge_dir / "experiences.pkl"
-            if experiences_file.exists():
-                with open(experiences_file, 'rb') as f:
-                    self.experiences = pickle.load(f)
+            with self.lock:
+                self.strategies = {
+                    strategy_id: json.loads(data)
+                    for strategy_id, data in self.connection.execute("SELECT strategy_id, data FROM strategies")
+                }
+                self.patterns = {
+                    pattern_key: json.loads(data)
+                    for pattern_key, data in self.connection.execute("SELECT pattern_key, data FROM patterns")
+                }
+                has_experiences = self.connection.execute("SELECT 1 FROM experiences LIMIT 1").fetchone() is not None
             
-            # 加載模式
-            patterns_file = self.knowledge_dir / "patterns.json"
-            if patterns_file.exists():
-                with open(patterns_file, 'r', encoding='utf-8') as f:
-                    self.patterns = json.load(f)
+            if not (self.strategies or self.patterns or has_experiences):
+                self._migrate_legacy_files()
             
-            self.logger.info(f"知識加載完成: {len(self.strategies)} 策略, {len(self.experiences)} 經驗")
+            self.logger.info(f"知識加載完成: {len(self.strategies)} 策略, {self.experience_count()} 經驗")
             
         except Exception as e:
             self.logger.error(f"知識加載失敗: {e}")
+    
+    def _migrate_legacy_files(self):
+        """將舊版 strategies.json / patterns.json / experiences.pkl 導入數據庫"""
+        strategies_file = self.knowledge_dir / "strategies.json"
+        patterns_file = self.knowledge_dir / "patterns.json"
+        experiences_file = self.knowledge_dir / "experiences.pkl"
+        
+        if strategies_file.exists():
+            with open(strategies_file, 'r', encoding='utf-8') as f:
+                for strategy_id, strategy in json.load(f).items():
+                    self.update({**strategy, 'pattern_key': strategy.get('pattern_key', strategy_id)})
+        
+        if patterns_file.exists():
+            with open(patterns_file, 'r', encoding='utf-8') as f:
+                for pattern_key, pattern in json.load(f).items():
+                    self.set_pattern(pattern_key, pattern)
+        
+        if experiences_file.exists():
+            with open(experiences_file, 'rb') as f:
+                legacy_experiences = pickle.load(f)
+            with self.lock:
+                self.connection.executemany(
+                    "INSERT INTO experiences (session_id, data) VALUES (?, ?)",
+                    [
+                        (experience.session_id, json.dumps(asdict(experience), ensure_ascii=False, default=str))
+                        for experience in legacy_experiences[-self.max_experiences:]
+                    ]
+                )
+                self.connection.commit()
+        
+        if strategies_file.exists() or patterns_file.exists() or experiences_file.exists():
+            self.logger.info("已將舊版知識文件導入 knowledge.db")
 
 class SimplifiedRLSRTAdapter:
     """簡化的RL SRT適配器"""
     
-    def __init__(self, knowledge_dir: str = "rl_srt_knowledge"):
+    def __init__(self, knowledge_dir: str = "rl_srt_knowledge", max_experiences: int = 1000):
         self.pattern_matcher = PatternMatcher()
         self.strategy_optimizer = StrategyOptimizer()
         self.feedback_processor = FeedbackProcessor()
-        self.knowledge_base = KnowledgeBase(knowledge_dir)
+        self.knowledge_base = KnowledgeBase(knowledge_dir, max_experiences=max_experiences)
         
         self.logger = logging.getLogger(__name__)
         self.logger.info("Simplified RL SRT Adapter 初始化完成")
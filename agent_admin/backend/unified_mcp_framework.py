@@ -13,8 +13,11 @@
 import asyncio
 import json
 import logging
+import random
 import time
-from typing import Dict, List, Any, Optional, Callable, Union
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Any, Optional, Callable, Union, Deque
 from dataclasses import dataclass, field
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -99,6 +102,18 @@ class MCPServiceInfo:
     request_count: int = 0
     error_count: int = 0
 
+@dataclass
+class MCPServiceHealth:
+    """MCP服務健康狀態緩存"""
+    service_id: str
+    healthy: bool = True
+    checked_at: float = 0.0          # 最近一次主動探測時間（monotonic）
+    probe_latency: float = 0.0       # 最近一次探測耗時（秒）
+    last_success: float = 0.0        # 最近一次成功處理請求的時間（monotonic）
+    response_time_avg: float = 0.0   # 請求響應時間的指數移動平均（秒）
+    consecutive_failures: int = 0
+    skipped_checks: int = 0
+
 @dataclass
 class MCPEvent:
     """MCP事件"""
@@ -169,53 +184,220 @@ class MCPServiceInterface(ABC):
 
 # ==================== 事件總線 ====================
 
+class EventSubscription:
+    """單個訂閱者：有界隊列 + 獨立工作協程
+    
+    溢出策略：
+    - drop_oldest: 丟棄隊列中最舊的事件
+    - drop_newest: 丟棄新事件
+    - block: 發布方等待隊列有空位（最多 block_timeout 秒，超時後丟棄新事件）
+    """
+    
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+    
+    def __init__(self, event_type: MCPEventType, callback: Callable, queue_size: int = 1000,
+                 overflow_policy: str = 'drop_oldest', block_timeout: float = 1.0):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的溢出策略: {overflow_policy}")
+        
+        self.event_type = event_type
+        self.callback = callback
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+        
+        # 指標
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+    
+    @property
+    def name(self) -> str:
+        return getattr(self.callback, '__qualname__', repr(self.callback))
+    
+    def _ensure_worker(self):
+        # 隊列和工作協程在首次發布時創建，綁定到當前事件循環
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+    
+    async def enqueue(self, event: MCPEvent) -> bool:
+        """將事件放入隊列，返回是否入隊"""
+        self._ensure_worker()
+        
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+            return True
+        
+        if self.overflow_policy == 'drop_oldest':
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+            self.queue.put_nowait(event)
+            return True
+        
+        if self.overflow_policy == 'block':
+            try:
+                await asyncio.wait_for(self.queue.put(event), self.block_timeout)
+                return True
+            except asyncio.TimeoutError:
+                pass
+        
+        self.dropped += 1
+        return False
+    
+    async def _run(self):
+        while True:
+            event = await self.queue.get()
+            start_time = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(self.callback):
+                    await self.callback(event)
+                else:
+                    self.callback(event)
+                self.delivered += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"事件處理失敗: {event.event_type.value} - {e}")
+            finally:
+                latency = time.perf_counter() - start_time
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                self.queue.task_done()
+    
+    async def drain(self):
+        """等待隊列中的事件處理完畢"""
+        if self.queue is not None and self.worker is not None and not self.worker.done():
+            await self.queue.join()
+    
+    async def close(self):
+        """停止工作協程"""
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        handled = self.delivered + self.errors
+        return {
+            "event_type": self.event_type.value,
+            "subscriber": self.name,
+            "overflow_policy": self.overflow_policy,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avg_handler_latency": self.total_latency / handled if handled else 0.0,
+            "max_handler_latency": self.max_latency
+        }
+
 class MCPEventBus:
-    """MCP事件總線"""
+    """MCP事件總線
     
-    def __init__(self):
-        self.subscribers: Dict[MCPEventType, List[Callable]] = {}
-        self.event_history: List[MCPEvent] = []
-        self.max_history = 1000
+    發布只做入隊，每個訂閱者由各自的工作協程異步處理，
+    慢訂閱者不會阻塞發布方（如 request_service）。
+    事件歷史使用定長環形緩衝區，並按事件類型建立索引。
+    """
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self.max_history = self.config.get('max_history', 1000)
+        self.queue_size = self.config.get('queue_size', 1000)
+        self.overflow_policy = self.config.get('overflow_policy', 'drop_oldest')
+        self.block_timeout = self.config.get('block_timeout', 1.0)
+        
+        self.subscribers: Dict[MCPEventType, List[EventSubscription]] = {}
+        self.event_history: Deque[MCPEvent] = deque(maxlen=self.max_history)
+        self.history_by_type: Dict[MCPEventType, Deque[MCPEvent]] = {}
+        self.published_count = 0
         self.logger = logging.getLogger(__name__)
     
-    def subscribe(self, event_type: MCPEventType, callback: Callable[[MCPEvent], None]) -> None:
-        """訂閱事件"""
-        if event_type not in self.subscribers:
-            self.subscribers[event_type] = []
-        self.subscribers[event_type].append(callback)
+    def subscribe(self, event_type: MCPEventType, callback: Callable[[MCPEvent], None],
+                  queue_size: Optional[int] = None, overflow_policy: Optional[str] = None) -> None:
+        """
+        訂閱事件
+        
+        Args:
+            event_type: 事件類型
+            callback: 事件處理函數，可以是協程函數
+            queue_size: 該訂閱者的隊列容量，默認使用總線配置
+            overflow_policy: 隊列滿時的策略（drop_oldest、drop_newest、block）
+        """
+        subscription = EventSubscription(
+            event_type,
+            callback,
+            queue_size=queue_size or self.queue_size,
+            overflow_policy=overflow_policy or self.overflow_policy,
+            block_timeout=self.block_timeout
+        )
+        self.subscribers.setdefault(event_type, []).append(subscription)
         self.logger.debug(f"事件訂閱: {event_type.value}")
     
     def unsubscribe(self, event_type: MCPEventType, callback: Callable) -> None:
         """取消訂閱"""
-        if event_type in self.subscribers and callback in self.subscribers[event_type]:
-            self.subscribers[event_type].remove(callback)
-            self.logger.debug(f"取消事件訂閱: {event_type.value}")
+        for subscription in self.subscribers.get(event_type, []):
+            if subscription.callback == callback:
+                self.subscribers[event_type].remove(subscription)
+                if subscription.worker is not None:
+                    subscription.worker.cancel()
+                self.logger.debug(f"取消事件訂閱: {event_type.value}")
+                break
     
     async def publish(self, event: MCPEvent) -> None:
         """發布事件"""
         # 記錄事件歷史
         self.event_history.append(event)
-        if len(self.event_history) > self.max_history:
-            self.event_history.pop(0)
+        type_history = self.history_by_type.get(event.event_type)
+        if type_history is None:
+            type_history = self.history_by_type[event.event_type] = deque(maxlen=self.max_history)
+        type_history.append(event)
+        self.published_count += 1
         
-        # 通知訂閱者
-        if event.event_type in self.subscribers:
-            for callback in self.subscribers[event.event_type]:
-                try:
-                    if asyncio.iscoroutinefunction(callback):
-                        await callback(event)
-                    else:
-                        callback(event)
-                except Exception as e:
-                    self.logger.error(f"事件處理失敗: {event.event_type.value} - {e}")
+        # 分發到訂閱者隊列
+        for subscription in list(self.subscribers.get(event.event_type, [])):
+            if not await subscription.enqueue(event):
+                self.logger.warning(f"訂閱者隊列已滿，丟棄事件: {event.event_type.value} -> {subscription.name}")
     
     def get_event_history(self, event_type: Optional[MCPEventType] = None, 
                          limit: int = 100) -> List[MCPEvent]:
         """獲取事件歷史"""
-        events = self.event_history
-        if event_type:
-            events = [e for e in events if e.event_type == event_type]
-        return events[-limit:]
+        events = self.event_history if event_type is None else self.history_by_type.get(event_type, ())
+        return list(islice(events, max(len(events) - limit, 0), None))
+    
+    async def drain(self) -> None:
+        """等待所有訂閱者處理完已入隊的事件"""
+        for subscriptions in list(self.subscribers.values()):
+            for subscription in list(subscriptions):
+                await subscription.drain()
+    
+    async def close(self) -> None:
+        """停止所有訂閱者的工作協程"""
+        for subscriptions in self.subscribers.values():
+            for subscription in subscriptions:
+                await subscription.close()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """獲取事件總線指標"""
+        subscriptions = [sub for subs in self.subscribers.values() for sub in subs]
+        return {
+            "published": self.published_count,
+            "history_size": len(self.event_history),
+            "total_queue_depth": sum(sub.queue.qsize() for sub in subscriptions if sub.queue),
+            "total_dropped": sum(sub.dropped for sub in subscriptions),
+            "subscribers": [sub.get_metrics() for sub in subscriptions]
+        }
 
 # ==================== 依賴解析器 ====================
 
@@ -278,10 +460,14 @@ class MCPDependencyResolver:
 
 # ==================== 服務選擇器 ====================
 
+_HEALTHY = MCPServiceHealth(service_id="")
+
 class MCPServiceSelector:
     """MCP服務選擇器"""
     
-    def __init__(self):
+    def __init__(self, health_cache: Optional[Dict[str, MCPServiceHealth]] = None):
+        # 由註冊中心維護的健康緩存，選擇時不再發起探測
+        self.health_cache = health_cache if health_cache is not None else {}
         self.selection_strategies = {
             'round_robin': self._round_robin_select,
             'least_loaded': self._least_loaded_select,
@@ -296,8 +482,11 @@ class MCPServiceSelector:
         if not services:
             return None
         
-        # 過濾活躍服務
-        active_services = [s for s in services if s.status == "active"]
+        # 過濾活躍且健康緩存未標記為不健康的服務
+        active_services = [
+            s for s in services
+            if s.status == "active" and self.health_cache.get(s.service_id, _HEALTHY).healthy
+        ]
         if not active_services:
             return None
         
@@ -326,8 +515,14 @@ class MCPServiceSelector:
     
     def _fastest_response_select(self, services: List[MCPServiceInfo]) -> MCPServiceInfo:
         """最快響應選擇"""
-        # 簡化實現，實際應該基於歷史響應時間
-        return min(services, key=lambda s: s.last_active)
+        # 基於緩存的請求響應時間，沒有請求記錄時使用探測耗時
+        def response_time(service: MCPServiceInfo) -> float:
+            health = self.health_cache.get(service.service_id)
+            if not health:
+                return 0.0
+            return health.response_time_avg or health.probe_latency
+        
+        return min(services, key=response_time)
     
     def _highest_success_rate_select(self, services: List[MCPServiceInfo]) -> MCPServiceInfo:
         """最高成功率選擇"""
@@ -348,15 +543,24 @@ class MCPServiceRegistry:
         self.config = config or {}
         self.services: Dict[str, MCPServiceInfo] = {}
         self.capability_map: Dict[MCPCapability, List[str]] = {}
-        self.event_bus = MCPEventBus()
+        self.event_bus = MCPEventBus(self.config.get('event_bus'))
         self.dependency_resolver = MCPDependencyResolver()
-        self.service_selector = MCPServiceSelector()
+        self.health_cache: Dict[str, MCPServiceHealth] = {}
+        self.service_selector = MCPServiceSelector(self.health_cache)
         self.logger = logging.getLogger(__name__)
         
         # 配置
         self.selection_strategy = self.config.get('selection_strategy', 'round_robin')
         self.health_check_interval = self.config.get('health_check_interval', 60)
         self.max_retry_attempts = self.config.get('max_retry_attempts', 3)
+        self.shutdown_drain_timeout = self.config.get('shutdown_drain_timeout', 5.0)
+        
+        # 健康檢查配置：單次探測超時、並發上限、探測在間隔內的分散比例、
+        # 以及被動健康窗口（窗口內有成功請求的服務跳過主動探測）
+        self.health_check_timeout = self.config.get('health_check_timeout', 5.0)
+        self.health_check_concurrency = self.config.get('health_check_concurrency', 32)
+        self.health_check_jitter = self.config.get('health_check_jitter', 0.5)
+        self.passive_health_window = self.config.get('passive_health_window', self.health_check_interval)
         
         # 啟動健康檢查任務
         self._health_check_task = None
@@ -376,6 +580,13 @@ class MCPServiceRegistry:
         if self._health_check_task:
             self._health_check_task.cancel()
         
+        # 處理完剩餘事件後停止事件分發；超時則直接取消訂閱者工作協程
+        try:
+            await asyncio.wait_for(self.event_bus.drain(), self.shutdown_drain_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"事件隊列在 {self.shutdown_drain_timeout}s 內未處理完，取消剩餘事件")
+        await self.event_bus.close()
+        
         # 關閉所有服務
         for service_info in self.services.values():
             try:
@@ -395,6 +606,7 @@ class MCPServiceRegistry:
             
             # 註冊服務
             self.services[service_info.service_id] = service_info
+            self.health_cache[service_info.service_id] = MCPServiceHealth(service_id=service_info.service_id)
             
             # 更新能力映射
             for capability in service_info.capabilities:
@@ -438,6 +650,7 @@ class MCPServiceRegistry:
             
             # 移除服務
             del self.services[service_id]
+            self.health_cache.pop(service_id, None)
             
             self.logger.info(f"✅ 服務註銷成功: {service_id}")
             return True
@@ -548,6 +761,7 @@ class MCPServiceRegistry:
             response = await selected_service.instance.process_request(request)
             response.execution_time = time.time() - start_time
             response.service_id = selected_service.service_id
+            self._record_request_health(selected_service.service_id, response.success, response.execution_time)
             
             # 更新服務統計
             selected_service.request_count += 1
@@ -568,6 +782,10 @@ class MCPServiceRegistry:
             return response
             
         except Exception as e:
+            # 已選中服務但處理拋出異常，同樣計為一次失敗
+            if request.target_service:
+                self._record_request_health(request.target_service, False, time.time() - start_time)
+            
             # 創建錯誤響應
             error_response = MCPResponse(
                 request_id=request_id,
@@ -587,29 +805,104 @@ class MCPServiceRegistry:
             
             return error_response
     
+    def _record_request_health(self, service_id: str, success: bool, response_time: float) -> None:
+        """記錄請求結果作為被動健康信號"""
+        health = self.health_cache.get(service_id)
+        if not health:
+            return
+        
+        if not success:
+            # 失敗請求的耗時（如快速報錯或超時）不代表服務的正常響應時間
+            health.consecutive_failures += 1
+            return
+        
+        health.last_success = time.monotonic()
+        health.consecutive_failures = 0
+        
+        alpha = 0.2
+        if health.response_time_avg == 0.0:
+            health.response_time_avg = response_time
+        else:
+            health.response_time_avg = alpha * response_time + (1 - alpha) * health.response_time_avg
+    
     async def _health_check_loop(self) -> None:
         """健康檢查循環"""
+        next_sweep = time.monotonic() + self.health_check_interval
         while True:
             try:
-                await asyncio.sleep(self.health_check_interval)
-                await self._perform_health_checks()
+                await asyncio.sleep(max(0.0, next_sweep - time.monotonic()))
+                next_sweep += self.health_check_interval
+                await self._perform_health_checks(
+                    spread=self.health_check_interval * self.health_check_jitter
+                )
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 self.logger.error(f"健康檢查失敗: {e}")
     
-    async def _perform_health_checks(self) -> None:
-        """執行健康檢查"""
-        for service_id, service_info in self.services.items():
+    async def _perform_health_checks(self, spread: float = 0.0) -> None:
+        """
+        並發執行健康檢查
+        
+        Args:
+            spread: 探測在該秒數內隨機錯開，避免所有服務同時被探測
+        """
+        semaphore = asyncio.Semaphore(self.health_check_concurrency)
+        
+        async def check(service_id: str):
+            if spread > 0:
+                await asyncio.sleep(random.uniform(0, spread))
+            async with semaphore:
+                await self._check_service_health(service_id)
+        
+        service_ids = [
+            service_id for service_id, service_info in self.services.items()
+            if service_info.status in ("active", "unhealthy")
+        ]
+        await asyncio.gather(*(check(service_id) for service_id in service_ids))
+    
+    async def _check_service_health(self, service_id: str) -> None:
+        """檢查單個服務，最近有成功請求的服務跳過探測"""
+        service_info = self.services.get(service_id)
+        health = self.health_cache.get(service_id)
+        if not service_info or not health or service_info.status not in ("active", "unhealthy"):
+            return
+        
+        now = time.monotonic()
+        if service_info.status == "active" and now - health.last_success < self.passive_health_window:
+            health.skipped_checks += 1
+            return
+        
+        try:
+            health_result = await asyncio.wait_for(
+                service_info.instance.health_check(), self.health_check_timeout
+            )
+            healthy = bool(health_result.get('healthy', False))
+        except asyncio.TimeoutError:
+            healthy = False
+            self.logger.warning(f"服務健康檢查超時: {service_id} ({self.health_check_timeout}s)")
+        except Exception as e:
+            health.healthy = False
+            health.checked_at = time.monotonic()
+            health.consecutive_failures += 1
+            service_info.status = "error"
+            self.logger.error(f"服務健康檢查異常: {service_id} - {e}")
+            return
+        
+        health.healthy = healthy
+        health.checked_at = time.monotonic()
+        health.probe_latency = health.checked_at - now
+        
+        if healthy:
+            health.consecutive_failures = 0
+            if service_info.status == "unhealthy":
+                service_info.status = "active"
+                self.logger.info(f"服務恢復健康: {service_id}")
+        else:
+            health.consecutive_failures += 1
             if service_info.status == "active":
-                try:
-                    health_result = await service_info.instance.health_check()
-                    if not health_result.get('healthy', False):
-                        service_info.status = "unhealthy"
-                        self.logger.warning(f"服務健康檢查失敗: {service_id}")
-                except Exception as e:
-                    service_info.status = "error"
-                    self.logger.error(f"服務健康檢查異常: {service_id} - {e}")
+                service_info.status = "unhealthy"
+                self.logger.warning(f"服務健康檢查失敗: {service_id}")
     
     def get_registry_status(self) -> Dict[str, Any]:
         """獲取註冊中心狀態"""
@@ -619,6 +912,7 @@ class MCPServiceRegistry:
             "capabilities": len(self.capability_map),
             "total_requests": sum(s.request_count for s in self.services.values()),
             "total_errors": sum(s.error_count for s in self.services.values()),
+            "event_bus": self.event_bus.get_metrics(),
             "services": {
                 sid: {
                     "name": info.service_name,
@@ -627,7 +921,9 @@ class MCPServiceRegistry:
                     "capabilities": [c.value for c in info.capabilities],
                     "request_count": info.request_count,
                     "error_count": info.error_count,
-                    "last_active": info.last_active
+                    "last_active": info.last_active,
+                    "healthy": self.health_cache[sid].healthy if sid in self.health_cache else None,
+                    "response_time_avg": self.health_cache[sid].response_time_avg if sid in self.health_cache else None
                 }
                 for sid, info in self.services.items()
             }
@@ -641,8 +937,8 @@ mcp_registry = MCPServiceRegistry()
 # 導出主要類和實例
 __all__ = [
     'MCPServiceType', 'MCPCapability', 'MCPEventType',
-    'MCPServiceInfo', 'MCPEvent', 'MCPRequest', 'MCPResponse',
-    'MCPServiceInterface', 'MCPEventBus', 'MCPServiceRegistry',
+    'MCPServiceInfo', 'MCPServiceHealth', 'MCPEvent', 'MCPRequest', 'MCPResponse',
+    'MCPServiceInterface', 'MCPEventBus', 'EventSubscription', 'MCPServiceRegistry',
     'mcp_registry'
 ]
 
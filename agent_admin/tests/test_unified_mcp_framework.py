@@ -36,8 +36,12 @@ from ..backend.unified_mcp_framework import (
 )
 
 # 導入具體的MCP適配器
-from ..backend.enhanced_interaction_log_manager import EnhancedInteractionLogManager
-from ..backend.simplified_rl_srt_adapter import SimplifiedRLSRTAdapter
+from ..backend.enhanced_interaction_log_manager import (
+    EnhancedInteractionLogManager, SessionIndex, InteractionData, InteractionType
+)
+from ..backend.simplified_rl_srt_adapter import (
+    SimplifiedRLSRTAdapter, PatternMatcher, KnowledgeBase, LearningExperience, ContextState
+)
 from ..backend.replay_classifier import ReplayDataParser, IntelligentReplayClassifier
 from ..backend.workflow_recorder import WorkflowRecorder
 
@@ -362,6 +366,39 @@ class TestMCPEventBus:
         limited_history = event_bus.get_event_history(limit=3)
         assert len(limited_history) == 3
 
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_does_not_block_publish(self):
+        """測試慢訂閱者不阻塞發布，隊列滿時丟棄最舊事件"""
+        event_bus = MCPEventBus({'queue_size': 2})
+        received_events = []
+
+        async def slow_handler(event: MCPEvent):
+            await asyncio.sleep(0.2)
+            received_events.append(event.event_id)
+
+        event_bus.subscribe(MCPEventType.REQUEST_STARTED, slow_handler)
+
+        start_time = time.time()
+        for i in range(5):
+            await event_bus.publish(MCPEvent(
+                event_type=MCPEventType.REQUEST_STARTED,
+                event_id=f"event_{i}",
+                source_service="test_service",
+                timestamp=time.time(),
+                data={"index": i}
+            ))
+        assert time.time() - start_time < 0.1
+
+        await event_bus.drain()
+
+        # 發布過程中不讓出事件循環，隊列中只保留最新的兩個
+        assert received_events == ["event_3", "event_4"]
+        metrics = event_bus.get_metrics()
+        assert metrics["total_dropped"] == 3
+        assert metrics["subscribers"][0]["queue_depth"] == 0
+
+        await event_bus.close()
+
 # ==================== 具體MCP組件測試 ====================
 
 class TestWorkflowRecorderIntegration:
@@ -557,6 +594,160 @@ class TestReplayDataParserIntegration:
         assert "classification" in response.data
         assert len(response.data["parsed_data"]["actions"]) > 0
 
+class TestPatternMatcher:
+    """Pattern Matcher相似上下文測試"""
+    
+    def _learn(self, matcher: PatternMatcher, task_type: str, complexity: str, environment_type: str):
+        matcher.learn_patterns({
+            "session_id": f"{task_type}_{complexity}_{environment_type}",
+            "context_state": {
+                "task_type": task_type,
+                "complexity": complexity,
+                "environment_type": environment_type
+            },
+            "action_sequence": [{"action_type": "execute_command", "success": True}],
+            "reward_signals": {"total_reward": 1.0}
+        })
+    
+    def test_distinct_labels_do_not_match_exactly(self):
+        """測試不同的任務類型和環境不會被當作相同值"""
+        matcher = PatternMatcher()
+        self._learn(matcher, "development", "medium", "production")
+        self._learn(matcher, "general", "medium", "macos")
+        
+        similar = matcher.find_similar_contexts(
+            {"task_type": "general", "complexity": "medium", "environment_type": "production"}
+        )
+        
+        # 任務類型不同最多得 0.5，低於閾值被過濾；環境不同得 0.5 + 0.3 + 0.2 * 0.3
+        assert [context["context"]["task_type"] for context in similar] == ["general"]
+        assert similar[0]["similarity_score"] == pytest.approx(0.86)
+        assert similar[0]["match_type"] == "fuzzy"
+    
+    def test_partial_credit_for_mismatched_fields(self):
+        """測試複雜度和環境不匹配時保留部分相似度"""
+        matcher = PatternMatcher()
+        self._learn(matcher, "debugging", "medium", "development")
+        self._learn(matcher, "debugging", "complex", "development")
+        self._learn(matcher, "debugging", "complex", "production")
+        
+        similar = matcher.find_similar_contexts(
+            {"task_type": "debugging", "complexity": "medium", "environment_type": "development"}
+        )
+        
+        scores = [(context["match_type"], context["similarity_score"]) for context in similar]
+        assert scores[0] == ("exact", 1.0)
+        assert scores[1][0] == "fuzzy" and scores[1][1] == pytest.approx(0.85)
+        assert scores[2][0] == "fuzzy" and scores[2][1] == pytest.approx(0.71)
+
+class TestSessionIndex:
+    """Session Index相似會話查詢測試"""
+    
+    def _upsert(self, index: SessionIndex, session_id: str, task_type: str,
+                success_rate: float, complexity: str, timestamp: str):
+        interaction_data = InteractionData(
+            session_id=session_id,
+            timestamp=timestamp,
+            user_id="test_user",
+            interaction_type=InteractionType.COMMAND_EXECUTION,
+            context={},
+            action_sequence=[],
+            outcomes={}
+        )
+        index.upsert(interaction_data, {
+            "basic_features": {"action_count": 4, "completion_time": 60},
+            "context_features": {"task_type": task_type, "complexity": complexity},
+            "outcome_features": {"success_rate": success_rate, "overall_success": success_rate > 0.5}
+        })
+    
+    def test_query_orders_by_similarity(self, tmp_path):
+        """測試按已知維度的相似度排序，並可按任務類型過濾"""
+        index = SessionIndex(tmp_path / "session_index.db")
+        self._upsert(index, "close", "debugging", 0.9, "medium", "2025-06-22T10:00:00")
+        self._upsert(index, "far", "debugging", 0.1, "complex", "2025-06-22T11:00:00")
+        self._upsert(index, "other", "deployment", 0.9, "medium", "2025-06-22T12:00:00")
+        
+        results = index.query({"success_rate": 0.9, "complexity": "medium"}, task_type="debugging")
+        
+        assert [result["session_id"] for result in results] == ["close", "far"]
+        assert results[0]["similarity_score"] == pytest.approx(1.0)
+        assert results[1]["similarity_score"] == pytest.approx(0.35)
+        assert results[0]["summary"]["overall_success"] is True
+        assert [r["session_id"] for r in index.query({}, limit=2)] == ["other", "far"]
+        index.close()
+    
+    def test_upsert_replaces_and_persists(self, tmp_path):
+        """測試同一會話重複寫入只保留最新記錄，重新打開後索引仍在"""
+        db_path = tmp_path / "session_index.db"
+        index = SessionIndex(db_path)
+        self._upsert(index, "session", "debugging", 0.2, "simple", "2025-06-22T10:00:00")
+        self._upsert(index, "session", "debugging", 0.8, "simple", "2025-06-22T10:00:00")
+        assert index.count() == 1
+        index.close()
+        
+        index = SessionIndex(db_path)
+        results = index.query({"success_rate": 0.8})
+        assert results[0]["summary"]["success_rate"] == pytest.approx(0.8)
+        index.close()
+
+class TestKnowledgeBase:
+    """Knowledge Base SQLite存儲測試"""
+    
+    def _experience(self, index: int) -> LearningExperience:
+        return LearningExperience(
+            session_id=f"session_{index}",
+            context_state=ContextState(
+                task_type="debugging",
+                environment_type="development",
+                available_tools=5,
+                user_intent_clarity=0.8,
+                complexity="medium"
+            ),
+            action_taken={"action_type": "execute_command"},
+            outcome={"success": True},
+            reward_score=float(index),
+            lessons_learned=[f"lesson_{index}"]
+        )
+    
+    def test_experience_ring_buffer(self, tmp_path):
+        """測試經驗表只保留最近 max_experiences 條，按批壓縮"""
+        knowledge_base = KnowledgeBase(str(tmp_path / "knowledge"), max_experiences=3, compaction_interval=2)
+        for index in range(5):
+            knowledge_base.add_experience(self._experience(index))
+        
+        assert knowledge_base.experience_count() == 3
+        assert [e.session_id for e in knowledge_base.experiences] == ["session_2", "session_3", "session_4"]
+        assert [e.session_id for e in knowledge_base.get_recent_experiences(2)] == ["session_3", "session_4"]
+        
+        # 第4條追加後已壓縮，第5條等待下一次壓縮
+        rows = knowledge_base.connection.execute("SELECT COUNT(*) FROM experiences").fetchone()[0]
+        assert rows == 4
+        knowledge_base.compact()
+        rows = knowledge_base.connection.execute("SELECT COUNT(*) FROM experiences").fetchone()[0]
+        assert rows == 3
+        knowledge_base.close()
+    
+    def test_reload_from_database(self, tmp_path):
+        """測試重新打開後策略、模式和經驗都從數據庫恢復"""
+        knowledge_dir = str(tmp_path / "knowledge")
+        knowledge_base = KnowledgeBase(knowledge_dir)
+        knowledge_base.update({"pattern_key": "debugging_medium", "strategy": "retry"})
+        knowledge_base.update({"pattern_key": "debugging_medium", "strategy": "rollback"})
+        knowledge_base.set_pattern("debugging_medium", {"count": 2})
+        knowledge_base.add_experience(self._experience(0))
+        knowledge_base.close()
+        
+        knowledge_base = KnowledgeBase(knowledge_dir)
+        assert knowledge_base.strategies == {
+            "debugging_medium": {"pattern_key": "debugging_medium", "strategy": "rollback"}
+        }
+        assert knowledge_base.patterns == {"debugging_medium": {"count": 2}}
+        experiences = knowledge_base.get_recent_experiences()
+        assert len(experiences) == 1
+        assert experiences[0].context_state.task_type == "debugging"
+        assert experiences[0].lessons_learned == ["lesson_0"]
+        knowledge_base.close()
+
 # ==================== 端到端測試 ====================
 
 class TestEndToEndWorkflow: